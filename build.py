@@ -55,6 +55,21 @@ try:
             "--clean",  # clean cache before building
             f'--add-data={os.path.join(current_dir, "src/config.py")};.',  # include config
             f'--add-data={os.path.join(current_dir, "src/video_processor.py")};.',  # include video_processor
+            f'--add-data={os.path.join(current_dir, "src/frame_reader.py")};.',  # include frame_reader
+            f'--add-data={os.path.join(current_dir, "src/keyframes.py")};.',  # include keyframes
+            f'--add-data={os.path.join(current_dir, "src/pipeline.py")};.',  # include pipeline
+            f'--add-data={os.path.join(current_dir, "src/metadata_cache.py")};.',  # include metadata_cache
+            f'--add-data={os.path.join(current_dir, "src/manifest.py")};.',  # include manifest
+            f'--add-data={os.path.join(current_dir, "src/scene_detect.py")};.',  # include scene_detect
+            f'--add-data={os.path.join(current_dir, "src/frame_hash.py")};.',  # include frame_hash
+            f'--add-data={os.path.join(current_dir, "src/sprite_sheet.py")};.',  # include sprite_sheet
+            f'--add-data={os.path.join(current_dir, "src/output_sinks.py")};.',  # include output_sinks
+            f'--add-data={os.path.join(current_dir, "src/encoders.py")};.',  # include encoders
+            f'--add-data={os.path.join(current_dir, "src/frame_stats.py")};.',  # include frame_stats
+            f'--add-data={os.path.join(current_dir, "src/events.py")};.',  # include events
+            f'--add-data={os.path.join(current_dir, "src/frame_cache.py")};.',  # include frame_cache
+            f'--add-data={os.path.join(current_dir, "src/memory_budget.py")};.',  # include memory_budget
+            f'--add-data={os.path.join(current_dir, "src/frame_log.py")};.',  # include frame_log
             "--noconfirm",  # replace output directory without asking
             f'--workpath={os.path.join(current_dir, "build")}',  # work directory
             f'--distpath={os.path.join(current_dir, "dist")}',  # output directory
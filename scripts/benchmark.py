@@ -0,0 +1,475 @@
+"""Reproducible performance benchmarks for the frame extractor.
+
+Synthetic test videos are generated with ffmpeg's testsrc2 pattern and
+cached in the work directory, so every run measures the same input. Each case
+runs in a fresh process to get a clean peak RSS.
+
+The startup case times how long the GUI takes to show its window, from
+launch, and how long importing main.py and each module it imports takes. It
+also lists heavy packages that got loaded before any processing started.
+Pass --app to time a PyInstaller build instead of the sources.
+
+Examples:
+    python scripts/benchmark.py --save baseline.json
+    python scripts/benchmark.py --quick --baseline baseline.json
+    python scripts/benchmark.py --startup-only --app dist/VideoFrameExtractor.exe
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)
+src_dir = os.path.join(project_root, "src")
+sys.path.insert(0, src_dir)
+
+RESULTS_VERSION = 1
+
+# A run slower than the baseline by more than this fraction is a regression
+DEFAULT_TOLERANCE = 0.10
+NOISE_FLOOR = 0.001
+
+VIDEOS = {
+    "360p-20s-gop12": {"size": (640, 360), "duration": 20, "fps": 25, "gop": 12},
+    "720p-30s-gop250": {"size": (1280, 720), "duration": 30, "fps": 25, "gop": 250},
+    "1080p-10s-gop50": {"size": (1920, 1080), "duration": 10, "fps": 30, "gop": 50},
+}
+QUICK_VIDEOS = ["360p-20s-gop12"]
+
+INTERVALS = [1, 5]
+FORMATS = ["png", "jpg"]
+# Decoded frames kept to time encoding on; the rest are dropped once counted
+ENCODE_SAMPLE_FRAMES = 8
+
+# Packages the GUI should only load once processing starts
+DEFERRED_MODULES = ("numpy", "PIL", "moviepy", "imageio")
+
+
+def ffmpeg_binary() -> str:
+    from moviepy.config import get_setting
+
+    return get_setting("FFMPEG_BINARY")
+
+
+def generate_video(path: str, spec: Dict):
+    """Encode a deterministic test pattern video with a fixed keyframe interval"""
+    width, height = spec["size"]
+    cmd = [
+        ffmpeg_binary(),
+        "-y",
+        "-loglevel",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        f"testsrc2=size={width}x{height}:rate={spec['fps']}:duration={spec['duration']}",
+        "-c:v",
+        "libx264",
+        "-preset",
+        "veryfast",
+        "-pix_fmt",
+        "yuv420p",
+        "-g",
+        str(spec["gop"]),
+        "-keyint_min",
+        str(spec["gop"]),
+        "-sc_threshold",
+        "0",
+        "-threads",
+        "1",
+        "-fflags",
+        "+bitexact",
+        "-map_metadata",
+        "-1",
+        path,
+    ]
+    subprocess.run(cmd, check=True, stdin=subprocess.DEVNULL)
+
+
+def ensure_videos(work_dir: str, names: List[str]) -> Dict[str, str]:
+    os.makedirs(work_dir, exist_ok=True)
+    paths = {}
+    for name in names:
+        path = os.path.join(work_dir, f"{name}.mp4")
+        if not os.path.exists(path):
+            print(f"Generating {name}...", file=sys.stderr, flush=True)
+            generate_video(path, VIDEOS[name])
+        paths[name] = path
+    return paths
+
+
+def plan_cases(videos: Dict[str, str]) -> List[Dict]:
+    cases = []
+    for name, path in videos.items():
+        cases.append({"id": f"{name}/probe", "kind": "probe", "video": path})
+        for interval in INTERVALS:
+            for output_format in FORMATS:
+                cases.append(
+                    {
+                        "id": f"{name}/extract-{interval}s-{output_format}",
+                        "kind": "extract",
+                        "video": path,
+                        "interval": interval,
+                        "output_format": output_format,
+                    }
+                )
+    return cases
+
+
+def startup_case(app: Optional[str] = None) -> Dict:
+    command = [app] if app else [sys.executable, os.path.join(src_dir, "main.py")]
+    return {"id": "startup", "kind": "startup", "command": command}
+
+
+def peak_rss_mb() -> Dict[str, Optional[float]]:
+    """Peak resident memory of this process and of its finished children"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return {"peak_rss_mb": None, "peak_child_rss_mb": None}
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1
+        ),
+        "peak_child_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1
+        ),
+    }
+
+
+def _timed(func) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def _run_probe(case: Dict, cache_path: str) -> Dict:
+    from metadata_cache import MetadataCache
+    from video_processor import VideoProcessor
+
+    processor = VideoProcessor(case["video"])
+    processor.print_status = lambda message: None
+
+    processor.metadata_cache = None
+    probe = _timed(processor.get_video_metadata)
+
+    processor.metadata_cache = MetadataCache(cache_path)
+    processor.get_video_metadata()
+    cached = _timed(processor.get_video_metadata)
+    return {"seconds": probe, "stages": {"probe": probe, "probe_cached": cached}}
+
+
+def _run_extract(case: Dict, cache_path: str, output_dir: str) -> Dict:
+    from events import TimingCollector
+    from metadata_cache import MetadataCache
+    from video_processor import VideoProcessor
+
+    processor = VideoProcessor(case["video"])
+    processor.print_status = lambda message: None
+    processor.metadata_cache = MetadataCache(cache_path)
+    processor.output_dir = output_dir
+    interval, output_format = case["interval"], case["output_format"]
+
+    # Decode and encode on their own, then the whole pipeline. Only a few
+    # decoded frames are kept, and encoding all of them is extrapolated from
+    # those, so long videos do not have to fit in memory.
+    sample = []
+    decoded = 0
+    started = time.perf_counter()
+    for _, frame in processor.iter_frames(interval):
+        decoded += 1
+        if len(sample) < ENCODE_SAMPLE_FRAMES:
+            sample.append(frame)
+    decode = time.perf_counter() - started
+
+    encode = _timed(
+        lambda: [processor.encode_frame(frame, output_format) for frame in sample]
+    )
+    if sample:
+        encode *= decoded / len(sample)
+    counts = []
+    timings = TimingCollector()
+    processor.events.subscribe(timings)
+    extract = _timed(
+        lambda: counts.append(
+            processor.extract_frames(
+                interval=interval, output_format=output_format, resume=False
+            )
+        )
+    )
+    return {
+        "seconds": extract,
+        "frames": counts[0],
+        "stages": {"decode": decode, "encode": encode, "extract": extract},
+        # Decode buffers the extraction allocated rather than reused
+        "frame_buffers": timings.summary()["frame_buffers"],
+    }
+
+
+def parse_importtime(output: str) -> List[Tuple[int, str, float]]:
+    """(depth, module, cumulative seconds) from python -X importtime output"""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative) / 1e6))
+    return entries
+
+
+def _time_first_window(command: List[str]) -> Optional[float]:
+    """Seconds from launching the GUI until its window is up"""
+    from config import STARTUP_READY_ENV
+
+    fd, ready_file = tempfile.mkstemp(prefix="vfe-startup-")
+    os.close(fd)
+    os.remove(ready_file)
+    env = dict(os.environ, **{STARTUP_READY_ENV: ready_file})
+    started = time.time()
+    proc = subprocess.run(command, env=env, capture_output=True, text=True, timeout=120)
+    try:
+        with open(ready_file, "r") as f:
+            return float(f.read()) - started
+    except (OSError, ValueError):
+        # No display, or the app failed to start
+        error = (proc.stderr or "").strip().splitlines()
+        reason = error[-1] if error else f"exit status {proc.returncode}"
+        print(f"No window timing: {reason}", file=sys.stderr)
+        return None
+    finally:
+        if os.path.exists(ready_file):
+            os.remove(ready_file)
+
+
+def _run_startup(case: Dict) -> Dict:
+    # Imports are timed on the sources; -X importtime cannot see into a build
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=src_dir,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Children are listed before their parent, so main's subtree is
+    # everything after the previous top-level import
+    subtree = []
+    import_main = None
+    for depth, name, seconds in parse_importtime(proc.stderr):
+        if depth == 0 and name == "main":
+            import_main = seconds
+            break
+        if depth == 0:
+            subtree = []
+        else:
+            subtree.append((depth, name, seconds))
+    if import_main is None:
+        raise RuntimeError(
+            f"python -X importtime listed no top-level import of main in {src_dir}"
+        )
+    stages = {"import_main": import_main}
+    window = _time_first_window(case["command"])
+    if window is not None:
+        stages["first_window"] = window
+    return {
+        "seconds": window if window is not None else import_main,
+        "stages": stages,
+        # Modules main.py imports itself, with everything they pull in
+        "imports": {name: seconds for depth, name, seconds in subtree if depth == 1},
+        "deferred_loaded": sorted(
+            {name.split(".")[0] for _, name, _ in subtree} & set(DEFERRED_MODULES)
+        ),
+    }
+
+
+def run_case(case: Dict, repeat: int, warmup: int) -> Dict:
+    """Run one case repeat times after warmup runs and keep the median timings"""
+    work = tempfile.mkdtemp(prefix="vfe-bench-")
+    cache_path = os.path.join(work, "metadata_cache.json")
+    runs = []
+    try:
+        for i in range(warmup + repeat):
+            if case["kind"] == "startup":
+                run = _run_startup(case)
+            elif case["kind"] == "probe":
+                run = _run_probe(case, cache_path)
+            else:
+                output_dir = os.path.join(work, f"run-{i}")
+                run = _run_extract(case, cache_path, output_dir)
+                shutil.rmtree(output_dir, ignore_errors=True)
+            if i >= warmup:
+                runs.append(run)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    result = {key: value for key, value in case.items() if key != "video"}
+    if "video" in case:
+        result["video"] = os.path.basename(case["video"])
+    result["seconds"] = round(statistics.median(run["seconds"] for run in runs), 4)
+    result["stages"] = {
+        stage: round(statistics.median(run["stages"][stage] for run in runs), 4)
+        for stage in runs[0]["stages"]
+    }
+    if "imports" in runs[0]:
+        imports = {
+            name: round(statistics.median(run["imports"][name] for run in runs), 4)
+            for name in runs[0]["imports"]
+        }
+        result["imports"] = dict(
+            sorted(imports.items(), key=lambda item: item[1], reverse=True)
+        )
+        result["deferred_loaded"] = runs[-1]["deferred_loaded"]
+    if "frames" in runs[0]:
+        result["frames"] = runs[0]["frames"]
+        result["fps"] = round(result["frames"] / result["seconds"], 2)
+    if "frame_buffers" in runs[0]:
+        result["frame_buffers"] = runs[-1]["frame_buffers"]
+    result.update(peak_rss_mb())
+    return result
+
+
+def environment() -> Dict:
+    import numpy
+    import PIL
+
+    version = subprocess.run(
+        [ffmpeg_binary(), "-version"], capture_output=True, text=True
+    ).stdout.split("\n")[0]
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pillow": PIL.__version__,
+        "ffmpeg": version,
+    }
+
+
+def run_suite(cases: List[Dict], repeat: int, warmup: int) -> List[Dict]:
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for case in cases:
+        print(f"Running {case['id']}...", file=sys.stderr, flush=True)
+        # A fresh process per case keeps peak RSS from leaking between cases
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results.append(executor.submit(run_case, case, repeat, warmup).result())
+    return results
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[Dict]:
+    """Compare timings with a baseline run, returning the regressions"""
+    previous = {result["id"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        base = previous.get(result["id"])
+        if base is None:
+            print(f"{result['id']:<40} new", file=sys.stderr)
+            continue
+
+        for name, after in result["stages"].items():
+            before = base["stages"].get(name)
+            if before is None:
+                continue
+            change = (after - before) / before if before else 0.0
+            flag = ""
+            # Sub-millisecond timings are mostly noise
+            if change > tolerance and after >= NOISE_FLOOR:
+                flag = "  REGRESSION"
+                regressions.append(
+                    {
+                        "id": result["id"],
+                        "timing": name,
+                        "baseline": before,
+                        "current": after,
+                        "change": round(change, 4),
+                    }
+                )
+            print(
+                f"{result['id']:<40} {name:<13} {before:9.4f}s -> {after:9.4f}s "
+                f"({change:+.1%}){flag}",
+                file=sys.stderr,
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--work-dir",
+        default=os.path.join(tempfile.gettempdir(), "vfe-benchmark-videos"),
+        help="where generated test videos are cached",
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="only benchmark the smallest video"
+    )
+    parser.add_argument(
+        "--startup-only", action="store_true", help="only benchmark GUI startup"
+    )
+    parser.add_argument(
+        "--app",
+        help="executable to time the first window of, e.g. the PyInstaller "
+        "build (default: src/main.py)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="measured runs per case")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured runs first")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this earlier results file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="slowdown fraction reported as a regression (default: 0.10)",
+    )
+    args = parser.parse_args(argv)
+
+    names = [] if args.startup_only else QUICK_VIDEOS if args.quick else list(VIDEOS)
+    videos = ensure_videos(args.work_dir, names)
+    cases = [startup_case(args.app)] + plan_cases(videos)
+    results = run_suite(cases, args.repeat, args.warmup)
+
+    report = {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.datetime.now().isoformat(),
+        "environment": environment(),
+        "videos": {name: VIDEOS[name] for name in names},
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        sys.stdout.write("\n")
+
+    eager = [result for result in results if result.get("deferred_loaded")]
+    for result in eager:
+        modules = ", ".join(result["deferred_loaded"])
+        print(f"{result['id']} imports {modules} before the window", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} timing(s) regressed", file=sys.stderr)
+            return 1
+    return 1 if eager else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
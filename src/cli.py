@@ -0,0 +1,742 @@
+"""Headless command-line entry point for batch frame extraction.
+
+Example:
+    python src/cli.py videos/ "archive/*.mkv" --interval 10 --jobs 4 --summary out.json
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import config as config
+from encoders import DEFAULT_PROFILE, ENCODER_PROFILES, OUTPUT_FORMATS
+from events import TRACE_FILENAME
+from frame_hash import DEFAULT_BANDS
+from keyframes import SEEK_STRATEGIES
+from memory_budget import MemoryBudget
+from output_sinks import DEFAULT_SHARD_FRAMES, OUTPUT_TYPES
+from scene_detect import SCENE_METRICS
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_NO_INPUT = 2
+EXIT_INTERRUPTED = 130
+
+
+def video_extensions() -> List[str]:
+    """Video file extensions taken from the GUI's file dialog filter"""
+    patterns = config.SUPPORTED_FORMATS[0][1].split()
+    return [pattern.lstrip("*").lower() for pattern in patterns]
+
+
+def collect_videos(inputs: List[str], recursive: bool = False) -> List[str]:
+    """Expand files, glob patterns and directories into a sorted list of videos"""
+    extensions = video_extensions()
+    found = []
+
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                candidates = [
+                    os.path.join(root, name)
+                    for root, _, files in os.walk(item)
+                    for name in files
+                ]
+            else:
+                candidates = [os.path.join(item, name) for name in os.listdir(item)]
+            found.extend(
+                path
+                for path in candidates
+                if os.path.splitext(path)[1].lower() in extensions
+            )
+        elif os.path.isfile(item):
+            # Explicitly named files are taken as-is, whatever the extension
+            found.append(item)
+        else:
+            found.extend(
+                path
+                for path in glob.glob(item, recursive=recursive)
+                if os.path.isfile(path)
+            )
+
+    # De-duplicate while keeping a stable order
+    return sorted(set(os.path.abspath(path) for path in found))
+
+
+def output_dir_for(video_path: str, output_root: Optional[str]) -> str:
+    """Give every video its own output folder so batch runs never collide.
+
+    The folder is named after the whole file name, so clip.mp4 and clip.mkv
+    next to each other get clip_mp4 and clip_mkv. Under output_root, videos
+    from different folders share one parent, so a short hash of the video's
+    absolute path is added: clip_mp4_1a2b3c4d.
+    """
+    stem, ext = os.path.splitext(os.path.basename(video_path))
+    name = f"{stem}_{ext.lstrip('.')}" if ext else stem
+    if output_root:
+        source = os.path.normcase(os.path.abspath(video_path))
+        digest = hashlib.sha1(source.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(output_root, f"{name}_{digest}")
+    return os.path.join(os.path.dirname(video_path), "processed_output", name)
+
+
+def run_job(
+    video_path: str, output_dir: str, options: Dict, quiet: bool, processor=None
+) -> Dict:
+    """Process one video and summarize the outcome; never raises.
+
+    Pass a VideoProcessor as processor to keep a handle on it, e.g. to
+    cancel the job from another thread.
+    """
+    # Imported in the worker so the scheduling process never loads moviepy or
+    # runs its ffmpeg checks; it still loads numpy and Pillow for the option
+    # lists of encoders and output_sinks
+    from frame_cache import FrameCache
+    from video_processor import ProcessCancelled, VideoProcessor
+
+    name = os.path.basename(video_path)
+    if processor is None:
+        processor = VideoProcessor(video_path)
+    processor.output_dir = output_dir
+
+    def status_callback(message):
+        if not quiet:
+            print(f"[{name}] {message}", file=sys.stderr, flush=True)
+
+    processor.print_status = status_callback
+
+    options = dict(options)
+    if options.pop("trace", False):
+        options["trace_path"] = os.path.join(output_dir, TRACE_FILENAME)
+    frame_cache_mb = options.pop("frame_cache_mb", None)
+    if frame_cache_mb:
+        processor.frame_cache = FrameCache(max_bytes=frame_cache_mb * 1024**2)
+    memory_budget_mb = options.pop("memory_budget_mb", None)
+    if memory_budget_mb:
+        processor.memory_budget = MemoryBudget(memory_budget_mb * 1024**2)
+
+    summary = {"video": video_path, "output_directory": output_dir}
+    started = time.perf_counter()
+    try:
+        results = processor.process_video(**options)
+        summary["status"] = "ok"
+        summary["frames"] = results["analysis"]["total_frames"]
+        summary["duration"] = results["metadata"]["duration"]
+    except ProcessCancelled as e:
+        summary["status"] = "cancelled"
+        summary["error"] = str(e)
+    except Exception as e:
+        summary["status"] = "failed"
+        summary["error"] = f"{type(e).__name__}: {e}"
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def run_benchmark(video_path: str, args: argparse.Namespace, quiet: bool) -> Dict:
+    """Benchmark the encoder profiles on one video; never raises"""
+    from video_processor import VideoProcessor
+
+    processor = VideoProcessor(video_path)
+    if quiet:
+        processor.print_status = lambda message: None
+    else:
+        name = os.path.basename(video_path)
+        processor.print_status = lambda message: print(
+            f"[{name}] {message}", file=sys.stderr, flush=True
+        )
+
+    summary = {"video": video_path}
+    try:
+        summary["results"] = processor.benchmark_encoders(
+            sample_frames=args.benchmark_frames,
+            quality=args.quality,
+            target_size=args.target_size,
+            crop=args.crop,
+            aspect=args.aspect,
+            grayscale=args.grayscale,
+        )
+        summary["status"] = "ok"
+    except Exception as e:
+        summary["status"] = "failed"
+        summary["error"] = f"{type(e).__name__}: {e}"
+    return summary
+
+
+def write_summary(summary: Dict, path: Optional[str]):
+    if path:
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=4)
+    else:
+        json.dump(summary, sys.stdout, indent=4)
+        sys.stdout.write("\n")
+
+
+def parse_size(value: str):
+    """Parse "320x240", "320x" or "x240" into a (width, height) pair"""
+    width, sep, height = value.lower().partition("x")
+    if not sep or not (width or height):
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {value!r}")
+    try:
+        return (int(width) if width else None, int(height) if height else None)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {value!r}")
+
+
+def parse_grid(value: str):
+    """Parse "10x10" into a (columns, rows) pair"""
+    size = parse_size(value)
+    if None in size or min(size) < 1:
+        raise argparse.ArgumentTypeError(f"expected COLUMNSxROWS, got {value!r}")
+    return size
+
+
+def parse_crop(value: str):
+    """Parse "x,y,width,height" into a crop box"""
+    try:
+        box = tuple(int(part) for part in value.split(","))
+    except ValueError:
+        box = ()
+    if len(box) != 4:
+        raise argparse.ArgumentTypeError(f"expected X,Y,WIDTH,HEIGHT, got {value!r}")
+    return box
+
+
+def parse_variant(value: str):
+    """Parse "SUBFOLDER:FORMAT[:QUALITY[:SIZE]]" into output_variant() arguments"""
+    parts = value.split(":")
+    if not 2 <= len(parts) <= 4 or not parts[0] or parts[1] not in OUTPUT_FORMATS:
+        raise argparse.ArgumentTypeError(
+            f"expected SUBFOLDER:FORMAT[:QUALITY[:SIZE]], got {value!r}"
+        )
+    variant = {"subfolder": parts[0], "output_format": parts[1]}
+    if len(parts) > 2 and parts[2]:
+        try:
+            variant["quality"] = int(parts[2])
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected a quality, got {parts[2]!r}")
+    if len(parts) > 3 and parts[3]:
+        variant["size"] = parse_size(parts[3])
+    return variant
+
+
+# The same as video_processor.EXTRACTION_MODES and frame_reader.ASPECT_MODES,
+# which are not imported so the scheduling process never loads moviepy
+EXTRACTION_MODES = ["interval", "scene", "sharpest"]
+ASPECT_MODES = ["fit", "fill", "stretch"]
+
+# Smallest and largest value of each whole-number option
+_INT_OPTIONS = {
+    "interval": (1, None),
+    "quality": (1, 100),
+    "sharpness_candidates": (1, None),
+    "shard_frames": (1, None),
+    "workers": (1, None),
+    "processes": (1, None),
+    "frame_cache_mb": (1, None),
+    "memory_budget_mb": (1, None),
+    # New indexes can find matches up to DEFAULT_BANDS - 1 bits apart
+    "dedup_distance": (0, DEFAULT_BANDS - 1),
+}
+_CHOICE_OPTIONS = {
+    "mode": EXTRACTION_MODES,
+    "output_format": OUTPUT_FORMATS,
+    "encoder_profile": list(ENCODER_PROFILES),
+    "seek_strategy": SEEK_STRATEGIES,
+    "aspect": ASPECT_MODES,
+    "output": OUTPUT_TYPES,
+    "scene_metric": SCENE_METRICS,
+}
+# Options that may be left unset
+_OPTIONAL = {
+    "workers",
+    "frame_cache_mb",
+    "memory_budget_mb",
+    "target_size",
+    "crop",
+    "variants",
+    "max_gap",
+    "dedup_distance",
+    "dedup_index",
+}
+# Smallest and largest value of each option measured in seconds or as a score
+_NUMBER_OPTIONS = {
+    "sharpness_window": (0, None),
+    "scene_threshold": (0, 1),
+    "min_gap": (0, None),
+    "max_gap": (0, None),
+}
+
+
+def _check_int(name: str, value, minimum=None, maximum=None) -> int:
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{name} must be a whole number, got {value!r}")
+    if (minimum is not None and value < minimum) or (
+        maximum is not None and value > maximum
+    ):
+        limits = f"at least {minimum}" if maximum is None else f"{minimum}-{maximum}"
+        raise ValueError(f"{name} must be {limits}, got {value}")
+    return value
+
+
+def _check_number(name: str, value, minimum, maximum=None) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    if value < minimum or (maximum is not None and value > maximum):
+        limits = f"at least {minimum}" if maximum is None else f"{minimum}-{maximum}"
+        raise ValueError(f"{name} must be {limits}, got {value}")
+    return value
+
+
+def _check_pair(name: str, value, parse) -> tuple:
+    """A WIDTHxHEIGHT style option given as a string or a two-item list"""
+    try:
+        if isinstance(value, str):
+            return parse(value)
+        if not isinstance(value, (list, tuple)) or len(value) != 2:
+            raise ValueError
+        return parse("x".join("" if side is None else str(side) for side in value))
+    except (argparse.ArgumentTypeError, ValueError):
+        raise ValueError(f"{name} must be WIDTHxHEIGHT, got {value!r}")
+
+
+def _check_variant(value) -> Dict:
+    if isinstance(value, str):
+        try:
+            return parse_variant(value)
+        except argparse.ArgumentTypeError as e:
+            raise ValueError(f"variants: {e}")
+    if not isinstance(value, dict) or not isinstance(value.get("subfolder"), str):
+        raise ValueError(f"variants must name a subfolder, got {value!r}")
+    unknown = set(value) - {"subfolder", "output_format", "quality", "size"}
+    if unknown:
+        raise ValueError(f"Unknown variant fields: {', '.join(sorted(unknown))}")
+    variant = dict(value)
+    if variant.get("output_format") not in OUTPUT_FORMATS:
+        raise ValueError(f"variant output_format must be one of {OUTPUT_FORMATS}")
+    if variant.get("quality") is not None:
+        _check_int("variant quality", variant["quality"], 1, 100)
+    if variant.get("size") is not None:
+        variant["size"] = _check_pair("variant size", variant["size"], parse_size)
+    return variant
+
+
+def check_options(options: Dict) -> Dict:
+    """Validate process_video() options, e.g. ones sent to the job server.
+
+    Values may be plain JSON: sizes as "320x240" or [320, null], the crop
+    box as a list. Returns the options with those converted; raises
+    ValueError naming the first bad option.
+    """
+    checked = dict(options)
+    for name, value in options.items():
+        if value is None and name in _OPTIONAL:
+            continue
+        if name in _INT_OPTIONS:
+            _check_int(name, value, *_INT_OPTIONS[name])
+        elif name in _CHOICE_OPTIONS:
+            if value not in _CHOICE_OPTIONS[name]:
+                choices = ", ".join(_CHOICE_OPTIONS[name])
+                raise ValueError(f"{name} must be one of {choices}, got {value!r}")
+        elif name in ("grayscale", "trace"):
+            if not isinstance(value, bool):
+                raise ValueError(f"{name} must be true or false, got {value!r}")
+        elif name in _NUMBER_OPTIONS:
+            _check_number(name, value, *_NUMBER_OPTIONS[name])
+        elif name == "dedup_index":
+            if not isinstance(value, str):
+                raise ValueError(f"{name} must be a path, got {value!r}")
+        elif name in ("target_size", "sprite_tile_size"):
+            checked[name] = _check_pair(name, value, parse_size)
+        elif name == "sprite_grid":
+            checked[name] = _check_pair(name, value, parse_grid)
+        elif name == "crop":
+            if isinstance(value, (list, tuple)):
+                value = ",".join(str(part) for part in value)
+            try:
+                checked[name] = parse_crop(str(value))
+            except argparse.ArgumentTypeError as e:
+                raise ValueError(f"{name}: {e}")
+        elif name == "variants":
+            if not isinstance(value, list):
+                raise ValueError(f"{name} must be a list, got {value!r}")
+            checked[name] = [_check_variant(variant) for variant in value]
+    max_gap, min_gap = checked.get("max_gap"), checked.get("min_gap", 1.0)
+    if max_gap is not None and max_gap < min_gap:
+        raise ValueError("max_gap must not be smaller than min_gap")
+    if checked.get("output") == "sprites" and checked.get("target_size"):
+        raise ValueError(
+            "Sprite tiles are sized with sprite_tile_size, not target_size"
+        )
+    return checked
+
+
+def add_extraction_arguments(parser: argparse.ArgumentParser):
+    """Add the per-video extraction, output and performance options.
+
+    Returns the "scheduling" argument group so callers can add their own
+    scheduling options to it.
+    """
+    extraction = parser.add_argument_group("extraction")
+    extraction.add_argument(
+        "--interval",
+        type=int,
+        default=config.DEFAULT_INTERVAL,
+        help="seconds between extracted frames",
+    )
+    extraction.add_argument(
+        "--mode",
+        choices=EXTRACTION_MODES,
+        default="interval",
+        help="a frame every interval, one per scene change, or the sharpest "
+        "frame near every interval",
+    )
+    extraction.add_argument(
+        "--sharpness-window",
+        type=float,
+        default=1.0,
+        help="seconds around each timestamp searched in sharpest mode",
+    )
+    extraction.add_argument(
+        "--sharpness-candidates",
+        type=int,
+        default=5,
+        help="frames compared per window in sharpest mode",
+    )
+    extraction.add_argument(
+        "--scene-threshold",
+        type=float,
+        default=0.35,
+        help="change score from 0 to 1 that starts a new scene in scene mode",
+    )
+    extraction.add_argument(
+        "--min-gap",
+        type=float,
+        default=1.0,
+        help="fewest seconds between frames in scene mode",
+    )
+    extraction.add_argument(
+        "--max-gap",
+        type=float,
+        default=None,
+        help="most seconds between frames in scene mode, even without a "
+        "scene change",
+    )
+    extraction.add_argument(
+        "--scene-metric",
+        choices=SCENE_METRICS,
+        default="histogram",
+        help="how consecutive frames are compared in scene mode",
+    )
+    extraction.add_argument(
+        "--dedup-distance",
+        type=int,
+        default=None,
+        metavar="BITS",
+        help="skip frames whose perceptual hash is within this many bits of "
+        f"a frame already extracted from any video (0-{DEFAULT_BANDS - 1})",
+    )
+    extraction.add_argument(
+        "--dedup-index",
+        default=None,
+        help="hash index the --dedup-distance lookups share "
+        "(default: frame_hashes.sqlite3 in the cache folder)",
+    )
+    extraction.add_argument(
+        "--format",
+        dest="output_format",
+        choices=OUTPUT_FORMATS,
+        default=config.DEFAULT_FORMAT,
+        help="output image format",
+    )
+    extraction.add_argument(
+        "--quality",
+        type=int,
+        default=config.DEFAULT_QUALITY,
+        help="JPEG/WebP quality (1-100)",
+    )
+    extraction.add_argument(
+        "--profile",
+        dest="encoder_profile",
+        choices=list(ENCODER_PROFILES),
+        default=DEFAULT_PROFILE,
+        help="encoder settings trading speed for file size",
+    )
+    extraction.add_argument("--seek-strategy", choices=SEEK_STRATEGIES, default="auto")
+    extraction.add_argument(
+        "--size",
+        dest="target_size",
+        type=parse_size,
+        help="output size as WIDTHxHEIGHT, or 320x / x240 to keep the aspect ratio",
+    )
+    extraction.add_argument(
+        "--crop", type=parse_crop, help="crop box X,Y,WIDTH,HEIGHT in source pixels"
+    )
+    extraction.add_argument(
+        "--aspect",
+        choices=ASPECT_MODES,
+        default="fit",
+        help="how --size treats the aspect ratio when both sides are given",
+    )
+    extraction.add_argument(
+        "--grayscale", action="store_true", help="extract single-channel frames"
+    )
+
+    outputs = parser.add_argument_group("output")
+    outputs.add_argument(
+        "--output",
+        dest="output",
+        choices=OUTPUT_TYPES,
+        default="files",
+        help="one image file per frame, sprite sheets, a single uncompressed "
+        "zip/tar archive, or raw .npy shards",
+    )
+    outputs.add_argument(
+        "--sprites",
+        dest="output",
+        action="store_const",
+        const="sprites",
+        help="shorthand for --output sprites",
+    )
+    outputs.add_argument(
+        "--variant",
+        dest="variants",
+        type=parse_variant,
+        action="append",
+        metavar="SUBFOLDER:FORMAT[:QUALITY[:SIZE]]",
+        help="also write every frame in this format, quality and size to "
+        "its own subfolder, from the same decode (repeatable), "
+        "e.g. review:jpg:80 or thumbs:jpg::256x",
+    )
+    outputs.add_argument(
+        "--shard-frames",
+        type=int,
+        default=DEFAULT_SHARD_FRAMES,
+        help="frames per .npy shard",
+    )
+    outputs.add_argument(
+        "--sprite-grid",
+        type=parse_grid,
+        default=(10, 10),
+        help="tiles per sheet as COLUMNSxROWS (default: 10x10)",
+    )
+    outputs.add_argument(
+        "--tile-size",
+        dest="sprite_tile_size",
+        type=parse_size,
+        default=(160, None),
+        help="tile size as WIDTHxHEIGHT (default: 160x)",
+    )
+
+    scheduling = parser.add_argument_group("scheduling")
+    scheduling.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="encoder threads per video",
+    )
+    scheduling.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="decoder processes per video (segment-parallel extraction)",
+    )
+
+    scheduling.add_argument(
+        "--frame-cache",
+        action="store_true",
+        help="keep decoded frames on disk so reruns with other output "
+        "settings skip decoding",
+    )
+    scheduling.add_argument(
+        "--frame-cache-size",
+        type=int,
+        default=config.FRAME_CACHE_BYTES // 1024**2,
+        help="disk space for the frame cache in MB (default: %(default)s)",
+    )
+    scheduling.add_argument(
+        "--memory-budget",
+        type=int,
+        default=None,
+        metavar="MB",
+        help="most memory frames in flight may use, across all videos; "
+        "decoding waits when it is used up",
+    )
+
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help=f"write a Chrome trace of each run to {TRACE_FILENAME} "
+        "in its output directory",
+    )
+    return scheduling
+
+
+def extraction_options(args: argparse.Namespace) -> Dict:
+    """process_video() options from arguments added by add_extraction_arguments"""
+    return {
+        "interval": args.interval,
+        "mode": args.mode,
+        "sharpness_window": args.sharpness_window,
+        "sharpness_candidates": args.sharpness_candidates,
+        "scene_threshold": args.scene_threshold,
+        "min_gap": args.min_gap,
+        "max_gap": args.max_gap,
+        "scene_metric": args.scene_metric,
+        "dedup_distance": args.dedup_distance,
+        "dedup_index": args.dedup_index,
+        "output_format": args.output_format,
+        "quality": args.quality,
+        "encoder_profile": args.encoder_profile,
+        "seek_strategy": args.seek_strategy,
+        "target_size": args.target_size,
+        "crop": args.crop,
+        "aspect": args.aspect,
+        "grayscale": args.grayscale,
+        "output": args.output,
+        "sprite_grid": args.sprite_grid,
+        "sprite_tile_size": args.sprite_tile_size,
+        "shard_frames": args.shard_frames,
+        "variants": args.variants,
+        "workers": args.workers,
+        "processes": args.processes,
+        "trace": args.trace,
+        "frame_cache_mb": args.frame_cache_size if args.frame_cache else None,
+        "memory_budget_mb": args.memory_budget,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="video-frame-extractor",
+        description="Extract frames from videos without the GUI.",
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="video files, glob patterns or directories"
+    )
+    parser.add_argument(
+        "-r", "--recursive", action="store_true", help="search directories recursively"
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        help="root folder for results (default: processed_output/<name>_<ext> next to each video)",
+    )
+
+    scheduling = add_extraction_arguments(parser)
+    scheduling.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of videos processed at the same time",
+    )
+
+    parser.add_argument(
+        "--benchmark-encoders",
+        action="store_true",
+        help="time every encoder profile on sample frames instead of extracting",
+    )
+    parser.add_argument(
+        "--benchmark-frames",
+        type=int,
+        default=20,
+        help="frames sampled per video by --benchmark-encoders",
+    )
+    parser.add_argument(
+        "--summary",
+        help="write the JSON summary to this file instead of stdout",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="suppress progress messages"
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        options = check_options(extraction_options(args))
+    except ValueError as e:
+        parser.error(str(e))
+
+    videos = collect_videos(args.inputs, recursive=args.recursive)
+    if not videos:
+        print("No video files found.", file=sys.stderr)
+        return EXIT_NO_INPUT
+
+    if args.benchmark_encoders:
+        # Run one video at a time so the timings do not compete for the CPU
+        results = [run_benchmark(video, args, args.quiet) for video in videos]
+        write_summary({"benchmarks": results}, args.summary)
+        failed = any(result["status"] != "ok" for result in results)
+        return EXIT_FAILED if failed else EXIT_OK
+
+    jobs = max(1, args.jobs)
+    if options["memory_budget_mb"] and jobs > 1:
+        # Job processes cannot share one budget, so each gets an equal part
+        options["memory_budget_mb"] = max(1, options["memory_budget_mb"] // jobs)
+
+    started = time.perf_counter()
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {}
+            for video in videos:
+                output_dir = output_dir_for(video, args.output_dir)
+                future = executor.submit(
+                    run_job, video, output_dir, options, args.quiet
+                )
+                futures[future] = (video, output_dir)
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # run_job never raises, so the worker process died, e.g.
+                    # killed for running out of memory; once one dies the
+                    # pool fails every job it still had
+                    video, output_dir = futures[future]
+                    result = {
+                        "video": video,
+                        "output_directory": output_dir,
+                        "status": "failed",
+                        "error": f"{type(e).__name__}: {e}",
+                        "seconds": None,
+                    }
+                results.append(result)
+                if not args.quiet:
+                    print(
+                        f"{result['status']}: {result['video']} ({result['seconds']}s)",
+                        file=sys.stderr,
+                        flush=True,
+                    )
+    except KeyboardInterrupt:
+        print("Interrupted.", file=sys.stderr)
+        return EXIT_INTERRUPTED
+
+    results.sort(key=lambda result: result["video"])
+    failed = [result for result in results if result["status"] != "ok"]
+    summary = {
+        "total": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": len(failed),
+        "seconds": round(time.perf_counter() - started, 3),
+        "options": options,
+        "videos": results,
+    }
+
+    write_summary(summary, args.summary)
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
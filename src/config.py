@@ -1,3 +1,5 @@
+import os
+
 # Application information
 APP_NAME = "Video Frame Extractor"
 APP_VERSION = "1.0.0"
@@ -13,5 +15,18 @@ DEFAULT_INTERVAL = 30
 DEFAULT_FORMAT = "png"
 DEFAULT_QUALITY = 95
 
+# GUI refresh period and how many log lines the results view keeps
+UI_REFRESH_MS = 100
+LOG_MAX_LINES = 500
+# Set to a file path to make the GUI write the time its window appeared
+# there and exit; see scripts/benchmark.py
+STARTUP_READY_ENV = "VFE_STARTUP_READY_FILE"
+
+# Cache locations
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".video_frame_extractor")
+METADATA_CACHE_SIZE = 1000
+# Disk space the optional decoded-frame cache may use
+FRAME_CACHE_BYTES = 4 * 1024**3
+
 # Supported video formats
 SUPPORTED_FORMATS = [("Video files", "*.mp4 *.avi *.mov *.mkv"), ("All files", "*.*")]
@@ -0,0 +1,151 @@
+import io
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, features
+
+OUTPUT_FORMATS = ("png", "jpg", "webp")
+DEFAULT_PROFILE = "balanced"
+
+# Pillow save options per profile and format. "balanced" is Pillow's own
+# defaults; "fast" trades file size for encode time and "archive" the reverse.
+# Pillow's JPEG defaults are already its fastest settings, so "fast" leaves
+# JPEG out and formats a profile leaves out use the "balanced" settings.
+ENCODER_PROFILES: Dict[str, Dict[str, Dict]] = {
+    "fast": {
+        "png": {"compress_level": 1},
+        "webp": {"method": 0},
+    },
+    "balanced": {
+        "png": {"compress_level": 6},
+        "jpg": {},
+        "webp": {"method": 4},
+    },
+    "archive": {
+        "png": {"compress_level": 9, "optimize": True},
+        "jpg": {"subsampling": "4:4:4", "optimize": True, "progressive": True},
+        "webp": {"method": 6},
+    },
+}
+
+_PIL_FORMATS = {"png": "PNG", "jpg": "JPEG", "webp": "WEBP"}
+
+# Pillow frees image memory straight away unless told to keep some blocks
+# around; keeping a few lets every encode reuse the previous frame's memory
+IMAGE_BLOCK_CACHE = 16
+
+
+def configure_image_memory():
+    """Let Pillow keep freed image blocks for the next encode.
+
+    Called before encoding starts rather than on import, so importing this
+    module does not change Pillow's settings for the rest of the process.
+    PILLOW_BLOCKS_MAX in the environment still takes precedence.
+    """
+    if "PILLOW_BLOCKS_MAX" not in os.environ:
+        Image.core.set_blocks_max(max(IMAGE_BLOCK_CACHE, Image.core.get_blocks_max()))
+
+
+def available_formats() -> List[str]:
+    """Output formats this Pillow build can write"""
+    return [fmt for fmt in OUTPUT_FORMATS if fmt != "webp" or features.check("webp")]
+
+
+def save_options(
+    output_format: str = "png", quality: int = 95, profile: str = DEFAULT_PROFILE
+) -> Dict:
+    """Pillow save() keyword arguments for a format, quality and profile"""
+    output_format = output_format.lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unknown output format {output_format!r}, expected one of {OUTPUT_FORMATS}"
+        )
+    if profile not in ENCODER_PROFILES:
+        raise ValueError(
+            f"Unknown encoder profile {profile!r}, "
+            f"expected one of {tuple(ENCODER_PROFILES)}"
+        )
+
+    settings = ENCODER_PROFILES[profile].get(output_format)
+    if settings is None:
+        settings = ENCODER_PROFILES[DEFAULT_PROFILE][output_format]
+    options = dict(settings)
+    if output_format != "png":
+        options["quality"] = quality
+    return options
+
+
+def save_image(
+    image: Image.Image,
+    fp,
+    output_format: str = "png",
+    quality: int = 95,
+    profile: str = DEFAULT_PROFILE,
+):
+    """Save a PIL image to a path or file object with the profile's settings"""
+    options = save_options(output_format, quality, profile)
+    image.save(fp, _PIL_FORMATS[output_format.lower()], **options)
+
+
+def encode_image(
+    frame: np.ndarray,
+    output_format: str = "png",
+    quality: int = 95,
+    profile: str = DEFAULT_PROFILE,
+    size: Optional[Tuple[int, int]] = None,
+) -> bytes:
+    """Encode a decoded frame to image file bytes, resized to size if given.
+
+    Contiguous uint8 frames are handed to Pillow without an extra copy.
+    """
+    image = Image.fromarray(frame)
+    if size is not None and tuple(size) != image.size:
+        # Shrink by whole factors first; much faster for thumbnails of big frames
+        image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    buffer = io.BytesIO()
+    save_image(image, buffer, output_format, quality, profile)
+    return buffer.getvalue()
+
+
+def benchmark_encoders(
+    frames: Iterable[np.ndarray],
+    formats: Optional[Iterable[str]] = None,
+    profiles: Optional[Iterable[str]] = None,
+    quality: int = 95,
+) -> List[Dict]:
+    """Encode every frame with each profile and format and time it.
+
+    Returns one entry per (profile, format) with the mean encode time and
+    size per frame, fastest first. Formats a profile leaves out would only
+    repeat the "balanced" entry and are skipped.
+    """
+    frames = list(frames)
+    if not frames:
+        raise ValueError("No frames to benchmark")
+    configure_image_memory()
+
+    results = []
+    for profile in profiles or ENCODER_PROFILES:
+        for output_format in formats or available_formats():
+            if output_format not in ENCODER_PROFILES[profile]:
+                continue
+            total_bytes = 0
+            started = time.perf_counter()
+            for frame in frames:
+                total_bytes += len(encode_image(frame, output_format, quality, profile))
+            elapsed = time.perf_counter() - started
+
+            results.append(
+                {
+                    "profile": profile,
+                    "format": output_format,
+                    "frames": len(frames),
+                    "ms_per_frame": round(elapsed * 1000 / len(frames), 3),
+                    "bytes_per_frame": total_bytes // len(frames),
+                }
+            )
+
+    results.sort(key=lambda result: result["ms_per_frame"])
+    return results
@@ -0,0 +1,378 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+# Per-frame operations timed by the extractor
+FRAME_OPS = (
+    "throttle",
+    "decode",
+    "cache_read",
+    "measure",
+    "convert",
+    "encode",
+    "write",
+)
+
+# Default name of the Chrome trace written next to the report
+TRACE_FILENAME = "trace.json"
+
+
+class EventBus:
+    """Fan structured progress and timing events out to subscribers.
+
+    Every event is a dict with "event" (its kind), "ts" (time.perf_counter()
+    when it started), "pid" and "thread". Timed events also carry "duration"
+    in seconds. Subscribers run synchronously on the emitting thread, which
+    may be an encoder or writer thread, so they must be quick and thread-safe.
+    Nothing is built when there are no subscribers.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Callable[[Dict], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Dict], None]) -> Callable[[], None]:
+        """Call callback with every event; returns a function that unsubscribes"""
+        with self._lock:
+            self._subscribers = self._subscribers + [callback]
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers = [s for s in self._subscribers if s is not callback]
+
+        return unsubscribe
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscribers)
+
+    def publish(self, event: Dict):
+        """Deliver an already built event, e.g. one sent by a worker process"""
+        for subscriber in self._subscribers:
+            subscriber(event)
+
+    def emit(self, event: str, ts: Optional[float] = None, **fields):
+        if not self._subscribers:
+            return
+        record = {
+            "event": event,
+            "ts": time.perf_counter() if ts is None else ts,
+            "pid": os.getpid(),
+            "thread": threading.current_thread().name,
+        }
+        record.update(fields)
+        self.publish(record)
+
+    def frame(self, op: str, started: float, **fields):
+        """Emit the duration of one per-frame operation that began at started"""
+        if self._subscribers:
+            duration = time.perf_counter() - started
+            self.emit("frame", ts=started, op=op, duration=duration, **fields)
+
+    @contextmanager
+    def stage(self, name: str, **fields):
+        """Emit stage_start and stage_end events around a block"""
+        started = time.perf_counter()
+        self.emit("stage_start", ts=started, stage=name, **fields)
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started
+            self.emit("stage_end", ts=started, stage=name, duration=duration, **fields)
+
+
+class DurationHistogram:
+    """Running count, total and maximum of durations, with their percentiles.
+
+    Durations are counted in log-spaced bins instead of being kept, so
+    memory stays the same however many frames are timed. Percentiles are
+    read from the bins and are within about 6% of the exact value.
+    """
+
+    # Bins per tenfold step, starting from SMALLEST seconds
+    BINS_PER_DECADE = 20
+    SMALLEST = 1e-6
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._bins: Dict[int, int] = {}
+
+    def add(self, duration: float):
+        self.count += 1
+        self.total += duration
+        self.min = min(self.min, duration)
+        self.max = max(self.max, duration)
+        ratio = max(duration, self.SMALLEST) / self.SMALLEST
+        index = int(math.log10(ratio) * self.BINS_PER_DECADE)
+        self._bins[index] = self._bins.get(index, 0) + 1
+
+    def percentile(self, q: float) -> float:
+        """Estimate the q-th percentile, from the middle of its bin"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * (self.count - 1)
+        seen = 0
+        for index in sorted(self._bins):
+            seen += self._bins[index]
+            if seen > rank:
+                break
+        middle = self.SMALLEST * 10 ** ((index + 0.5) / self.BINS_PER_DECADE)
+        return min(max(middle, self.min), self.max)
+
+    def describe_ms(self) -> Dict:
+        return {
+            "count": self.count,
+            "total_seconds": round(self.total, 4),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class TimingCollector:
+    """Subscriber summarizing stage and per-frame timings for the report"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, float] = {}
+        self.frame_ops: Dict[str, DurationHistogram] = {}
+        self.bytes_written = 0
+        self.max_queue_depth: Dict[str, int] = {}
+        self.frame_buffers = {"allocated": 0, "reused": 0}
+        self.frame_cache: Optional[Dict[str, int]] = None
+        # Memory budget and peak bytes in flight of each extracting process
+        self.memory: Dict[int, tuple] = {}
+
+    def __call__(self, event: Dict):
+        kind = event["event"]
+        with self._lock:
+            if kind == "stage_end":
+                stage = event["stage"]
+                self.stages[stage] = self.stages.get(stage, 0.0) + event["duration"]
+            elif kind == "frame":
+                op = event["op"]
+                if op not in self.frame_ops:
+                    self.frame_ops[op] = DurationHistogram()
+                self.frame_ops[op].add(event["duration"])
+                self.bytes_written += event.get("bytes", 0)
+            elif kind == "queue":
+                name = event["queue"]
+                depth = max(event["depth"], self.max_queue_depth.get(name, 0))
+                self.max_queue_depth[name] = depth
+            elif kind == "frame_cache":
+                if self.frame_cache is None:
+                    self.frame_cache = {"hits": 0, "misses": 0}
+                self.frame_cache["hits"] += event["hits"]
+                self.frame_cache["misses"] += event["misses"]
+            elif kind == "memory":
+                self.memory[event["pid"]] = (event["budget"], event["peak"])
+            elif kind == "buffers":
+                self.frame_buffers["allocated"] += event["allocated"]
+                self.frame_buffers["reused"] += event["reused"]
+
+    def summary(self) -> Dict:
+        with self._lock:
+            summary = {
+                "stages": {
+                    stage: round(seconds, 4) for stage, seconds in self.stages.items()
+                },
+                "frame_ops": {
+                    op: self.frame_ops[op].describe_ms()
+                    for op in FRAME_OPS
+                    if op in self.frame_ops
+                },
+                "bytes_written": self.bytes_written,
+                "max_queue_depth": dict(self.max_queue_depth),
+                "frame_buffers": dict(self.frame_buffers),
+            }
+            if self.frame_cache is not None:
+                summary["frame_cache"] = dict(self.frame_cache)
+            if self.memory:
+                budgets = [budget for budget, _ in self.memory.values()]
+                summary["memory"] = {
+                    # Segment processes each got a share of the budget
+                    "budget_bytes": None if None in budgets else sum(budgets),
+                    "peak_bytes": sum(peak for _, peak in self.memory.values()),
+                }
+            return summary
+
+
+class ProgressTracker:
+    """Subscriber keeping the latest frame count, rate and time remaining.
+
+    Updating it only overwrites a few counters, so the extracting thread
+    never waits on whoever displays the progress; they read a snapshot at
+    their own pace. Segment workers each announce the frames of their own
+    segment, which add up to the total.
+    """
+
+    # Completions the frame rate is averaged over
+    RATE_WINDOW = 30
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = None
+        self.completed = 0
+        # Frames planned and resumed by each segment, None when not split
+        self._plans: Dict[Optional[str], tuple] = {}
+        self._extracted = 0
+        self._recent = deque(maxlen=self.RATE_WINDOW)
+
+    def __call__(self, event):
+        kind = event["event"]
+        if kind == "plan":
+            with self._lock:
+                self._plans[event.get("segment")] = (event["total"], event["resumed"])
+                totals = [total for total, _ in self._plans.values()]
+                self.total = None if None in totals else sum(totals)
+                resumed = sum(resumed for _, resumed in self._plans.values())
+                self.completed = resumed + self._extracted
+        elif kind == "progress":
+            with self._lock:
+                self._extracted += 1
+                self.completed += 1
+                self._recent.append(time.perf_counter())
+
+    def snapshot(self):
+        """Return (completed, total, frames per second, seconds remaining)"""
+        with self._lock:
+            completed, total = self.completed, self.total
+            recent = list(self._recent)
+
+        fps = eta = None
+        if len(recent) > 1 and recent[-1] > recent[0]:
+            fps = (len(recent) - 1) / (recent[-1] - recent[0])
+            if total:
+                eta = max(0, total - completed) / fps
+        return completed, total, fps, eta
+
+
+class EventForwarder:
+    """Subscriber passing events on to another process through a queue.
+
+    Events are put on the queue in small batches, so a worker process does
+    not pay for a round trip per event, and none pile up in its memory. Call
+    flush() before the worker finishes to send the last batch.
+    """
+
+    BATCH_SIZE = 64
+    # Longest an event is held back while more arrive
+    BATCH_SECONDS = 0.2
+
+    def __init__(self, queue):
+        self.queue = queue
+        self._lock = threading.Lock()
+        self._batch: List[Dict] = []
+        self._sent = time.perf_counter()
+
+    def __call__(self, event: Dict):
+        with self._lock:
+            self._batch.append(event)
+            if (
+                len(self._batch) >= self.BATCH_SIZE
+                or time.perf_counter() - self._sent >= self.BATCH_SECONDS
+            ):
+                self._send()
+
+    def _send(self):
+        # Sent under the lock so batches from several threads stay in order
+        if self._batch:
+            self.queue.put(self._batch)
+            self._batch = []
+        self._sent = time.perf_counter()
+
+    def flush(self):
+        with self._lock:
+            self._send()
+
+
+class ChromeTraceWriter:
+    """Subscriber streaming events to a Chrome trace file.
+
+    Open the file in chrome://tracing or https://ui.perfetto.dev. Stages and
+    frame operations become duration slices on the thread that ran them and
+    queue depths become counters. Events are written as they arrive, so a
+    trace cut short by a crash still loads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._threads: Dict[tuple, int] = {}
+        self._file = open(path, "w")
+        self._file.write("[\n")
+        self._first = True
+
+    def _write(self, record: Dict):
+        if not self._first:
+            self._file.write(",\n")
+        self._first = False
+        self._file.write(json.dumps(record))
+
+    def _tid(self, pid: int, thread: str) -> int:
+        key = (pid, thread)
+        tid = self._threads.get(key)
+        if tid is None:
+            tid = self._threads[key] = len(self._threads) + 1
+            self._write(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": thread},
+                }
+            )
+        return tid
+
+    def __call__(self, event: Dict):
+        kind = event["event"]
+        if kind not in ("stage_end", "frame", "queue"):
+            return
+
+        with self._lock:
+            if self._file.closed:
+                return
+            pid = event["pid"]
+            record = {
+                "pid": pid,
+                "tid": self._tid(pid, event["thread"]),
+                "ts": round((event["ts"] - self._origin) * 1e6, 1),
+            }
+            if kind == "queue":
+                record.update(
+                    name=f"{event['queue']} queue",
+                    ph="C",
+                    args={"depth": event["depth"]},
+                )
+            else:
+                name = event["stage"] if kind == "stage_end" else event["op"]
+                args = {
+                    key: value
+                    for key, value in event.items()
+                    if key not in ("event", "ts", "pid", "thread", "duration")
+                }
+                record.update(
+                    name=name,
+                    cat="stage" if kind == "stage_end" else "frame",
+                    ph="X",
+                    dur=round(event["duration"] * 1e6, 1),
+                    args=args,
+                )
+            self._write(record)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.write("\n]\n")
+                self._file.close()
@@ -0,0 +1,137 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+import config as config
+from metadata_cache import MetadataCache
+
+
+class FrameCache:
+    """Disk-backed LRU cache of decoded frames.
+
+    Each frame is stored as a .npy file named after its frame position, in
+    a folder per video and decode options, and is read back as a read-only
+    memory map, so a cache hit costs no decode and no copy. Videos are
+    identified like in MetadataCache, by path, size and modification time,
+    so an edited video misses and its old frames age out.
+
+    The least recently used frames are deleted once the files exceed
+    max_bytes. Use order is kept in the files' modification times, so it
+    carries over between runs and processes.
+    """
+
+    def __init__(
+        self, directory: Optional[str] = None, max_bytes: Optional[int] = None
+    ):
+        self.directory = directory or os.path.join(config.CACHE_DIR, "frames")
+        self.max_bytes = max_bytes or config.FRAME_CACHE_BYTES
+        self._entries: Optional[OrderedDict] = None
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Sent to segment workers, which rescan the directory themselves
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_entries"] = None
+        state["_total"] = 0
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def video_key(self, video_path: str, decode: Optional[Dict] = None) -> str:
+        """Folder name for the frames of a video decoded with these options"""
+        identity = json.dumps(
+            [MetadataCache.key_for(video_path), decode or {}], sort_keys=True
+        )
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:20]
+
+    def _path(self, video_key: str, pos: int) -> str:
+        return os.path.join(self.directory, video_key, f"{pos:08d}.npy")
+
+    def _load(self) -> OrderedDict:
+        """Sizes of the cached files, least recently used first"""
+        if self._entries is None:
+            files = []
+            pattern = os.path.join(glob.escape(self.directory), "*", "*.npy")
+            for path in glob.glob(pattern):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime_ns, path, stat.st_size))
+            files.sort()
+            self._entries = OrderedDict((path, size) for _, path, size in files)
+            self._total = sum(self._entries.values())
+            # The budget may have shrunk since the files were written
+            self._evict()
+        return self._entries
+
+    def _evict(self):
+        while self._total > self.max_bytes and self._entries:
+            stale, stale_size = self._entries.popitem(last=False)
+            self._total -= stale_size
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+    def contains(self, video_key: str, pos: int) -> bool:
+        path = self._path(video_key, pos)
+        with self._lock:
+            return path in self._load() or os.path.exists(path)
+
+    def get(self, video_key: str, pos: int) -> Optional[np.ndarray]:
+        path = self._path(video_key, pos)
+        with self._lock:
+            entries = self._load()
+            try:
+                frame = np.load(path, mmap_mode="r")
+                os.utime(path)
+            except (OSError, ValueError):
+                return None
+            if path in entries:
+                entries.move_to_end(path)
+            return frame
+
+    def put(self, video_key: str, pos: int, frame: np.ndarray):
+        path = self._path(video_key, pos)
+        with self._lock:
+            entries = self._load()
+            if frame.nbytes > self.max_bytes or path in entries:
+                return
+            tmp_path = None
+            try:
+                directory = os.path.dirname(path)
+                os.makedirs(directory, exist_ok=True)
+                # Written under a temporary name so readers never see half a frame
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, frame)
+                os.replace(tmp_path, path)
+                size = os.path.getsize(path)
+            except OSError:
+                # Like the metadata cache, a full or unwritable disk only
+                # means the frame gets decoded again next time
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+
+            entries[path] = size
+            self._total += size
+            self._evict()
+
+    def size(self) -> int:
+        """Bytes currently used by cached frames"""
+        with self._lock:
+            self._load()
+            return self._total
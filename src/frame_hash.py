@@ -0,0 +1,219 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import config as config
+from scene_detect import analysis_luma
+
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+
+# Number of bands each hash is split into for lookups; a search can find
+# every match up to DEFAULT_BANDS - 1 bits away
+DEFAULT_BANDS = 6
+
+
+def _block_means(luma: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """Area-average a 2D array down to rows x cols"""
+    row_starts = np.linspace(0, luma.shape[0], rows, endpoint=False).astype(int)
+    col_starts = np.linspace(0, luma.shape[1], cols, endpoint=False).astype(int)
+    sums = np.add.reduceat(luma.astype(np.uint32), row_starts, axis=0)
+    sums = np.add.reduceat(sums, col_starts, axis=1)
+    row_sizes = np.diff(np.append(row_starts, luma.shape[0]))
+    col_sizes = np.diff(np.append(col_starts, luma.shape[1]))
+    return sums / np.outer(row_sizes, col_sizes)
+
+
+def dhash(frame: np.ndarray) -> int:
+    """64-bit difference hash: whether each cell is brighter than its neighbour"""
+    small = _block_means(analysis_luma(frame), HASH_SIZE, HASH_SIZE + 1)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _to_signed(value: int) -> int:
+    """Map an unsigned 64-bit hash onto SQLite's signed INTEGER"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class HashIndex:
+    """Persistent index of frame hashes for near-duplicate lookups.
+
+    Uses multi-index hashing: every hash is split into equal bands stored in
+    an indexed table. Two hashes within distance d of each other agree
+    exactly on at least one of d + 1 bands, so a search only compares the
+    few hashes sharing a band with the query instead of the whole library.
+
+    The index is shared by every process extracting with it, so writes are
+    committed one frame at a time and never keep the database locked
+    between frames. The database is in WAL mode, so searches do not wait
+    for writers.
+    """
+
+    def __init__(self, path: Optional[str] = None, bands: int = DEFAULT_BANDS):
+        self.path = path or os.path.join(config.CACHE_DIR, "frame_hashes.sqlite3")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Transactions are started explicitly, see _transaction()
+        self._db = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL").fetchone()
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS hashes (
+                id INTEGER PRIMARY KEY,
+                hash INTEGER NOT NULL,
+                video TEXT NOT NULL,
+                timestamp REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                band INTEGER NOT NULL,
+                value INTEGER NOT NULL,
+                hash_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, value);
+            """)
+
+        # The band layout is fixed by whoever creates the index first
+        self._db.execute(
+            "INSERT OR IGNORE INTO meta VALUES ('bands', ?)", (str(bands),)
+        )
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'bands'").fetchone()
+        self.bands = int(row[0])
+
+        bounds = [int(b) for b in np.linspace(0, HASH_BITS, self.bands + 1)]
+        self._band_bits = list(zip(bounds[:-1], bounds[1:]))
+
+    @property
+    def max_distance(self) -> int:
+        return self.bands - 1
+
+    def _band_values(self, value: int) -> List[int]:
+        return [
+            (value >> (HASH_BITS - end)) & ((1 << (end - start)) - 1)
+            for start, end in self._band_bits
+        ]
+
+    @contextmanager
+    def _transaction(self):
+        """Hold the write lock of the database; callers hold self._lock"""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def search(self, value: int, max_distance: int) -> List[Dict]:
+        """Return stored hashes within max_distance bits of value"""
+        with self._lock:
+            return self._search(value, max_distance)
+
+    def _search(self, value: int, max_distance: int) -> List[Dict]:
+        if max_distance > self.max_distance:
+            raise ValueError(
+                f"This index supports distances up to {self.max_distance}; "
+                f"create it with more bands to search further"
+            )
+
+        clauses = " OR ".join(["(band = ? AND value = ?)"] * self.bands)
+        args = []
+        for band, band_value in enumerate(self._band_values(value)):
+            args.extend([band, band_value])
+
+        rows = self._db.execute(
+            "SELECT DISTINCT h.hash, h.video, h.timestamp FROM bands b "
+            f"JOIN hashes h ON h.id = b.hash_id WHERE {clauses}",
+            args,
+        ).fetchall()
+
+        matches = []
+        for stored, video, timestamp in rows:
+            distance = hamming(value, _to_unsigned(stored))
+            if distance <= max_distance:
+                matches.append(
+                    {"video": video, "timestamp": timestamp, "distance": distance}
+                )
+        matches.sort(key=lambda match: match["distance"])
+        return matches
+
+    def add(self, value: int, video: str, timestamp: float):
+        with self._lock, self._transaction():
+            self._add(value, video, timestamp)
+
+    def _add(self, value: int, video: str, timestamp: float):
+        cursor = self._db.execute(
+            "INSERT INTO hashes (hash, video, timestamp) VALUES (?, ?, ?)",
+            (_to_signed(value), video, timestamp),
+        )
+        self._db.executemany(
+            "INSERT INTO bands (band, value, hash_id) VALUES (?, ?, ?)",
+            [
+                (band, band_value, cursor.lastrowid)
+                for band, band_value in enumerate(self._band_values(value))
+            ],
+        )
+
+    def search_or_add(
+        self, value: int, max_distance: int, video: str, timestamp: float
+    ) -> List[Dict]:
+        """Search for value and add it when nothing matches, in one transaction.
+
+        Another process using the index cannot add a match between the
+        search and the insert, so of two near-duplicates seen at the same
+        time only one is kept.
+        """
+        with self._lock, self._transaction():
+            matches = self._search(value, max_distance)
+            if not matches:
+                self._add(value, video, timestamp)
+        return matches
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class DuplicateFilter:
+    """Skip frames that are near-duplicates of frames seen before.
+
+    A match on the same video and timestamp is this very frame, kept by an
+    earlier run, so extracting a video again does not suppress its frames.
+    """
+
+    def __init__(self, index: HashIndex, video: str, max_distance: int = 4):
+        self.index = index
+        self.video = os.path.abspath(video)
+        self.max_distance = max_distance
+
+    def check(self, t: float, frame: np.ndarray) -> Optional[Dict]:
+        """Return the matched earlier frame, or None after recording this one"""
+        matches = self.index.search_or_add(
+            dhash(frame), self.max_distance, self.video, t
+        )
+        for match in matches:
+            if match["video"] == self.video and abs(match["timestamp"] - t) < 1e-3:
+                # The same frame, kept by an earlier run
+                return None
+        return matches[0] if matches else None
@@ -0,0 +1,171 @@
+import glob
+import json
+import os
+import shutil
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from frame_stats import FrameStats
+
+FRAME_LOG_FILENAME = "frames.jsonl"
+
+
+def frame_log_path(output_dir: str, shard: Optional[str] = None) -> str:
+    if shard:
+        return os.path.join(output_dir, f"frames.{shard}.jsonl")
+    return os.path.join(output_dir, FRAME_LOG_FILENAME)
+
+
+def _shard_paths(output_dir: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(glob.escape(output_dir), "frames.*.jsonl")))
+
+
+class FrameLog:
+    """JSON Lines sidecar with one record per frame in the output.
+
+    Records are appended by the writer threads as frames are stored, so the
+    log grows on disk instead of in memory and can be followed while the
+    run is still going. Every line is written out whole, so a crash loses
+    at most the line being written.
+
+    Records are written in frame number order, starting at next_index,
+    whatever order the writer threads finish in: a frame stored early is
+    held back until every frame before it was recorded or skipped. Only
+    the frames still in the pipeline can be held back, so memory stays
+    bounded.
+
+    Segment workers each write their own shard, which ``merge_frame_logs``
+    appends to the main log once they are done.
+    """
+
+    def __init__(self, output_dir: str, shard: Optional[str] = None):
+        self.output_dir = output_dir
+        self.path = frame_log_path(output_dir, shard)
+        self.count = 0
+        # Number of the next frame to write; set it before recording frames
+        # of a plan that does not start at 1
+        self.next_index = 1
+        self._held: Dict[int, Optional[str]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+        # Line buffered: each record reaches the file as soon as it is written
+        self._file = open(self.path, "w", buffering=1, encoding="utf-8")
+
+    def record(
+        self,
+        idx: int,
+        t: float,
+        location: str,
+        nbytes: Optional[int],
+        stats: Optional[Dict] = None,
+        variants: Optional[Dict[str, int]] = None,
+    ):
+        """Append a stored frame; safe to call from writer threads.
+
+        nbytes is None for frames without a file of their own, like sprite
+        tiles, and the record then has no "bytes".
+        """
+        record = {
+            "index": idx,
+            "t": t,
+            "file": os.path.relpath(location, self.output_dir),
+        }
+        if nbytes is not None:
+            record["bytes"] = nbytes
+        if stats:
+            record.update(stats)
+        if variants:
+            # Bytes written for the frame in each variant subfolder
+            record["variants"] = variants
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self._held[idx] = line
+            self._write_ready()
+
+    def skip(self, idx: int):
+        """Note that frame idx will not be recorded, e.g. a skipped duplicate"""
+        with self._lock:
+            self._held[idx] = None
+            self._write_ready()
+
+    def _write_ready(self):
+        while self.next_index in self._held:
+            line = self._held.pop(self.next_index)
+            if line is not None:
+                self._file.write(line)
+                self.count += 1
+            self.next_index += 1
+
+    def close(self):
+        with self._lock:
+            # Frames after a gap left by a cancelled or failed run
+            for idx in sorted(self._held):
+                line = self._held.pop(idx)
+                if line is not None:
+                    self._file.write(line)
+                    self.count += 1
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_frame_log(path: str) -> Iterator[Dict]:
+    """Yield the records of a frame log, including one still being written"""
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # The last line of a crashed or running extraction may be cut off
+                continue
+
+
+def clear_frame_logs(output_dir: str):
+    """Remove the main log and any shards left by an interrupted run"""
+    for path in [frame_log_path(output_dir)] + _shard_paths(output_dir):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def merge_frame_logs(output_dir: str, shards: Sequence[str]):
+    """Append the segment shards, in the given order, to the main log.
+
+    Every shard is removed afterwards, including ones not listed.
+    """
+    with open(frame_log_path(output_dir), "ab") as main:
+        for shard in shards:
+            try:
+                f = open(frame_log_path(output_dir, shard), "rb")
+            except FileNotFoundError:
+                continue
+            with f:
+                shutil.copyfileobj(f, main)
+    for path in _shard_paths(output_dir):
+        os.remove(path)
+
+
+def load_frame_stats(
+    path: str, variants: Sequence[str] = ()
+) -> Tuple[FrameStats, List[FrameStats]]:
+    """Statistics of the logged frames, and frame sizes per variant subfolder"""
+    stats = FrameStats()
+    variant_stats = [FrameStats() for _ in variants]
+    for record in read_frame_log(path):
+        t = record["t"]
+        # Frames resumed from a run that did not measure them have no stats
+        stats.add(t, record.get("bytes"), record)
+        sizes = record.get("variants", {})
+        for subfolder, column in zip(variants, variant_stats):
+            if subfolder in sizes:
+                column.add(t, sizes[subfolder])
+    return stats, variant_stats
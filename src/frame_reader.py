@@ -0,0 +1,351 @@
+import os
+import subprocess as sp
+import threading
+import warnings
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from moviepy.config import get_setting
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader, ffmpeg_parse_infos
+
+ASPECT_MODES = ("fit", "fill", "stretch")
+
+# Decode buffers kept for reuse; enough for the frames a pipeline has in flight
+DEFAULT_POOL_SIZE = 16
+
+
+def probe_video(video_path: str) -> Dict:
+    """Run the ffmpeg probe moviepy uses and return its infos dict"""
+    return ffmpeg_parse_infos(video_path)
+
+
+def output_geometry(
+    source_size: Tuple[int, int],
+    target_size: Optional[Tuple[Optional[int], Optional[int]]] = None,
+    crop: Optional[Tuple[int, int, int, int]] = None,
+    aspect: str = "fit",
+) -> Tuple[List[str], Tuple[int, int]]:
+    """Return the ffmpeg filters and the resulting (width, height).
+
+    crop is (x, y, width, height) in source pixels and is applied first.
+    target_size is (width, height); leaving one of them None keeps the aspect
+    ratio. With both set, "fit" scales to fit inside the box, "fill" scales to
+    cover it and crops the overflow from the centre, and "stretch" ignores
+    the aspect ratio.
+    """
+    if aspect not in ASPECT_MODES:
+        raise ValueError(
+            f"Unknown aspect mode {aspect!r}, expected one of {ASPECT_MODES}"
+        )
+
+    filters = []
+    width, height = source_size
+
+    if crop is not None:
+        x, y, crop_w, crop_h = crop
+        if x < 0 or y < 0 or crop_w <= 0 or crop_h <= 0:
+            raise ValueError(f"Invalid crop box {crop}")
+        if x + crop_w > width or y + crop_h > height:
+            raise ValueError(f"Crop box {crop} lies outside the {width}x{height} frame")
+        filters.append(f"crop={crop_w}:{crop_h}:{x}:{y}")
+        width, height = crop_w, crop_h
+
+    if target_size is not None and target_size != (None, None):
+        target_w, target_h = target_size
+        if target_w is None:
+            scaled = (max(1, round(width * target_h / height)), target_h)
+        elif target_h is None:
+            scaled = (target_w, max(1, round(height * target_w / width)))
+        elif aspect == "stretch":
+            scaled = (target_w, target_h)
+        else:
+            pick = min if aspect == "fit" else max
+            ratio = pick(target_w / width, target_h / height)
+            scaled = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+
+        filters.append(f"scale={scaled[0]}:{scaled[1]}")
+        width, height = scaled
+
+        if aspect == "fill" and None not in target_size:
+            filters.append(f"crop={target_w}:{target_h}")
+            width, height = target_w, target_h
+
+    return filters, (width, height)
+
+
+class FramePool:
+    """Reusable frame buffers for the decoder to read into.
+
+    Buffers are leased out: acquire() returns one with a single lease,
+    retain() adds one for every further owner, and release() gives one back.
+    A buffer is only handed out again once all its leases are released, so a
+    frame that is never released simply stays busy. When no pooled buffer is
+    free a new one is allocated, and pooled if the pool has room.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], size: int = DEFAULT_POOL_SIZE):
+        self.shape = shape
+        self.size = size
+        self._lock = threading.Lock()
+        self._free: List[np.ndarray] = []
+        # Pooled buffers out on lease, by id, with their lease counts
+        self._leased: Dict[int, list] = {}
+        # Buffers allocated and buffers reused, for the timing report
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self) -> np.ndarray:
+        with self._lock:
+            if self._free:
+                buffer = self._free.pop()
+                self.reuses += 1
+            else:
+                buffer = np.empty(self.shape, dtype=np.uint8)
+                self.allocations += 1
+                if len(self._leased) >= self.size:
+                    return buffer
+            self._leased[id(buffer)] = [buffer, 1]
+            return buffer
+
+    def retain(self, buffer: np.ndarray):
+        with self._lock:
+            lease = self._leased.get(id(buffer))
+            if lease is not None and lease[0] is buffer:
+                lease[1] += 1
+
+    def release(self, buffer: np.ndarray):
+        """Give back a lease; buffers the pool does not hold are ignored"""
+        with self._lock:
+            lease = self._leased.get(id(buffer))
+            if lease is None or lease[0] is not buffer:
+                return
+            lease[1] -= 1
+            if lease[1] == 0:
+                del self._leased[id(buffer)]
+                if len(self._leased) + len(self._free) < self.size:
+                    self._free.append(buffer)
+
+    def detach(self, buffer: np.ndarray):
+        """Hand a buffer over to its caller for good, dropping all its leases"""
+        with self._lock:
+            lease = self._leased.get(id(buffer))
+            if lease is not None and lease[0] is buffer:
+                del self._leased[id(buffer)]
+
+
+class FrameReader(FFMPEG_VideoReader):
+    """ffmpeg frame reader with explicit seek and forward-scan access.
+
+    moviepy's ``get_frame`` decides on its own whether to restart ffmpeg or
+    read forward. The extractor plans that decision up front, so this reader
+    exposes both access patterns directly. Passing previously probed infos
+    skips the ffmpeg probe that moviepy runs on every open.
+
+    Cropping, scaling and grayscale conversion run inside ffmpeg, so only
+    the final pixels cross the pipe; see ``output_geometry`` for the options.
+
+    Frames are read straight from the pipe into buffers from a ``FramePool``
+    and skipped frames into one scratch buffer, so decoding does not allocate
+    per frame. Every frame returned comes with a lease on its buffer; pass
+    it to release() once done with it, so the buffer can be read into again,
+    or to detach() to keep it. Frames that are never released stay valid
+    and are simply not reused, but stay pinned by the pool.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        infos: Optional[Dict] = None,
+        target_size: Optional[Tuple[Optional[int], Optional[int]]] = None,
+        crop: Optional[Tuple[int, int, int, int]] = None,
+        aspect: str = "fit",
+        grayscale: bool = False,
+    ):
+        self.filename = filename
+        self.proc = None
+        if infos is None:
+            infos = probe_video(filename)
+
+        self.infos = infos
+        self.fps = infos["video_fps"]
+        self.source_size = tuple(infos["video_size"])
+        self.rotation = infos.get("video_rotation", 0)
+        self.duration = infos["video_duration"]
+        self.ffmpeg_duration = infos["duration"]
+        self.nframes = infos["video_nframes"]
+        self.resize_algo = "bicubic"
+
+        self.filters, self.size = output_geometry(
+            self.source_size, target_size, crop, aspect
+        )
+        self.decode_options = {
+            "target_size": tuple(target_size) if target_size else None,
+            "crop": tuple(crop) if crop else None,
+            "aspect": aspect,
+            "grayscale": grayscale,
+        }
+
+        self.pix_fmt = "gray" if grayscale else "rgb24"
+        self.depth = 1 if grayscale else 3
+        w, h = self.size
+        self.bufsize = self.depth * w * h + 100
+        # Grayscale frames are (h, w) so PIL treats them as "L"
+        self.frame_shape = (h, w) if grayscale else (h, w, 3)
+        self.pool = FramePool(self.frame_shape)
+        self._scratch = None
+
+        self.initialize()
+        self.pos = 1
+        self.lastread = self.read_frame()
+        # The reader keeps only its own lease on lastread
+        self.release(self.lastread)
+
+    def initialize(self, starttime=0):
+        """Open the file and start the ffmpeg pipe with this reader's filters"""
+        self.close()  # if any
+
+        if starttime != 0:
+            offset = min(1, starttime)
+            i_arg = [
+                "-ss",
+                "%.06f" % (starttime - offset),
+                "-i",
+                self.filename,
+                "-ss",
+                "%.06f" % offset,
+            ]
+        else:
+            i_arg = ["-i", self.filename]
+
+        cmd = [get_setting("FFMPEG_BINARY")] + i_arg + ["-loglevel", "error"]
+        if self.filters:
+            cmd += ["-vf", ",".join(self.filters), "-sws_flags", self.resize_algo]
+        cmd += [
+            "-f",
+            "image2pipe",
+            "-pix_fmt",
+            self.pix_fmt,
+            "-vcodec",
+            "rawvideo",
+            "-",
+        ]
+
+        popen_params = {
+            # Frames are read whole into our own buffers, so skip the
+            # frame-sized read buffer a buffered pipe would allocate per seek
+            "bufsize": 0,
+            "stdout": sp.PIPE,
+            "stderr": sp.PIPE,
+            "stdin": sp.DEVNULL,
+        }
+        if os.name == "nt":
+            popen_params["creationflags"] = 0x08000000
+
+        self.proc = sp.Popen(cmd, **popen_params)
+
+    def close(self):
+        # moviepy drops lastread here, which would leak the reader's lease
+        if hasattr(self, "lastread"):
+            self.release(self.lastread)
+        super().close()
+
+    def _read_into(self, buffer: np.ndarray) -> int:
+        """Fill buffer from the pipe, returning the number of bytes read"""
+        view = memoryview(buffer).cast("B")
+        filled = 0
+        while filled < len(view):
+            count = self.proc.stdout.readinto(view[filled:])
+            if not count:
+                break
+            filled += count
+        return filled
+
+    def read_frame(self):
+        frame = self.pool.acquire()
+        frame.flags.writeable = True
+        nbytes = self._read_into(frame)
+        # Read-only like moviepy's frames, so callers cannot corrupt lastread
+        frame.flags.writeable = False
+        if nbytes != frame.nbytes:
+            warnings.warn(
+                f"In file {self.filename}, {frame.nbytes} bytes wanted but "
+                f"{nbytes} bytes read at frame {self.pos}/{self.nframes}, "
+                f"at time {self.pos / self.fps:.02f}/{self.duration:.02f} sec. "
+                f"Using the last valid frame instead.",
+                UserWarning,
+            )
+            self.release(frame)
+            if not hasattr(self, "lastread"):
+                raise IOError(
+                    f"Failed to read the first frame of video file {self.filename}"
+                )
+            return self._repeat_lastread()
+
+        # The reader holds a lease on lastread, as it may return it again
+        if hasattr(self, "lastread"):
+            self.release(self.lastread)
+        self.pool.retain(frame)
+        self.lastread = frame
+        return frame
+
+    def _repeat_lastread(self) -> np.ndarray:
+        self.pool.retain(self.lastread)
+        return self.lastread
+
+    def release(self, frame: np.ndarray):
+        """Give back the lease on a frame returned by this reader"""
+        self.pool.release(frame)
+
+    def detach(self, frame: np.ndarray):
+        """Give a frame returned by this reader to the caller to keep"""
+        self.pool.detach(frame)
+
+    def skip_frames(self, n: int = 1):
+        """Read and discard n frames"""
+        if self._scratch is None:
+            self._scratch = np.empty(self.frame_shape, dtype=np.uint8)
+        for _ in range(n):
+            self._read_into(self._scratch)
+        self.pos += n
+
+    def frame_pos(self, t: float) -> int:
+        """Return the 1-based frame position moviepy uses for time t"""
+        return int(self.fps * t + 0.00001) + 1
+
+    def seek_frame(self, t: float):
+        """Restart ffmpeg at t, decoding forward from the preceding keyframe"""
+        pos = self.frame_pos(t)
+        if self.proc and pos == self.pos:
+            return self._repeat_lastread()
+
+        self.initialize(t)
+        self.pos = pos
+        return self.read_frame()
+
+    def scan_frame(self, t: float):
+        """Read forward to t without restarting ffmpeg"""
+        pos = self.frame_pos(t)
+        if self.proc and pos == self.pos:
+            return self._repeat_lastread()
+
+        # Going backwards is impossible on a pipe, fall back to a seek
+        if not self.proc or pos < self.pos:
+            return self.seek_frame(t)
+
+        self.skip_frames(pos - self.pos - 1)
+        result = self.read_frame()
+        self.pos = pos
+        return result
+
+    def iter_sequential(self):
+        """Yield (t, frame) for every frame, decoding once from the start"""
+        self.initialize()
+        self.pos = 0
+        while True:
+            # Time of the next frame; positions are 1-based
+            t = self.pos / self.fps
+            if t >= self.duration:
+                return
+            frame = self.read_frame()
+            self.pos += 1
+            yield t, frame
@@ -0,0 +1,130 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+from scene_detect import ANALYSIS_WIDTH, analysis_luma
+
+STAT_FIELDS = ("brightness", "contrast", "colorfulness")
+PERCENTILES = (5, 50, 95)
+
+# Sharpness needs finer detail than the other statistics
+SHARPNESS_WIDTH = 320
+
+_INITIAL_CAPACITY = 256
+
+
+def frame_statistics(
+    frame: np.ndarray, width: int = ANALYSIS_WIDTH
+) -> Dict[str, float]:
+    """Brightness, contrast and colorfulness of a decoded frame.
+
+    Brightness and contrast are the mean and standard deviation of BT.601
+    luma on a 0-255 scale. Colorfulness is the Hasler-Suesstrunk metric and
+    is 0 for grayscale frames. All three are measured on a strided copy
+    about width pixels wide.
+    """
+    step = max(1, frame.shape[1] // width)
+    small = frame[::step, ::step].astype(np.float32)
+    if small.ndim == 2:
+        return {
+            "brightness": float(small.mean()),
+            "contrast": float(small.std()),
+            "colorfulness": 0.0,
+        }
+
+    r, g, b = small[..., 0], small[..., 1], small[..., 2]
+    luma = 0.299 * r + 0.587 * g + 0.114 * b
+    rg = r - g
+    yb = 0.5 * (r + g) - b
+    colorfulness = np.hypot(rg.std(), yb.std()) + 0.3 * np.hypot(rg.mean(), yb.mean())
+    return {
+        "brightness": float(luma.mean()),
+        "contrast": float(luma.std()),
+        "colorfulness": float(colorfulness),
+    }
+
+
+def sharpness(frame: np.ndarray, width: int = SHARPNESS_WIDTH) -> float:
+    """Variance of the Laplacian of a downscaled luma copy; blur lowers it"""
+    luma = analysis_luma(frame, width).astype(np.int32)
+    laplacian = (
+        luma[:-2, 1:-1]
+        + luma[2:, 1:-1]
+        + luma[1:-1, :-2]
+        + luma[1:-1, 2:]
+        - 4 * luma[1:-1, 1:-1]
+    )
+    return float(laplacian.var()) if laplacian.size else 0.0
+
+
+def _describe(values: np.ndarray) -> Dict[str, Optional[float]]:
+    """Mean, extremes and percentiles of values, ignoring missing (NaN) ones"""
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return {"mean": None, "min": None, "max": None}
+
+    summary = {
+        "mean": float(values.mean()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+    }
+    for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f"p{q}"] = float(value)
+    return summary
+
+
+class FrameStats:
+    """Per-frame output size and image statistics in compact NumPy arrays.
+
+    Loaded from the frame log written while frames were stored, so no pass
+    over the output is needed afterwards. Statistics of frames reused from an
+    earlier run that did not record them are NaN.
+    """
+
+    def __init__(self):
+        self._count = 0
+        self._timestamps = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        # NaN for frames without a size of their own
+        self._bytes = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self._stats = np.empty((_INITIAL_CAPACITY, len(STAT_FIELDS)), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _reserve(self, count: int):
+        capacity = len(self._timestamps)
+        if count <= capacity:
+            return
+        while capacity < count:
+            capacity *= 2
+        self._timestamps = np.resize(self._timestamps, capacity)
+        self._bytes = np.resize(self._bytes, capacity)
+        self._stats = np.resize(self._stats, (capacity, len(STAT_FIELDS)))
+
+    def add(
+        self, t: float, nbytes: Optional[int], stats: Optional[Dict[str, float]] = None
+    ):
+        self._reserve(self._count + 1)
+        i = self._count
+        self._timestamps[i] = t
+        self._bytes[i] = np.nan if nbytes is None else nbytes
+        self._stats[i] = [(stats or {}).get(field, np.nan) for field in STAT_FIELDS]
+        self._count += 1
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Copies of every column, sorted by timestamp"""
+        order = np.argsort(self._timestamps[: self._count], kind="stable")
+        columns = {
+            "timestamps": self._timestamps[order],
+            "bytes": self._bytes[order],
+        }
+        for column, field in enumerate(STAT_FIELDS):
+            columns[field] = self._stats[order, column]
+        return columns
+
+    def summary(self) -> Dict[str, Dict]:
+        columns = self.arrays()
+        summary = {"bytes": _describe(columns["bytes"])}
+        for field in STAT_FIELDS:
+            summary[field] = _describe(columns[field].astype(np.float64))
+        return summary
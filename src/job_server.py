@@ -0,0 +1,739 @@
+"""Long-running job server with watch folders and a local HTTP API.
+
+Videos dropped into a watched folder, or submitted over HTTP, are queued by
+priority in a job file that survives restarts and processed by a bounded
+pool of workers.
+
+Example:
+    python src/job_server.py --watch /srv/ingest --jobs 2 --format jpg
+    curl -X POST localhost:8765/jobs -d '{"video": "/data/clip.mp4", "priority": 5}'
+    curl -X POST localhost:8765/jobs/3/cancel
+    curl localhost:8765/status
+"""
+
+import argparse
+import collections
+import datetime
+import heapq
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import config as config
+from cli import (
+    add_extraction_arguments,
+    check_options,
+    collect_videos,
+    extraction_options,
+    output_dir_for,
+    run_job,
+)
+from events import ProgressTracker
+from memory_budget import MemoryBudget
+from metadata_cache import MetadataCache
+
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+STORE_VERSION = 1
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_POLL_SECONDS = 5.0
+# Finished jobs kept in the job file; older ones are forgotten
+DEFAULT_KEEP_FINISHED = 1000
+FINISHED_STATES = ("done", "failed", "cancelled")
+
+# How long idle workers wait on the queue before re-checking for shutdown
+_WAIT_INTERVAL = 0.5
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat()
+
+
+def _still_there(source_key: str) -> bool:
+    """Whether the file a source key was made from is still unchanged"""
+    path = source_key.rsplit("|", 2)[0]
+    try:
+        return MetadataCache.key_for(path) == source_key
+    except OSError:
+        return False
+
+
+class JobStore:
+    """Persistent job table with a priority queue of the queued jobs.
+
+    Every change rewrites the job file atomically, so a crash loses nothing
+    that was acknowledged. Jobs found running when the file is loaded were
+    interrupted by a crash or shutdown and are queued again, unless they
+    were being cancelled; the extraction manifest lets them resume where
+    they stopped. Higher priorities run first, and jobs of equal priority
+    in submission order.
+
+    Only the last keep_finished finished jobs are kept, so the file stays
+    small on a long-running server. The source keys of forgotten jobs are
+    remembered while their file is unchanged, so a watched video is still
+    not queued twice.
+    """
+
+    def __init__(self, path: str, keep_finished: int = DEFAULT_KEEP_FINISHED):
+        self.path = path
+        self.keep_finished = keep_finished
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._heap: List = []
+        self.next_id = 1
+        self.jobs: Dict[int, Dict] = {}
+        # Jobs per source key, and the keys of forgotten jobs whose file
+        # has not changed
+        self._source_keys: Dict[str, int] = {}
+        self._forgotten_keys: set = set()
+        # Finished job ids, oldest first
+        self._finished: Deque[int] = collections.deque()
+
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if data.get("version") == STORE_VERSION:
+            self.next_id = data["next_id"]
+            self.jobs = {int(job_id): job for job_id, job in data["jobs"].items()}
+            self._forgotten_keys = {
+                key for key in data.get("forgotten_keys", []) if _still_there(key)
+            }
+
+        for job in sorted(self.jobs.values(), key=lambda job: job["id"]):
+            self._add_key(job)
+            if job["status"] == "running" and job.get("cancel_requested"):
+                job["status"] = "cancelled"
+                job["finished_at"] = _now()
+            elif job["status"] == "running":
+                job["status"] = "queued"
+                job["restarts"] = job.get("restarts", 0) + 1
+            if job["status"] == "queued":
+                self._push(job)
+            elif job["status"] in FINISHED_STATES:
+                self._finished.append(job["id"])
+        self._prune()
+        self._save()
+
+    def _push(self, job: Dict):
+        heapq.heappush(self._heap, (-job["priority"], job["id"]))
+
+    def _add_key(self, job: Dict):
+        key = job.get("source_key")
+        if key is not None:
+            self._source_keys[key] = self._source_keys.get(key, 0) + 1
+
+    def _finish(self, job: Dict):
+        self._finished.append(job["id"])
+        self._prune()
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond keep_finished"""
+        while len(self._finished) > self.keep_finished:
+            job = self.jobs.pop(self._finished.popleft())
+            key = job.get("source_key")
+            if key is None:
+                continue
+            self._source_keys[key] -= 1
+            if not self._source_keys[key]:
+                del self._source_keys[key]
+                if _still_there(key):
+                    self._forgotten_keys.add(key)
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        data = {
+            "version": STORE_VERSION,
+            "next_id": self.next_id,
+            "jobs": self.jobs,
+            "forgotten_keys": sorted(self._forgotten_keys),
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def submit(
+        self,
+        video: str,
+        output_dir: str,
+        options: Dict,
+        priority: int = 0,
+        source: str = "api",
+        source_key: Optional[str] = None,
+    ) -> Dict:
+        with self._lock:
+            job = {
+                "id": self.next_id,
+                "video": video,
+                "output_dir": output_dir,
+                "options": options,
+                "priority": priority,
+                "source": source,
+                "source_key": source_key,
+                "status": "queued",
+                "submitted_at": _now(),
+            }
+            self.jobs[job["id"]] = job
+            self._add_key(job)
+            self.next_id += 1
+            self._push(job)
+            self._save()
+            self._available.notify()
+            return dict(job)
+
+    def take(self, timeout: float) -> Optional[Dict]:
+        """Mark the most urgent queued job running and return it"""
+        with self._lock:
+            deadline = time.monotonic() + timeout
+            while True:
+                while self._heap:
+                    _, job_id = heapq.heappop(self._heap)
+                    job = self.jobs.get(job_id)
+                    # Cancelled jobs are left in the heap and skipped here,
+                    # as are those forgotten since
+                    if job is not None and job["status"] == "queued":
+                        job["status"] = "running"
+                        job["started_at"] = _now()
+                        self._save()
+                        return dict(job)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._available.wait(remaining)
+
+    def update(self, job_id: int, **fields) -> Dict:
+        with self._lock:
+            job = self.jobs[job_id]
+            job.update(fields)
+            if job["status"] == "queued":
+                self._push(job)
+                self._available.notify()
+            elif job["status"] in FINISHED_STATES:
+                self._finish(job)
+            self._save()
+            return dict(job)
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a queued job, or mark a running one to be stopped.
+
+        Returns True if the job is running, so its worker must stop it; the
+        worker also checks cancel_requested() once it has taken the job, in
+        case the request came before the job was registered.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return False
+            if job["status"] == "queued":
+                job["status"] = "cancelled"
+                job["finished_at"] = _now()
+                self._finish(job)
+                self._save()
+                return False
+            if job["status"] != "running":
+                return False
+            job["cancel_requested"] = True
+            self._save()
+            return True
+
+    def cancel_requested(self, job_id: int) -> bool:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return job is not None and job.get("cancel_requested", False)
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self, status: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            return [
+                dict(job)
+                for job in self.jobs.values()
+                if status is None or job["status"] == status
+            ]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict.fromkeys(JOB_STATES, 0)
+            for job in self.jobs.values():
+                counts[job["status"]] += 1
+            return counts
+
+    def knows(self, source_key: str) -> bool:
+        """Whether a job was ever submitted for this exact file"""
+        with self._lock:
+            return source_key in self._source_keys or source_key in self._forgotten_keys
+
+
+class FolderWatcher(threading.Thread):
+    """Poll directories and submit every new video once it stops changing.
+
+    A file is only queued when its size and modification time are the same
+    on two consecutive scans, so videos still being copied in are left
+    alone. Files are identified by path, size and modification time, so a
+    replaced video is processed again but a restart does not repeat work.
+    """
+
+    def __init__(
+        self,
+        directories: List[str],
+        server: "JobServer",
+        recursive: bool = False,
+        interval: float = DEFAULT_POLL_SECONDS,
+        priority: int = 0,
+    ):
+        super().__init__(name="folder-watcher", daemon=True)
+        self.directories = directories
+        self.server = server
+        self.recursive = recursive
+        self.interval = interval
+        self.priority = priority
+        self._pending: Dict[str, str] = {}
+
+    def scan(self):
+        seen = {}
+        for video in collect_videos(self.directories, recursive=self.recursive):
+            try:
+                key = MetadataCache.key_for(video)
+            except OSError:
+                continue  # Removed between listing and stat
+            seen[video] = key
+            if self._pending.get(video) == key and not self.server.store.knows(key):
+                self.server.submit(
+                    video, priority=self.priority, source="watch", source_key=key
+                )
+        self._pending = seen
+
+    def run(self):
+        while not self.server.stopping.wait(self.interval):
+            try:
+                self.scan()
+            except OSError as e:
+                self.server.log(f"Watch scan failed: {e}")
+
+
+class JobServer:
+    """Run queued jobs on a fixed number of worker threads.
+
+    Each job gets its own VideoProcessor; running ones are kept so they can
+    be cancelled and their progress reported.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = 1,
+        output_root: Optional[str] = None,
+        options: Optional[Dict] = None,
+        quiet: bool = False,
+        memory_budget: Optional[MemoryBudget] = None,
+    ):
+        self.store = store
+        self.workers = max(1, workers)
+        self.output_root = output_root
+        self.options = options or {}
+        self.quiet = quiet
+        # Shared by every running job, so they are bounded together
+        self.memory_budget = memory_budget
+        self.stopping = threading.Event()
+        self.started = time.time()
+
+        self._lock = threading.Lock()
+        self._running: Dict[int, tuple] = {}
+        self._threads: List[threading.Thread] = []
+        self._completed = 0
+        self._frames = 0
+        self._busy_seconds = 0.0
+
+    def log(self, message: str):
+        if not self.quiet:
+            print(message, file=sys.stderr, flush=True)
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"job-worker-{i + 1}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(
+        self,
+        video: str,
+        priority: int = 0,
+        options: Optional[Dict] = None,
+        output_dir: Optional[str] = None,
+        source: str = "api",
+        source_key: Optional[str] = None,
+    ) -> Dict:
+        unknown = set(options or {}) - set(self.options)
+        if unknown:
+            raise ValueError(f"Unknown options: {', '.join(sorted(unknown))}")
+        options = check_options({**self.options, **(options or {})})
+        video = os.path.abspath(video)
+        if not os.path.isfile(video):
+            raise ValueError(f"No such video file: {video}")
+
+        job = self.store.submit(
+            video,
+            output_dir or output_dir_for(video, self.output_root),
+            options,
+            priority,
+            source,
+            source_key,
+        )
+        self.log(f"Queued job {job['id']}: {video} (priority {priority})")
+        return job
+
+    def cancel(self, job_id: int) -> Optional[Dict]:
+        """Cancel a queued or running job; returns None for unknown jobs"""
+        if self.store.get(job_id) is None:
+            return None
+        if self.store.cancel(job_id):
+            with self._lock:
+                running = self._running.get(job_id)
+            if running is not None:
+                running[0].cancel_processing()
+        return self.job(job_id)
+
+    def job(self, job_id: int) -> Optional[Dict]:
+        """A job with live progress if it is running"""
+        job = self.store.get(job_id)
+        if job is not None:
+            self._add_progress(job)
+        return job
+
+    def _add_progress(self, job: Dict):
+        with self._lock:
+            running = self._running.get(job["id"])
+        if running is not None:
+            completed, total, fps, eta = running[1].snapshot()
+            job["progress"] = {
+                "frames": completed,
+                "total": total,
+                "frames_per_second": round(fps, 2) if fps else None,
+                "eta_seconds": round(eta, 1) if eta is not None else None,
+            }
+
+    def status(self) -> Dict:
+        uptime = time.time() - self.started
+        with self._lock:
+            running = list(self._running)
+            completed, frames, busy = self._completed, self._frames, self._busy_seconds
+        status = {
+            "uptime_seconds": round(uptime, 1),
+            "workers": self.workers,
+            "jobs": self.store.counts(),
+            "running": [self.job(job_id) for job_id in running],
+            "throughput": {
+                "jobs_completed": completed,
+                "frames_extracted": frames,
+                "jobs_per_hour": round(completed * 3600 / uptime, 2),
+                "frames_per_second": round(frames / uptime, 2),
+                "average_job_seconds": (
+                    round(busy / completed, 2) if completed else None
+                ),
+            },
+        }
+        if self.memory_budget is not None:
+            status["memory"] = self.memory_budget.snapshot()
+        return status
+
+    def _work(self):
+        while not self.stopping.is_set():
+            job = self.store.take(_WAIT_INTERVAL)
+            if job is not None:
+                self._run(job)
+
+    def _run(self, job: Dict):
+        from video_processor import VideoProcessor
+
+        processor = VideoProcessor(job["video"])
+        processor.memory_budget = self.memory_budget
+        tracker = ProgressTracker()
+        processor.events.subscribe(tracker)
+        with self._lock:
+            self._running[job["id"]] = (processor, tracker)
+        # A cancel that came in after take() but before the job was
+        # registered above only reached the store
+        if self.store.cancel_requested(job["id"]):
+            processor.cancel_processing()
+        self.log(f"Started job {job['id']}: {job['video']}")
+
+        try:
+            summary = run_job(
+                job["video"], job["output_dir"], job["options"], True, processor
+            )
+        finally:
+            with self._lock:
+                del self._running[job["id"]]
+
+        if (
+            summary["status"] == "cancelled"
+            and self.stopping.is_set()
+            and not self.store.cancel_requested(job["id"])
+        ):
+            # Interrupted by shutdown rather than by a user: run it again later
+            self.store.update(job["id"], status="queued")
+            return
+
+        fields = {
+            "status": "done" if summary["status"] == "ok" else summary["status"],
+            "finished_at": _now(),
+            "seconds": summary["seconds"],
+        }
+        for key in ("frames", "duration", "error"):
+            if key in summary:
+                fields[key] = summary[key]
+        self.store.update(job["id"], **fields)
+        with self._lock:
+            if summary["status"] == "ok":
+                self._completed += 1
+                self._frames += summary["frames"]
+                self._busy_seconds += summary["seconds"]
+        self.log(f"Job {job['id']} {fields['status']} after {summary['seconds']}s")
+
+    def shutdown(self):
+        """Stop taking jobs and interrupt running ones so they are requeued"""
+        self.stopping.set()
+        with self._lock:
+            running = [processor for processor, _ in self._running.values()]
+        for processor in running:
+            processor.cancel_processing()
+        for thread in self._threads:
+            thread.join()
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """JSON API over the job server.
+
+    GET  /status            counts, running jobs and throughput
+    GET  /jobs[?status=s]   all jobs, or those in one state
+    GET  /jobs/<id>         one job, with progress while it runs
+    POST /jobs              submit {"video", "priority", "options", "output_dir"}
+    POST /jobs/<id>/cancel  cancel a queued or running job
+    """
+
+    server_version = "VideoFrameExtractor"
+
+    @property
+    def jobs(self) -> JobServer:
+        return self.server.job_server
+
+    def log_message(self, format, *args):
+        if not self.jobs.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body):
+        data = json.dumps(body, indent=2).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _path(self) -> List[str]:
+        return [part for part in urlparse(self.path).path.split("/") if part]
+
+    def _job_id(self, part: str) -> Optional[int]:
+        try:
+            return int(part)
+        except ValueError:
+            return None
+
+    def do_GET(self):
+        path = self._path()
+        if path == ["status"]:
+            self._send(200, self.jobs.status())
+        elif path == ["jobs"]:
+            status = parse_qs(urlparse(self.path).query).get("status", [None])[0]
+            jobs = self.jobs.store.list(status)
+            for job in jobs:
+                self.jobs._add_progress(job)
+            self._send(200, {"jobs": jobs})
+        elif len(path) == 2 and path[0] == "jobs":
+            job_id = self._job_id(path[1])
+            job = self.jobs.job(job_id) if job_id is not None else None
+            if job is None:
+                self._send(404, {"error": f"No job {path[1]}"})
+            else:
+                self._send(200, job)
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        path = self._path()
+        if path == ["jobs"]:
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(body, dict) or not isinstance(body.get("video"), str):
+                    raise ValueError('Expected a JSON object with a "video" path')
+                priority = body.get("priority", 0)
+                if isinstance(priority, bool) or not isinstance(priority, int):
+                    raise ValueError(
+                        f"priority must be a whole number, got {priority!r}"
+                    )
+                options = body.get("options")
+                if options is not None and not isinstance(options, dict):
+                    raise ValueError("options must be a JSON object")
+                output_dir = body.get("output_dir")
+                if output_dir is not None and not isinstance(output_dir, str):
+                    raise ValueError("output_dir must be a path")
+                job = self.jobs.submit(
+                    body["video"],
+                    priority=priority,
+                    options=options,
+                    output_dir=output_dir,
+                )
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+                return
+            self._send(201, job)
+        elif len(path) == 3 and path[0] == "jobs" and path[2] == "cancel":
+            job_id = self._job_id(path[1])
+            job = self.jobs.cancel(job_id) if job_id is not None else None
+            if job is None:
+                self._send(404, {"error": f"No job {path[1]}"})
+            else:
+                self._send(200, job)
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="video-frame-extractor-server",
+        description="Process videos from watch folders and a local HTTP API.",
+    )
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="append",
+        default=[],
+        help="directory to watch for new videos (repeatable)",
+    )
+    parser.add_argument(
+        "-r", "--recursive", action="store_true", help="watch directories recursively"
+    )
+    parser.add_argument(
+        "--poll",
+        type=float,
+        default=DEFAULT_POLL_SECONDS,
+        help="seconds between scans of the watched directories",
+    )
+    parser.add_argument(
+        "--watch-priority",
+        type=int,
+        default=0,
+        help="priority of jobs found in watched directories",
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        help="root folder for results (default: processed_output/<name>_<ext> next to each video)",
+    )
+    parser.add_argument(
+        "--state",
+        default=os.path.join(config.CACHE_DIR, "jobs.json"),
+        help="job file kept across restarts",
+    )
+    parser.add_argument(
+        "--keep-finished",
+        type=int,
+        default=DEFAULT_KEEP_FINISHED,
+        help="finished jobs kept in the job file",
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help="port to listen on"
+    )
+
+    scheduling = add_extraction_arguments(parser)
+    scheduling.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of videos processed at the same time",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="suppress progress messages"
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        options = check_options(extraction_options(args))
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.keep_finished < 0:
+        parser.error("--keep-finished must be at least 0")
+    store = JobStore(args.state, args.keep_finished)
+    # One budget for the whole server rather than one per job
+    memory_budget_mb = options.pop("memory_budget_mb")
+    server = JobServer(
+        store,
+        workers=args.jobs,
+        output_root=args.output_dir,
+        options=options,
+        quiet=args.quiet,
+        memory_budget=(
+            MemoryBudget(memory_budget_mb * 1024**2) if memory_budget_mb else None
+        ),
+    )
+    httpd = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    httpd.job_server = server
+
+    # Shut down cleanly on SIGTERM too, so running jobs are requeued
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, terminate)
+
+    queued = store.counts()["queued"]
+    server.start()
+    if args.watch:
+        FolderWatcher(
+            args.watch, server, args.recursive, args.poll, args.watch_priority
+        ).start()
+    server.log(
+        f"Listening on http://{args.host}:{httpd.server_address[1]} with "
+        f"{server.workers} worker(s); {queued} job(s) queued"
+    )
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.log("Shutting down...")
+    finally:
+        server.shutdown()
+        httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
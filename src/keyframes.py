@@ -0,0 +1,176 @@
+import bisect
+import json
+import os
+import re
+import subprocess as sp
+from typing import List, Optional, Sequence
+
+# Sidecar written next to the video, e.g. "clip.mp4.keyframes.json"
+KEYFRAME_SIDECAR_SUFFIX = ".keyframes.json"
+
+SEEK_STRATEGIES = ("auto", "seek", "sequential")
+
+# Fixed cost of restarting ffmpeg for a seek, expressed in decoded frames
+SEEK_OVERHEAD_FRAMES = 25
+
+# moviepy starts decoding up to this many seconds before the seek target
+SEEK_OFFSET = 1.0
+
+_PTS_TIME_RE = re.compile(r"pts_time:\s*(-?[0-9.]+)")
+
+
+class KeyframeIndex:
+    """Keyframe timestamps of a video, cached in a sidecar file"""
+
+    def __init__(self, video_path: str, keyframes: Sequence[float]):
+        self.video_path = video_path
+        self.keyframes = sorted(keyframes)
+
+    @staticmethod
+    def sidecar_path(video_path: str) -> str:
+        return video_path + KEYFRAME_SIDECAR_SUFFIX
+
+    @staticmethod
+    def _source_signature(video_path: str) -> dict:
+        stat = os.stat(video_path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    @classmethod
+    def load(cls, video_path: str) -> Optional["KeyframeIndex"]:
+        """Load the sidecar index, or None if it is missing or stale"""
+        try:
+            with open(cls.sidecar_path(video_path), "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if data.get("source") != cls._source_signature(video_path):
+            return None
+        return cls(video_path, data.get("keyframes", []))
+
+    @classmethod
+    def probe(cls, video_path: str) -> "KeyframeIndex":
+        """Decode only the keyframes of the first video stream to find them"""
+        # Imported here: moviepy.config runs ffmpeg to check it when loaded,
+        # which importers that only want SEEK_STRATEGIES should not pay for
+        from moviepy.config import get_setting
+
+        cmd = [
+            get_setting("FFMPEG_BINARY"),
+            "-hide_banner",
+            "-skip_frame",
+            "nokey",
+            "-i",
+            video_path,
+            "-map",
+            "0:v:0",
+            "-an",
+            "-sn",
+            "-vf",
+            "showinfo",
+            "-f",
+            "null",
+            "-",
+        ]
+        popen_params = {"stdout": sp.DEVNULL, "stderr": sp.PIPE, "stdin": sp.DEVNULL}
+        if os.name == "nt":
+            popen_params["creationflags"] = 0x08000000
+
+        try:
+            proc = sp.run(cmd, **popen_params)
+        except OSError:
+            return cls(video_path, [])
+
+        log = proc.stderr.decode("utf8", errors="ignore")
+        keyframes = [
+            float(match)
+            for line in log.splitlines()
+            if "showinfo" in line
+            for match in _PTS_TIME_RE.findall(line)
+        ]
+        return cls(video_path, keyframes)
+
+    @classmethod
+    def for_video(cls, video_path: str) -> "KeyframeIndex":
+        """Return the cached index, probing and caching it if needed"""
+        index = cls.load(video_path)
+        if index is None:
+            index = cls.probe(video_path)
+            if index.keyframes:
+                index.save()
+        return index
+
+    def save(self):
+        data = {
+            "source": self._source_signature(self.video_path),
+            "keyframes": self.keyframes,
+        }
+        try:
+            with open(self.sidecar_path(self.video_path), "w") as f:
+                json.dump(data, f)
+        except OSError:
+            # Read-only media; the index is just probed again next time
+            pass
+
+    def keyframe_before(self, t: float) -> float:
+        """Return the last keyframe at or before t"""
+        i = bisect.bisect_right(self.keyframes, t)
+        return self.keyframes[i - 1] if i else 0.0
+
+    @property
+    def average_spacing(self) -> Optional[float]:
+        if len(self.keyframes) < 2:
+            return None
+        return (self.keyframes[-1] - self.keyframes[0]) / (len(self.keyframes) - 1)
+
+
+def estimate_seek_cost(
+    timestamps: Sequence[float], fps: float, index: KeyframeIndex
+) -> float:
+    """Frames decoded when every timestamp is reached by a fresh seek"""
+    cost = 0.0
+    for t in timestamps:
+        start = index.keyframe_before(t - min(SEEK_OFFSET, t))
+        cost += (t - start) * fps + SEEK_OVERHEAD_FRAMES
+    return cost
+
+
+def estimate_scan_cost(timestamps: Sequence[float], fps: float) -> float:
+    """Frames decoded when reading forward through every timestamp"""
+    if not timestamps:
+        return 0.0
+    return max(timestamps) * fps + SEEK_OVERHEAD_FRAMES
+
+
+def choose_seek_strategy(
+    timestamps: Sequence[float],
+    fps: float,
+    index: Optional[KeyframeIndex],
+    strategy: str = "auto",
+) -> str:
+    """Pick "seek" or "sequential" for the given timestamps.
+
+    Sparse timestamps on a video with frequent keyframes are cheapest to
+    reach by seeking, while timestamps closer together than the keyframe
+    spacing are cheapest to reach by decoding straight through.
+    """
+    if strategy not in SEEK_STRATEGIES:
+        raise ValueError(
+            f"Unknown seek strategy {strategy!r}, expected one of {SEEK_STRATEGIES}"
+        )
+    if strategy != "auto":
+        return strategy
+
+    timestamps = sorted(timestamps)
+    if index is None or not index.keyframes:
+        # Without an index, mirror moviepy: scan short gaps, seek long ones
+        gaps: List[float] = [b - a for a, b in zip(timestamps, timestamps[1:])]
+        if gaps and max(gaps) * fps <= 100:
+            return "sequential"
+        return "seek"
+
+    if estimate_scan_cost(timestamps, fps) <= estimate_seek_cost(
+        timestamps, fps, index
+    ):
+        return "sequential"
+    return "seek"
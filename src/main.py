@@ -1,10 +1,12 @@
 import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from video_processor import VideoProcessor, ProcessCancelled
 import config as config
+from events import ProgressTracker
 import threading
-from queue import Queue
+import multiprocessing
+from collections import deque
+from queue import Empty, Queue
 import time
 
 
@@ -128,6 +130,9 @@ class VideoProcessorGUI:
 
         # Message queue for thread communication
         self.message_queue = Queue()
+        # Status lines from the worker; old ones drop off if the UI falls behind
+        self.log_buffer = deque(maxlen=config.LOG_MAX_LINES)
+        self.progress = None
 
         # Variables
         self.video_path = tk.StringVar()
@@ -135,6 +140,7 @@ class VideoProcessorGUI:
         self.output_format = tk.StringVar(value="png")
         self.quality = tk.IntVar(value=95)
         self.progress_var = tk.StringVar(value="Ready")
+        self.speed_var = tk.StringVar(value="")
         self.is_processing = False
         self.processor = None
 
@@ -217,13 +223,13 @@ class VideoProcessorGUI:
         format_combo = ttk.Combobox(
             settings_frame,
             textvariable=self.output_format,
-            values=["png", "jpg"],
+            values=["png", "jpg", "webp"],
             width=7,
         )
         format_combo.grid(row=1, column=1, sticky=tk.W, pady=5)
 
         # Quality setting
-        ttk.Label(settings_frame, text="Quality (JPEG only):").grid(
+        ttk.Label(settings_frame, text="Quality (JPEG/WebP):").grid(
             row=2, column=0, sticky=tk.W, pady=5
         )
         quality_spin = ttk.Spinbox(
@@ -243,6 +249,11 @@ class VideoProcessorGUI:
         self.progress_bar.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=5)
         self.progress_bar.grid_remove()  # Hide initially
 
+        # Frame count, rate and time remaining
+        ttk.Label(progress_frame, textvariable=self.speed_var).grid(
+            row=2, column=0, sticky=(tk.W, tk.E)
+        )
+
         # Results Text
         results_frame = ttk.LabelFrame(
             main_frame, text="Processing Results", padding="10"
@@ -289,32 +300,64 @@ class VideoProcessorGUI:
             self.video_path.set(filename)
 
     def check_queue(self):
-        """Check message queue for updates from processing thread"""
+        """Apply updates from the processing thread, once per refresh period"""
+        # Take the messages first so log lines written before a result show up
+        # ahead of it
+        messages = []
         while True:
             try:
-                msg = self.message_queue.get_nowait()
-
-                if msg.get("type") == "progress":
-                    self.progress_var.set(msg["message"])
-                    self.append_result(msg["message"])
-                elif msg.get("type") == "result":
-                    self.display_results(msg["results"])
-                    self.process_complete()
-                elif msg.get("type") == "error":
-                    if isinstance(msg["error"], ProcessCancelled):
-                        self.handle_cancellation()
-                    else:
-                        self.handle_error(msg["error"])
-                    self.process_complete()
-
-            except Exception:
+                messages.append(self.message_queue.get_nowait())
+            except Empty:
                 break
 
+        lines = []
+        while self.log_buffer:
+            lines.append(self.log_buffer.popleft())
+        if lines:
+            self.progress_var.set(lines[-1])
+            self.append_result("\n".join(lines))
+        self.update_progress()
+
+        for msg in messages:
+            if msg.get("type") == "result":
+                self.display_results(msg["results"])
+                self.process_complete()
+            elif msg.get("type") == "cancelled":
+                self.handle_cancellation()
+                self.process_complete()
+            elif msg.get("type") == "error":
+                self.handle_error(msg["error"])
+                self.process_complete()
+
         # Schedule next queue check
-        self.root.after(100, self.check_queue)
+        self.root.after(config.UI_REFRESH_MS, self.check_queue)
+
+    def update_progress(self):
+        if self.progress is None:
+            return
+        completed, total, fps, eta = self.progress.snapshot()
+        if not total:
+            return
+
+        if str(self.progress_bar["mode"]) != "determinate":
+            self.progress_bar.stop()
+            self.progress_bar.configure(mode="determinate")
+        self.progress_bar.configure(maximum=total, value=completed)
+
+        speed = f"{completed}/{total} frames"
+        if fps is not None:
+            speed += f" \u2022 {fps:.1f} frames/s"
+        if eta is not None:
+            minutes, seconds = divmod(int(eta + 0.5), 60)
+            speed += f" \u2022 {minutes}:{seconds:02d} remaining"
+        self.speed_var.set(speed)
 
     def append_result(self, message):
         self.results_text.insert(tk.END, message + "\n")
+        # Keep only the newest lines so long jobs do not slow Tk down
+        lines = int(self.results_text.index("end-1c").split(".")[0]) - 1
+        if lines > config.LOG_MAX_LINES:
+            self.results_text.delete("1.0", f"{lines - config.LOG_MAX_LINES + 1}.0")
         self.results_text.see(tk.END)
 
     def display_results(self, results):
@@ -336,15 +379,18 @@ class VideoProcessorGUI:
     def handle_cancellation(self):
         self.progress_var.set("Processing cancelled by user")
         self.append_result("\nProcessing cancelled by user")
+        self.append_result("Extracted frames were kept; process again to resume.")
         messagebox.showinfo("Cancelled", "Video processing was cancelled")
 
     def process_complete(self):
         self.is_processing = False
         self.process_button.state(["!disabled"])
         self.stop_button.state(["disabled"])
+        self.update_progress()
         self.progress_bar.stop()
         self.progress_bar.grid_remove()
         self.processor = None
+        self.progress = None
 
     def stop_processing(self):
         """Cancel the current processing operation"""
@@ -357,12 +403,18 @@ class VideoProcessorGUI:
     def process_video_thread(self):
         """Video processing function that runs in separate thread"""
         try:
-            self.processor = VideoProcessor(self.video_path.get())
-
-            def status_callback(message):
-                self.message_queue.put({"type": "progress", "message": message})
+            # Imported on first use, on this thread, so the window opens
+            # without waiting for moviepy, numpy and Pillow to load
+            from video_processor import ProcessCancelled, VideoProcessor
+        except Exception as e:
+            self.message_queue.put({"type": "error", "error": e})
+            return
 
-            self.processor.print_status = status_callback
+        try:
+            self.processor = VideoProcessor(self.video_path.get())
+            # Never blocks: a full buffer drops its oldest line
+            self.processor.print_status = self.log_buffer.append
+            self.processor.events.subscribe(self.progress)
 
             results = self.processor.process_video(
                 interval=self.interval.get(),
@@ -372,6 +424,8 @@ class VideoProcessorGUI:
 
             self.message_queue.put({"type": "result", "results": results})
 
+        except ProcessCancelled:
+            self.message_queue.put({"type": "cancelled"})
         except Exception as e:
             self.message_queue.put({"type": "error", "error": e})
 
@@ -387,9 +441,13 @@ class VideoProcessorGUI:
         self.process_button.state(["disabled"])
         self.stop_button.state(["!disabled"])  # Enable stop button
         self.results_text.delete(1.0, tk.END)
+        self.log_buffer.clear()
+        self.progress = ProgressTracker()
         self.progress_var.set("Starting processing...")
+        self.speed_var.set("")
 
-        # Show and start progress bar
+        # Show the progress bar, indeterminate until the frame count is known
+        self.progress_bar.configure(mode="indeterminate", value=0)
         self.progress_bar.grid()
         self.progress_bar.start(10)
 
@@ -423,8 +481,19 @@ def main():
     except Exception as e:
         print(f"Could not load icon: {e}")
 
+    ready_file = os.environ.get(config.STARTUP_READY_ENV)
+    if ready_file:
+        # Started by the startup benchmark: note when the window is up and quit
+        root.update()
+        with open(ready_file, "w") as f:
+            f.write(repr(time.time()))
+        root.destroy()
+        return
+
     root.mainloop()
 
 
 if __name__ == "__main__":
+    # Needed for segment worker processes in the PyInstaller build
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,348 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 2
+
+
+def encoding_signature(**params) -> str:
+    """Canonical string for the parameters that determine a frame's bytes"""
+    return json.dumps(params, sort_keys=True)
+
+
+def timestamp_key(t: float) -> str:
+    return f"{float(t):.3f}"
+
+
+def _atomic_write_json(path: str, data: Dict):
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _read_lines(path: str) -> Iterator[Dict]:
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except OSError:
+        return
+    with f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # The last line may be cut off by a crash
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+class ExtractionManifest:
+    """On-disk record of the frames already extracted into an output directory.
+
+    Each completed frame is stored with its file, size, SHA-256 and the
+    encoding signature it was written with, so a rerun can tell which frames
+    are still valid. Signatures are stored once per file and frames refer to
+    them by index.
+
+    Completed frames are appended to a journal next to the manifest as they
+    are recorded, and flush() compacts the journal into the manifest, which
+    is replaced atomically. Loading replays the journal, so a crash at worst
+    loses the line being written, whose frame is simply extracted again.
+
+    Segment workers each write their own shard next to the main manifest;
+    shards are read back on load and folded in by ``merge_shards``.
+    """
+
+    def __init__(self, output_dir: str, shard: Optional[str] = None):
+        self.output_dir = output_dir
+        self.shard = shard
+        self.source: Optional[Dict] = None
+        self.params: Dict = {}
+        # Parameters of the run that wrote the manifest before bind()
+        self.previous_params: Dict = {}
+        self.frames: Dict[str, Dict] = {}
+        # Encoding signatures, indexed by the "encoding" field of the frames
+        self.encodings: List[str] = []
+        self._encoding_ids: Dict[str, int] = {}
+
+        # _lock guards the records and _journal_lock the journal file; when
+        # both are needed _journal_lock is taken first
+        self._lock = threading.Lock()
+        self._journal_lock = threading.Lock()
+        self._journal = None
+        # Encodings already defined in the journal since it was opened
+        self._journal_encodings = set()
+        self._load()
+
+    @property
+    def path(self) -> str:
+        return self._snapshot_path(self.shard)
+
+    @property
+    def journal_path(self) -> str:
+        return self._journal_path(self.shard)
+
+    def _snapshot_path(self, shard: Optional[str]) -> str:
+        if shard:
+            return os.path.join(self.output_dir, f"manifest.{shard}.json")
+        return os.path.join(self.output_dir, MANIFEST_FILENAME)
+
+    def _journal_path(self, shard: Optional[str]) -> str:
+        if shard:
+            return os.path.join(self.output_dir, f"manifest.{shard}.jsonl")
+        return os.path.join(self.output_dir, "manifest.jsonl")
+
+    def _shard_paths(self) -> List[str]:
+        """Snapshots and journals of every shard, each shard's snapshot first"""
+        directory = glob.escape(self.output_dir)
+        paths = glob.glob(os.path.join(directory, "manifest.*.json"))
+        paths += glob.glob(os.path.join(directory, "manifest.*.jsonl"))
+        return sorted(paths)
+
+    def _encoding_id(self, signature: str) -> int:
+        encoding = self._encoding_ids.get(signature)
+        if encoding is None:
+            encoding = self._encoding_ids[signature] = len(self.encodings)
+            self.encodings.append(signature)
+        return encoding
+
+    def _accept(self, source: Optional[Dict], params: Optional[Dict]) -> bool:
+        """Whether records written for source belong to this manifest"""
+        if self.source is None:
+            self.source = source
+        if source != self.source:
+            return False
+        # The latest run's parameters win
+        if params is not None:
+            self.params = params
+        return True
+
+    def _add(self, key: str, entry: Dict, encodings: Optional[Dict[int, str]]):
+        # Version 1 manifests stored the signature itself in every frame
+        signature = entry.get("encoding")
+        if encodings is not None:
+            signature = encodings.get(signature)
+        if signature is None:
+            return
+        entry["encoding"] = self._encoding_id(signature)
+        self.frames[key] = entry
+
+    def _load_snapshot(self, path: str):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        version = data.get("version")
+        if version not in (1, MANIFEST_VERSION):
+            return
+        if not self._accept(data.get("source"), data.get("params", {})):
+            return
+        encodings = None
+        if version == MANIFEST_VERSION:
+            encodings = dict(enumerate(data.get("encodings", [])))
+        for key, entry in data.get("frames", {}).items():
+            self._add(key, entry, encodings)
+
+    def _load_journal(self, path: str):
+        # Every time a journal is opened it starts with a header, which
+        # begins a new numbering of the encodings
+        accepted = False
+        encodings: Dict[int, str] = {}
+        for line in _read_lines(path):
+            if "version" in line:
+                accepted = line["version"] == MANIFEST_VERSION and self._accept(
+                    line.get("source"), line.get("params")
+                )
+                encodings = {}
+            elif not accepted:
+                continue
+            elif "signature" in line:
+                encodings[line["encoding"]] = line["signature"]
+            elif "removed" in line:
+                self.frames.pop(line["removed"], None)
+            elif "t" in line:
+                key = line.pop("t")
+                self._add(key, line, encodings)
+
+    def _load(self):
+        main = [self._snapshot_path(None), self._journal_path(None)]
+        for path in main + self._shard_paths():
+            if path.endswith(".jsonl"):
+                self._load_journal(path)
+            else:
+                self._load_snapshot(path)
+
+    def bind(self, video_path: str, params: Dict):
+        """Attach to a video, discarding every record if the video changed"""
+        stat = os.stat(video_path)
+        source = {
+            "path": os.path.abspath(video_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+        }
+        with self._lock:
+            if source != self.source:
+                self.frames = {}
+            self.source = source
+            self.previous_params = self.params
+            self.params = params
+
+    def lookup(self, t: float, signature: str) -> Optional[Dict]:
+        """Return the record for t if its file is intact and still matches"""
+        entry = self.frames.get(timestamp_key(t))
+        if entry is None or entry["encoding"] != self._encoding_ids.get(signature):
+            return None
+
+        path = os.path.join(self.output_dir, entry["file"])
+        try:
+            if os.path.getsize(path) != entry["bytes"]:
+                return None
+        except OSError:
+            return None
+        return entry
+
+    def _append(self, line: Dict):
+        """Write one record to the journal, defining its encoding if needed"""
+        encoding = line.get("encoding")
+        with self._journal_lock:
+            if self._journal is None:
+                os.makedirs(self.output_dir, exist_ok=True)
+                self._journal = open(
+                    self.journal_path, "a", buffering=1, encoding="utf-8"
+                )
+                self._journal_encodings = set()
+                header = {
+                    "version": MANIFEST_VERSION,
+                    "source": self.source,
+                    "params": self.params,
+                }
+                self._journal.write(json.dumps(header) + "\n")
+            text = json.dumps(line) + "\n"
+            if encoding is not None and encoding not in self._journal_encodings:
+                signature = {
+                    "encoding": encoding,
+                    "signature": self.encodings[encoding],
+                }
+                text = json.dumps(signature) + "\n" + text
+                self._journal_encodings.add(encoding)
+            self._journal.write(text)
+
+    def record(
+        self,
+        t: float,
+        path: str,
+        data: bytes,
+        signature: str,
+        stats: Optional[Dict] = None,
+    ):
+        """Mark a frame as completed; safe to call from writer threads"""
+        key = timestamp_key(t)
+        entry = {
+            "file": os.path.relpath(path, self.output_dir),
+            "bytes": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+        }
+        if stats:
+            entry["stats"] = stats
+        with self._lock:
+            entry["encoding"] = self._encoding_id(signature)
+            previous = self.frames.get(key)
+            self.frames[key] = entry
+        self._append(dict(entry, t=key))
+
+        # A frame written again under another number leaves its old file behind
+        if previous is not None and previous["file"] != entry["file"]:
+            try:
+                os.remove(os.path.join(self.output_dir, previous["file"]))
+            except OSError:
+                pass
+
+    def move(self, t: float, path: str):
+        """Update the file recorded for t after it was renamed"""
+        key = timestamp_key(t)
+        with self._lock:
+            entry = self.frames[key]
+            entry["file"] = os.path.relpath(path, self.output_dir)
+            line = dict(entry, t=key)
+        self._append(line)
+
+    def prune(self, keep: Iterable[float], signature: str):
+        """Forget and delete frames that are not part of the current plan"""
+        keep_keys = {timestamp_key(t) for t in keep}
+        with self._lock:
+            encoding = self._encoding_ids.get(signature)
+            stale = [
+                (key, entry)
+                for key, entry in self.frames.items()
+                if key not in keep_keys or entry["encoding"] != encoding
+            ]
+            for key, _ in stale:
+                del self.frames[key]
+
+        for key, entry in stale:
+            try:
+                os.remove(os.path.join(self.output_dir, entry["file"]))
+            except OSError:
+                pass
+            self._append({"removed": key})
+
+    def flush(self):
+        """Compact the journal into the manifest file"""
+        with self._journal_lock:
+            with self._lock:
+                data = self._snapshot()
+            self._write_snapshot(data, [self.journal_path])
+
+    def _snapshot(self) -> Dict:
+        # Only the encodings still in use are written, renumbered from 0
+        used = sorted({entry["encoding"] for entry in self.frames.values()})
+        renumber = {encoding: i for i, encoding in enumerate(used)}
+        return {
+            "version": MANIFEST_VERSION,
+            "source": self.source,
+            "params": self.params,
+            "encodings": [self.encodings[encoding] for encoding in used],
+            "frames": {
+                key: dict(entry, encoding=renumber[entry["encoding"]])
+                for key, entry in self.frames.items()
+            },
+        }
+
+    def _write_snapshot(self, data: Dict, replaced: List[str]):
+        """Write the manifest file, then remove the files it supersedes"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        os.makedirs(self.output_dir, exist_ok=True)
+        _atomic_write_json(self.path, data)
+        for path in replaced:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def merge_shards(self):
+        """Fold segment shards into the main manifest and remove them"""
+        with self._journal_lock:
+            with self._lock:
+                shards = self._shard_paths()
+                for path in shards:
+                    if path.endswith(".jsonl"):
+                        self._load_journal(path)
+                    else:
+                        self._load_snapshot(path)
+                data = self._snapshot()
+            self._write_snapshot(data, [self.journal_path] + shards)
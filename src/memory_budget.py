@@ -0,0 +1,107 @@
+import threading
+from typing import Callable, Tuple
+
+# How long a throttled decoder waits before re-checking for cancellation
+_POLL_INTERVAL = 0.1
+
+
+def frame_cost(shape: Tuple[int, ...], encoded: bool = True) -> int:
+    """Most memory one frame needs on its way through the pipeline.
+
+    That is the decoded pixels plus, when the frame is encoded, Pillow's copy
+    of them (RGB is stored with 4 bytes per pixel) and the encoded file,
+    which is assumed to be no larger than the pixels.
+    """
+    pixels = shape[0] * shape[1]
+    nbytes = pixels * (shape[2] if len(shape) > 2 else 1)
+    if not encoded:
+        return nbytes
+    image = pixels * 4 if len(shape) > 2 else pixels
+    return 2 * nbytes + image
+
+
+class MemoryBudget:
+    """Upper bound on the bytes of frames in flight, shared between videos.
+
+    Every extraction using the budget reserves a frame's cost before
+    decoding it and gives it back once the frame is written, so when the
+    budget is used up decoding waits until encoders and writers catch up.
+    Share one budget between the VideoProcessors of concurrent videos to
+    bound all of them together. A frame is always let through when nothing
+    else is in flight, even if it is larger than the whole budget.
+    """
+
+    def __init__(self, max_bytes: int):
+        if max_bytes <= 0:
+            raise ValueError(f"Memory budget must be positive, got {max_bytes}")
+        self.max_bytes = max_bytes
+        self.in_use = 0
+        # Most bytes in flight at once since the budget was created
+        self.peak = 0
+        self._available = threading.Condition()
+
+    def acquire(
+        self, nbytes: int, is_cancelled: Callable[[], bool] = lambda: False
+    ) -> bool:
+        """Wait until nbytes fit; returns False if cancelled while waiting"""
+        with self._available:
+            while self.in_use and self.in_use + nbytes > self.max_bytes:
+                if is_cancelled():
+                    return False
+                self._available.wait(_POLL_INTERVAL)
+            self.in_use += nbytes
+            self.peak = max(self.peak, self.in_use)
+        return True
+
+    def release(self, nbytes: int):
+        with self._available:
+            self.in_use -= nbytes
+            self._available.notify_all()
+
+    def reserve(self) -> "MemoryReservation":
+        return MemoryReservation(self)
+
+    def snapshot(self) -> dict:
+        with self._available:
+            return {
+                "budget_bytes": self.max_bytes,
+                "in_use_bytes": self.in_use,
+                "peak_bytes": self.peak,
+            }
+
+
+class MemoryReservation:
+    """The part of a MemoryBudget held by one extraction.
+
+    Keeps its own peak for the report, and close() returns whatever frames
+    dropped by a cancelled or failed run still held.
+    """
+
+    def __init__(self, budget: MemoryBudget):
+        self.budget = budget
+        self.held = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def acquire(
+        self, nbytes: int, is_cancelled: Callable[[], bool] = lambda: False
+    ) -> bool:
+        if not self.budget.acquire(nbytes, is_cancelled):
+            return False
+        with self._lock:
+            self.held += nbytes
+            self.peak = max(self.peak, self.held)
+        return True
+
+    def release(self, nbytes: int):
+        with self._lock:
+            nbytes = min(nbytes, self.held)
+            self.held -= nbytes
+        if nbytes:
+            self.budget.release(nbytes)
+
+    def close(self):
+        with self._lock:
+            held, self.held = self.held, 0
+        if held:
+            self.budget.release(held)
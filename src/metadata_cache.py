@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import config as config
+
+
+class MetadataCache:
+    """Persistent LRU cache of ffmpeg probe results.
+
+    Entries are keyed by absolute path, file size and modification time, so
+    an edited or replaced video simply misses and the stale entry ages out.
+    Lookups only reorder entries in memory; the file is rewritten atomically
+    whenever an entry is added.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        self.path = path or os.path.join(config.CACHE_DIR, "metadata_cache.json")
+        self.max_entries = max_entries or config.METADATA_CACHE_SIZE
+        self._entries: Optional[OrderedDict] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(video_path: str) -> str:
+        stat = os.stat(video_path)
+        return f"{os.path.abspath(video_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    def _load(self) -> OrderedDict:
+        if self._entries is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = OrderedDict(json.load(f))
+            except (OSError, ValueError):
+                self._entries = OrderedDict()
+        return self._entries
+
+    def get(self, video_path: str) -> Optional[Dict]:
+        key = self.key_for(video_path)
+        with self._lock:
+            entries = self._load()
+            if key not in entries:
+                return None
+            entries.move_to_end(key)
+            return entries[key]
+
+    def put(self, video_path: str, infos: Dict):
+        key = self.key_for(video_path)
+        with self._lock:
+            entries = self._load()
+            entries[key] = infos
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self._save(entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+            self._save(self._entries)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+    def _save(self, entries: OrderedDict):
+        try:
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # The cache is an optimization; an unwritable location just means
+            # the next run probes again
+            pass
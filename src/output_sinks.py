@@ -0,0 +1,321 @@
+import glob
+import io
+import json
+import mmap
+import os
+import struct
+import tarfile
+import time
+import zipfile
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+OUTPUT_TYPES = ("files", "sprites", "zip", "tar", "npy")
+ARCHIVE_KINDS = ("zip", "tar")
+
+# Member written last into every archive, listing where each frame's bytes are
+ARCHIVE_INDEX = "index.json"
+
+SHARDS_DIRNAME = "shards"
+SHARD_INDEX = "index.json"
+DEFAULT_SHARD_FRAMES = 1000
+
+# Shard headers are padded to this size so they can be rewritten in place
+_NPY_HEADER_SIZE = 128
+
+
+class OutputSink:
+    """Destination for extracted frames.
+
+    ``write`` is called from the pipeline's writer threads with the encoded
+    image bytes, or with the decoded frame when ``encoded`` is False, and
+    returns where the frame went and how many bytes it takes up there, or
+    None if it has no bytes of its own, like a sprite tile. The frame's
+    statistics are passed along for sinks that keep their own index.
+    ``close`` finishes the output and returns a summary for the report.
+    """
+
+    # Whether write expects encoded image bytes instead of the raw frame
+    encoded = True
+    # Whether frames must arrive one at a time in timestamp order
+    ordered = False
+    # Whether several writer threads may call write at once
+    concurrent = False
+
+    def write(
+        self, idx: int, t: float, payload, stats: Optional[Dict] = None
+    ) -> Tuple[str, Optional[int]]:
+        raise NotImplementedError
+
+    def close(self, duration: float) -> Optional[Dict]:
+        return None
+
+
+class FileSink(OutputSink):
+    """One image file per frame, recorded in the extraction manifest"""
+
+    concurrent = True
+
+    def __init__(
+        self,
+        frames_dir: str,
+        name_frame: Callable[[int, float], str],
+        manifest=None,
+        signature: Optional[str] = None,
+    ):
+        self.frames_dir = frames_dir
+        self.name_frame = name_frame
+        self.manifest = manifest
+        self.signature = signature
+        os.makedirs(frames_dir, exist_ok=True)
+
+    def write(
+        self, idx: int, t: float, data: bytes, stats: Optional[Dict] = None
+    ) -> Tuple[str, int]:
+        path = os.path.join(self.frames_dir, self.name_frame(idx, t))
+        with open(path, "wb") as f:
+            f.write(data)
+        if self.manifest is not None:
+            self.manifest.record(t, path, data, self.signature, stats)
+        return path, len(data)
+
+
+class ArchiveSink(OutputSink):
+    """Encoded frames streamed into a single uncompressed zip or tar file.
+
+    Members are stored rather than deflated, so every image sits contiguously
+    in the archive. The index member written last records each frame's
+    timestamp, data offset and size, which ``ArchiveFrames`` uses to serve
+    frames as slices of a memory map.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        name_frame: Callable[[int, float], str],
+        kind: str = "zip",
+    ):
+        if kind not in ARCHIVE_KINDS:
+            raise ValueError(
+                f"Unknown archive kind {kind!r}, expected one of {ARCHIVE_KINDS}"
+            )
+        self.kind = kind
+        self.name_frame = name_frame
+        self.path = os.path.join(output_dir, f"frames.{kind}")
+        self.entries: List[Dict] = []
+
+        self._file = open(self.path, "wb")
+        if kind == "zip":
+            self._archive = zipfile.ZipFile(
+                self._file, "w", compression=zipfile.ZIP_STORED, allowZip64=True
+            )
+        else:
+            self._archive = tarfile.open(fileobj=self._file, mode="w")
+
+    def _add(self, name: str, data: bytes) -> int:
+        """Append a member and return the offset of its data"""
+        if self.kind == "zip":
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            self._archive.writestr(info, data)
+            # Stored data ends exactly where the file position is left
+            return self._file.tell() - len(data)
+
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self._archive.addfile(info, io.BytesIO(data))
+        # The data is padded to whole blocks and directly precedes that offset
+        blocks = -(-len(data) // tarfile.BLOCKSIZE)
+        return self._archive.offset - blocks * tarfile.BLOCKSIZE
+
+    def write(
+        self, idx: int, t: float, data: bytes, stats: Optional[Dict] = None
+    ) -> Tuple[str, int]:
+        name = self.name_frame(idx, t)
+        offset = self._add(name, data)
+        self.entries.append(
+            {"timestamp": t, "name": name, "offset": offset, "size": len(data)}
+        )
+        return os.path.join(self.path, name), len(data)
+
+    def close(self, duration: float) -> Dict:
+        self.entries.sort(key=lambda entry: entry["timestamp"])
+        index = json.dumps({"frames": self.entries}).encode("utf-8")
+        self._add(ARCHIVE_INDEX, index)
+        self._archive.close()
+        self._file.close()
+        return {
+            "file": self.path,
+            "format": self.kind,
+            "frames": len(self.entries),
+            "bytes": os.path.getsize(self.path),
+        }
+
+
+class ArchiveFrames:
+    """Zero-copy read access to an archive written by ArchiveSink.
+
+    Frames are returned as memoryviews into a read-only memory map of the
+    archive; release them before calling ``close``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                index = json.loads(archive.read(ARCHIVE_INDEX))
+        else:
+            with tarfile.open(path) as archive:
+                index = json.load(archive.extractfile(ARCHIVE_INDEX))
+
+        self.entries = index["frames"]
+        self.timestamps = [entry["timestamp"] for entry in self.entries]
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, i: int) -> memoryview:
+        entry = self.entries[i]
+        start = entry["offset"]
+        return memoryview(self._map)[start : start + entry["size"]]
+
+    def close(self):
+        self._map.close()
+
+
+def _npy_header(shape: Tuple[int, ...]) -> bytes:
+    """A version 1.0 .npy header for uint8 data, padded to a fixed size"""
+    header = repr({"descr": "|u1", "fortran_order": False, "shape": shape})
+    # Magic, version and length field take 10 bytes; the header ends in \n
+    width = _NPY_HEADER_SIZE - 10 - 1
+    if len(header) > width:
+        raise ValueError(f"Frame shape {shape} is too large for a shard header")
+    header = header.ljust(width) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode()
+
+
+class ShardSink(OutputSink):
+    """Raw uint8 frames in fixed-size .npy shards.
+
+    Frames are appended to the open shard as they arrive, so nothing is
+    buffered. Each shard's header is written up front for a full shard and
+    rewritten in place if the last one ends short. The index lists every
+    shard with the timestamps of its frames; ``ShardedFrames`` opens the
+    shards as memory maps.
+    """
+
+    encoded = False
+
+    def __init__(self, output_dir: str, frames_per_shard: int = DEFAULT_SHARD_FRAMES):
+        if frames_per_shard < 1:
+            raise ValueError("frames_per_shard must be at least 1")
+        self.directory = os.path.join(output_dir, SHARDS_DIRNAME)
+        self.frames_per_shard = frames_per_shard
+        self.shards: List[Dict] = []
+        self.frame_shape: Optional[Tuple[int, ...]] = None
+        self._file = None
+
+        os.makedirs(self.directory, exist_ok=True)
+        # Shards left by an earlier, longer run would otherwise linger
+        for stale in glob.glob(os.path.join(glob.escape(self.directory), "shard_*")):
+            os.remove(stale)
+
+    def write(
+        self, idx: int, t: float, frame: np.ndarray, stats: Optional[Dict] = None
+    ) -> Tuple[str, int]:
+        if self.frame_shape is None:
+            self.frame_shape = frame.shape
+        elif frame.shape != self.frame_shape:
+            raise ValueError(
+                f"Frame shape {frame.shape} differs from {self.frame_shape}"
+            )
+
+        if self._file is None:
+            name = f"shard_{len(self.shards):04d}.npy"
+            self._file = open(os.path.join(self.directory, name), "wb")
+            self._file.write(_npy_header((self.frames_per_shard,) + frame.shape))
+            self.shards.append({"file": name, "timestamps": []})
+
+        shard = self.shards[-1]
+        # Already contiguous uint8 frames are written straight from their buffer
+        data = np.ascontiguousarray(frame, dtype=np.uint8)
+        self._file.write(data)
+        shard["timestamps"].append(t)
+        location = f"{os.path.join(self.directory, shard['file'])}[{len(shard['timestamps']) - 1}]"
+
+        if len(shard["timestamps"]) == self.frames_per_shard:
+            self._close_shard()
+        return location, data.nbytes
+
+    def _close_shard(self):
+        count = len(self.shards[-1]["timestamps"])
+        if count < self.frames_per_shard:
+            self._file.seek(0)
+            self._file.write(_npy_header((count,) + self.frame_shape))
+        self._file.close()
+        self._file = None
+
+    def close(self, duration: float) -> Dict:
+        if self._file is not None:
+            self._close_shard()
+
+        index = {
+            "dtype": "uint8",
+            "frame_shape": list(self.frame_shape or ()),
+            "frames_per_shard": self.frames_per_shard,
+            "shards": self.shards,
+        }
+        with open(os.path.join(self.directory, SHARD_INDEX), "w") as f:
+            json.dump(index, f)
+
+        return {
+            "directory": self.directory,
+            "frame_shape": index["frame_shape"],
+            "frames": sum(len(shard["timestamps"]) for shard in self.shards),
+            "shards": [
+                {
+                    "file": shard["file"],
+                    "frames": len(shard["timestamps"]),
+                    "bytes": os.path.getsize(
+                        os.path.join(self.directory, shard["file"])
+                    ),
+                }
+                for shard in self.shards
+            ],
+        }
+
+
+class ShardedFrames:
+    """Memory-mapped read access to shards written by ShardSink.
+
+    Indexing returns a read-only view into the shard holding the frame, so
+    frames are only paged in from disk when their pixels are touched.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, SHARD_INDEX), "r") as f:
+            index = json.load(f)
+
+        self.shards = [
+            np.load(os.path.join(directory, shard["file"]), mmap_mode="r")
+            for shard in index["shards"]
+        ]
+        self.timestamps = np.array(
+            [t for shard in index["shards"] for t in shard["timestamps"]]
+        )
+        self._starts = np.cumsum([0] + [len(shard) for shard in self.shards])
+
+    def __len__(self) -> int:
+        return int(self._starts[-1])
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        shard = int(np.searchsorted(self._starts, i, side="right")) - 1
+        return self.shards[shard][i - self._starts[shard]]
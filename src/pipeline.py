@@ -0,0 +1,150 @@
+import os
+import queue
+import threading
+from typing import Any, Callable, Iterable, Optional
+
+# Sentinel telling a stage worker that no more items will arrive
+_DONE = object()
+
+# How long blocked queue operations wait before re-checking for cancellation
+_POLL_INTERVAL = 0.1
+
+
+def default_workers() -> int:
+    return min(4, os.cpu_count() or 1)
+
+
+class FramePipeline:
+    """Run decode, encode and write as separate stages.
+
+    The caller's thread is the decoder: it pulls items from the iterable
+    passed to ``run``. A pool of encoder threads and a pool of writer threads
+    sit behind bounded queues, so a slow disk or slow encoder throttles
+    decoding instead of letting frames pile up in memory. Items reach the
+    writers roughly in the order they were produced; writers that need a
+    strict order, like the frame log, restore it themselves.
+
+    on_queue, if given, is called with the queue name ("encode" or "write")
+    and its depth after every item put into it.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[Any], Any],
+        write: Callable[[Any], Any],
+        workers: Optional[int] = None,
+        writers: int = 1,
+        queue_size: Optional[int] = None,
+        is_cancelled: Callable[[], bool] = lambda: False,
+        on_queue: Optional[Callable[[str, int], None]] = None,
+    ):
+        self.encode = encode
+        self.write = write
+        self.workers = max(1, workers or default_workers())
+        self.writers = max(1, writers)
+        self.queue_size = queue_size or self.workers * 2
+        self.is_cancelled = is_cancelled
+        self.on_queue = on_queue
+
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+
+    def _fail(self, error: BaseException):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+    def _should_stop(self) -> bool:
+        if not self._stop.is_set() and self.is_cancelled():
+            self._stop.set()
+        return self._stop.is_set()
+
+    def _put(self, q: queue.Queue, item, name: Optional[str] = None) -> bool:
+        """Put with backpressure, giving up if the pipeline is stopping"""
+        while not self._should_stop():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+            except queue.Full:
+                continue
+            if name is not None and self.on_queue is not None:
+                self.on_queue(name, q.qsize())
+            return True
+        return False
+
+    def _get(self, q: queue.Queue):
+        while not self._should_stop():
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _encode_worker(self, in_q: queue.Queue, out_q: queue.Queue):
+        while True:
+            entry = self._get(in_q)
+            if entry is _DONE:
+                return
+            try:
+                encoded = self.encode(entry)
+            except BaseException as e:
+                self._fail(e)
+                return
+            if encoded is not None and not self._put(out_q, encoded, "write"):
+                return
+
+    def _write_worker(self, in_q: queue.Queue):
+        while True:
+            entry = self._get(in_q)
+            if entry is _DONE:
+                return
+            try:
+                self.write(entry)
+            except BaseException as e:
+                self._fail(e)
+                return
+
+    def run(self, items: Iterable[Any]):
+        """Feed items through the stages until they are all written.
+
+        Items for which ``encode`` returns None are dropped. Writers record
+        their results themselves, so nothing is kept per item. If the
+        pipeline was stopped by cancellation this returns early and the
+        caller is expected to check its own cancel flag; errors raised by a
+        stage are re-raised here.
+        """
+        encode_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        write_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        encoders = [
+            threading.Thread(
+                target=self._encode_worker, args=(encode_q, write_q), daemon=True
+            )
+            for _ in range(self.workers)
+        ]
+        writers = [
+            threading.Thread(target=self._write_worker, args=(write_q,), daemon=True)
+            for _ in range(self.writers)
+        ]
+        for thread in encoders + writers:
+            thread.start()
+
+        try:
+            for item in items:
+                if not self._put(encode_q, item, "encode"):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in encoders:
+                self._put(encode_q, _DONE)
+            for thread in encoders:
+                thread.join()
+            for _ in writers:
+                self._put(write_q, _DONE)
+            for thread in writers:
+                thread.join()
+
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,99 @@
+from typing import Optional
+
+import numpy as np
+
+SCENE_METRICS = ("histogram", "pixel")
+
+# Frames are scored on a copy about this wide, taken by striding the array
+ANALYSIS_WIDTH = 160
+
+HISTOGRAM_BINS = 32
+
+
+def analysis_luma(frame: np.ndarray, width: int = ANALYSIS_WIDTH) -> np.ndarray:
+    """Downscaled 8-bit luma of an RGB frame, using integer BT.601 weights"""
+    step = max(1, frame.shape[1] // width)
+    small = frame[::step, ::step]
+    if small.ndim == 2:
+        return small
+    small = small.astype(np.uint16)
+    luma = small[..., 0] * 77 + small[..., 1] * 150 + small[..., 2] * 29
+    return (luma >> 8).astype(np.uint8)
+
+
+class SceneDetector:
+    """Decide which frames of a sequential decode start a new scene.
+
+    Consecutive frames are compared on a downscaled luma copy, either by the
+    distance between their brightness histograms or by their mean absolute
+    pixel difference. Both scores are normalized to [0, 1]. A frame is kept
+    when its score reaches the threshold and at least min_gap seconds passed
+    since the last kept frame, or unconditionally once max_gap seconds passed.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.35,
+        min_gap: float = 1.0,
+        max_gap: Optional[float] = None,
+        metric: str = "histogram",
+    ):
+        if metric not in SCENE_METRICS:
+            raise ValueError(
+                f"Unknown scene metric {metric!r}, expected one of {SCENE_METRICS}"
+            )
+        if max_gap is not None and max_gap < min_gap:
+            raise ValueError("max_gap must not be smaller than min_gap")
+
+        self.threshold = threshold
+        self.min_gap = min_gap
+        self.max_gap = max_gap
+        self.metric = metric
+
+        self._previous = None
+        self._last_kept: Optional[float] = None
+
+    def _features(self, frame: np.ndarray) -> np.ndarray:
+        luma = analysis_luma(frame)
+        if self.metric == "histogram":
+            counts = np.bincount(
+                (luma // (256 // HISTOGRAM_BINS)).ravel(), minlength=HISTOGRAM_BINS
+            )
+            return counts / luma.size
+        return luma.astype(np.int16)
+
+    def _distance(self, a: np.ndarray, b: np.ndarray) -> float:
+        if self.metric == "histogram":
+            return float(np.abs(a - b).sum() / 2)
+        return float(np.abs(a - b).mean() / 255)
+
+    def feed(self, t: float, frame: np.ndarray) -> Optional[float]:
+        """Score a frame against the previous one.
+
+        Returns the score if the frame should be kept, otherwise None. The
+        first frame is always kept with a score of 1.0.
+        """
+        features = self._features(frame)
+        previous, self._previous = self._previous, features
+
+        if previous is None:
+            score = 1.0
+        else:
+            score = self._distance(previous, features)
+
+        if self._last_kept is not None:
+            gap = t - self._last_kept
+            forced = self.max_gap is not None and gap >= self.max_gap
+            if not forced and (score < self.threshold or gap < self.min_gap):
+                return None
+
+        self._last_kept = t
+        return score
+
+    def settings(self) -> dict:
+        return {
+            "threshold": self.threshold,
+            "min_gap": self.min_gap,
+            "max_gap": self.max_gap,
+            "metric": self.metric,
+        }
@@ -0,0 +1,155 @@
+import glob
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from encoders import DEFAULT_PROFILE, save_image
+from output_sinks import OutputSink
+
+SPRITES_DIRNAME = "sprites"
+VTT_FILENAME = "thumbnails.vtt"
+
+
+def format_vtt_time(seconds: float) -> str:
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600 * 1000)
+    minutes, millis = divmod(millis, 60 * 1000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+
+class SpriteSheetWriter(OutputSink):
+    """Tile frames into fixed-grid sprite sheets as they arrive.
+
+    Only the sheet being filled is kept in memory; it is encoded and written
+    as soon as its last cell is used. A WebVTT thumbnail track mapping each
+    frame's time range to its tile ("sheet.jpg#xywh=x,y,w,h") is written
+    alongside, one cue behind so every cue knows when the next frame starts.
+    Frames must be added in timestamp order.
+    """
+
+    encoded = False
+    ordered = True
+
+    def __init__(
+        self,
+        output_dir: str,
+        grid: Tuple[int, int] = (10, 10),
+        tile_size: Tuple[Optional[int], Optional[int]] = (160, None),
+        output_format: str = "jpg",
+        quality: int = 85,
+        profile: str = DEFAULT_PROFILE,
+    ):
+        self.sprites_dir = os.path.join(output_dir, SPRITES_DIRNAME)
+        self.columns, self.rows = grid
+        self.tile_size = tile_size
+        self.output_format = output_format.lower()
+        self.quality = quality
+        self.profile = profile
+
+        self.sheets: List[Dict] = []
+        self._sheet: Optional[np.ndarray] = None
+        self._cell = 0
+        self._tile: Optional[Tuple[int, int]] = None
+        self._pending_cue: Optional[Tuple[float, str]] = None
+
+        os.makedirs(self.sprites_dir, exist_ok=True)
+        # Sheets left by an earlier, longer run would otherwise linger
+        for stale in glob.glob(os.path.join(glob.escape(self.sprites_dir), "sprite_*")):
+            os.remove(stale)
+
+        self.vtt_path = os.path.join(self.sprites_dir, VTT_FILENAME)
+        self._vtt = open(self.vtt_path, "w", encoding="utf-8")
+        self._vtt.write("WEBVTT\n\n")
+
+    @property
+    def per_sheet(self) -> int:
+        return self.columns * self.rows
+
+    def _sheet_path(self, number: int) -> str:
+        return os.path.join(
+            self.sprites_dir, f"sprite_{number:04d}.{self.output_format}"
+        )
+
+    def add(self, t: float, frame: np.ndarray) -> Tuple[str, Tuple[int, int, int, int]]:
+        """Place a frame in the next cell and return (sheet path, x/y/w/h box)"""
+        if self._tile is None:
+            # A missing tile dimension follows the first frame's aspect ratio
+            width, height = self.tile_size
+            self._tile = (width or frame.shape[1], height or frame.shape[0])
+        tile_w, tile_h = self._tile
+
+        if self._sheet is None:
+            shape = (self.rows * tile_h, self.columns * tile_w) + frame.shape[2:]
+            self._sheet = np.zeros(shape, dtype=np.uint8)
+            self.sheets.append(
+                {
+                    "file": os.path.basename(self._sheet_path(len(self.sheets) + 1)),
+                    "first_timestamp": t,
+                    "tiles": 0,
+                }
+            )
+
+        row, column = divmod(self._cell, self.columns)
+        x, y = column * tile_w, row * tile_h
+
+        # Frames smaller than the cell (aspect "fit") are centred in it
+        h, w = min(frame.shape[0], tile_h), min(frame.shape[1], tile_w)
+        dx, dy = (tile_w - w) // 2, (tile_h - h) // 2
+        self._sheet[y + dy : y + dy + h, x + dx : x + dx + w] = frame[:h, :w]
+
+        sheet = self.sheets[-1]
+        sheet["tiles"] += 1
+        sheet["last_timestamp"] = t
+        sheet_path = self._sheet_path(len(self.sheets))
+        self._write_cue(t, f"{sheet['file']}#xywh={x},{y},{tile_w},{tile_h}")
+
+        self._cell += 1
+        if self._cell == self.per_sheet:
+            self._flush_sheet()
+        return sheet_path, (x, y, tile_w, tile_h)
+
+    def write(
+        self, idx: int, t: float, frame: np.ndarray, stats: Optional[Dict] = None
+    ) -> Tuple[str, Optional[int]]:
+        # A tile has no size of its own; the sheets' sizes are in the summary
+        sheet_path, _ = self.add(t, frame)
+        return sheet_path, None
+
+    def _write_cue(self, t: float, target: Optional[str]):
+        if self._pending_cue is not None:
+            start, pending_target = self._pending_cue
+            self._vtt.write(
+                f"{format_vtt_time(start)} --> {format_vtt_time(t)}\n"
+                f"{pending_target}\n\n"
+            )
+        self._pending_cue = (t, target) if target is not None else None
+
+    def _flush_sheet(self):
+        if self._sheet is None:
+            return
+        image = Image.fromarray(self._sheet)
+        path = self._sheet_path(len(self.sheets))
+        save_image(image, path, self.output_format, self.quality, self.profile)
+        self.sheets[-1]["bytes"] = os.path.getsize(path)
+        self._sheet = None
+        self._cell = 0
+
+    def close(self, duration: float) -> Dict:
+        """Write the last partial sheet and cue, and return a summary"""
+        self._flush_sheet()
+        if self._pending_cue is not None:
+            self._write_cue(max(duration, self._pending_cue[0]), None)
+        self._vtt.close()
+
+        tile_w, tile_h = self._tile or (None, None)
+        return {
+            "directory": self.sprites_dir,
+            "vtt": os.path.basename(self.vtt_path),
+            "grid": [self.columns, self.rows],
+            "tile_size": [tile_w, tile_h],
+            "format": self.output_format,
+            "sheets": self.sheets,
+        }
@@ -1,10 +1,106 @@
 import os
-from moviepy.editor import VideoFileClip
 from PIL import Image
 import numpy as np
 import datetime
-from typing import Tuple, List, Dict
+import collections
+import math
+from typing import Callable, Deque, Tuple, List, Dict, Iterator, Optional
+import glob
 import json
+import multiprocessing
+import queue
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from frame_cache import FrameCache
+from frame_log import (
+    FRAME_LOG_FILENAME,
+    FrameLog,
+    clear_frame_logs,
+    frame_log_path,
+    load_frame_stats,
+    merge_frame_logs,
+    read_frame_log,
+)
+from frame_reader import FrameReader, output_geometry, probe_video
+from keyframes import KeyframeIndex, choose_seek_strategy
+from manifest import ExtractionManifest, encoding_signature
+from memory_budget import MemoryBudget, frame_cost
+from metadata_cache import MetadataCache
+from pipeline import FramePipeline, default_workers
+from encoders import (
+    DEFAULT_PROFILE,
+    OUTPUT_FORMATS,
+    benchmark_encoders,
+    configure_image_memory,
+    encode_image,
+    save_options,
+)
+from events import ChromeTraceWriter, EventBus, EventForwarder, TimingCollector
+from scene_detect import SceneDetector
+from frame_hash import DuplicateFilter, HashIndex
+from frame_stats import FrameStats, frame_statistics, sharpness
+from output_sinks import (
+    ARCHIVE_KINDS,
+    DEFAULT_SHARD_FRAMES,
+    OUTPUT_TYPES,
+    ArchiveSink,
+    FileSink,
+    OutputSink,
+    ShardSink,
+)
+from sprite_sheet import SpriteSheetWriter
+
+EXTRACTION_MODES = ("interval", "scene", "sharpest")
+
+
+def decode_options(
+    target_size: Optional[Tuple[Optional[int], Optional[int]]] = None,
+    crop: Optional[Tuple[int, int, int, int]] = None,
+    aspect: str = "fit",
+    grayscale: bool = False,
+) -> Dict:
+    """Bundle the options FrameReader applies inside ffmpeg while decoding"""
+    return {
+        "target_size": tuple(target_size) if target_size else None,
+        "crop": tuple(crop) if crop else None,
+        "aspect": aspect,
+        "grayscale": grayscale,
+    }
+
+
+def output_variant(
+    subfolder: str,
+    output_format: str = "png",
+    quality: int = 95,
+    size: Optional[Tuple[Optional[int], Optional[int]]] = None,
+    encoder_profile: str = DEFAULT_PROFILE,
+) -> Dict:
+    """Bundle the settings of an extra output encoded from the same frames.
+
+    size is (width, height) like target_size and keeps the aspect ratio
+    when one side is None. The images go to output_dir/subfolder.
+    """
+    folder = os.path.normpath(subfolder) if subfolder else ""
+    # Kept inside the output directory, apart from the frames, since it is
+    # cleared before every run
+    if (
+        folder in ("", ".", "frames")
+        or os.path.isabs(folder)
+        or folder.split(os.sep)[0] == os.pardir
+    ):
+        raise ValueError(f"Invalid variant subfolder {subfolder!r}")
+    # Rejects unknown formats and profiles before anything is decoded
+    save_options(output_format, quality, encoder_profile)
+    return {
+        "subfolder": subfolder,
+        "output_format": output_format.lower(),
+        "quality": quality,
+        "size": tuple(size) if size else None,
+        "encoder_profile": encoder_profile,
+    }
 
 
 class VideoProcessor:
@@ -13,28 +109,113 @@ class VideoProcessor:
         self.output_dir = os.path.join(os.path.dirname(video_path), "processed_output")
         self.print_status = print
         self.should_cancel = False
+        # Shared event set by the parent process when running as a segment worker
+        self.cancel_event = None
+        # Set to None to always probe the video
+        self.metadata_cache = MetadataCache()
+        # Set to a FrameCache to keep decoded frames for later runs
+        self.frame_cache: Optional[FrameCache] = None
+        # Set to a MemoryBudget, possibly shared with other processors, to
+        # bound the frames in flight
+        self.memory_budget: Optional[MemoryBudget] = None
+        self._reader = None
+        self._in_session = False
+        # Timestamps and scores chosen by the last scene-mode extraction
+        self.scene_log = []
+        # Frames skipped as near-duplicates by the last extraction
+        self.duplicate_log = []
+        # Candidate picked in each window by the last sharpest-mode extraction
+        self.sharpness_log = []
+        # What the last extraction's output sink wrote, unless it wrote files
+        self.output_summary = None
+        # Per-frame records of the current or last extraction
+        self.frame_log: Optional[FrameLog] = None
+        # Size and image statistics of every frame of the last analyzed
+        # extraction, and the sizes written for each output variant
+        self.frame_stats = FrameStats()
+        self.variant_stats: List[FrameStats] = []
+        # Structured progress and timing events; see events.EventBus
+        self.events = EventBus()
 
     def cancel_processing(self):
-        """Set flag to cancel processing"""
+        """Set flag to cancel processing, including a run not started yet"""
         self.should_cancel = True
 
+    def is_cancelled(self) -> bool:
+        """Check the local cancel flag and the parent's cancel event"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return True
+        return self.should_cancel
+
     def check_cancelled(self):
         """Check if processing should be cancelled and raise exception if so"""
-        if self.should_cancel:
+        if self.is_cancelled():
             raise ProcessCancelled("Processing was cancelled by user")
 
+    def probe(self) -> Dict:
+        """Return ffmpeg's infos for the video, from the cache when possible"""
+        if self.metadata_cache is not None:
+            infos = self.metadata_cache.get(self.video_path)
+            if infos is not None:
+                return infos
+
+        infos = probe_video(self.video_path)
+        if self.metadata_cache is not None:
+            self.metadata_cache.put(self.video_path, infos)
+        return infos
+
+    def open_reader(self, decode: Optional[Dict] = None) -> FrameReader:
+        """Open a reader; decode holds FrameReader's crop/scale/grayscale options"""
+        return FrameReader(self.video_path, infos=self.probe(), **(decode or {}))
+
+    @contextmanager
+    def reader_session(self):
+        """Share one reader between every stage run inside the block"""
+        if self._in_session:
+            yield
+            return
+
+        self._in_session = True
+        try:
+            yield
+        finally:
+            self._in_session = False
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    @contextmanager
+    def borrow_reader(self, decode: Optional[Dict] = None):
+        """Use the session's reader, or a private one outside a session"""
+        if self._in_session:
+            # Opened lazily so a cached metadata lookup never starts ffmpeg
+            decode = decode or decode_options()
+            if self._reader is not None and self._reader.decode_options != decode:
+                self._reader.close()
+                self._reader = None
+            if self._reader is None:
+                self._reader = self.open_reader(decode)
+            yield self._reader
+            return
+
+        reader = self.open_reader(decode)
+        try:
+            yield reader
+        finally:
+            reader.close()
+
     def get_video_metadata(self) -> Dict:
         self.check_cancelled()
-        with VideoFileClip(self.video_path) as video:
-            metadata = {
-                "duration": video.duration,
-                "fps": video.fps,
-                "resolution": video.size,
-                "filename": os.path.basename(self.video_path),
-                "filesize_mb": os.path.getsize(self.video_path) / (1024 * 1024),
-                "format": os.path.splitext(self.video_path)[1],
-                "analyzed_at": datetime.datetime.now().isoformat(),
-            }
+        infos = self.probe()
+        metadata = {
+            "duration": infos["video_duration"],
+            "fps": infos["video_fps"],
+            "resolution": infos["video_size"],
+            "filename": os.path.basename(self.video_path),
+            "filesize_mb": os.path.getsize(self.video_path) / (1024 * 1024),
+            "format": os.path.splitext(self.video_path)[1],
+            "analyzed_at": datetime.datetime.now().isoformat(),
+        }
         return metadata
 
     def format_timestamp(self, seconds: int) -> str:
@@ -43,69 +224,1173 @@ class VideoProcessor:
         secs = seconds % 60
         return f"{hours:02d}-{minutes:02d}-{secs:02d}"
 
-    def extract_frames(
-        self, interval: int = 30, output_format: str = "png", quality: int = 95
-    ) -> List[Tuple[float, str]]:
-        frames_dir = os.path.join(self.output_dir, "frames")
-        os.makedirs(frames_dir, exist_ok=True)
+    def plan_seek_strategy(
+        self, timestamps, fps: float, seek_strategy: str = "auto"
+    ) -> str:
+        """Decide between seeking to each timestamp and scanning forward"""
+        index = None
+        if seek_strategy == "auto":
+            index = KeyframeIndex.for_video(self.video_path)
+        strategy = choose_seek_strategy(timestamps, fps, index, seek_strategy)
 
-        frame_info = []
+        spacing = index.average_spacing if index else None
+        if spacing:
+            self.print_status(
+                f"Using {strategy} frame access (keyframes every ~{spacing:.1f}s)"
+            )
+        else:
+            self.print_status(f"Using {strategy} frame access")
+        return strategy
+
+    def encode_frame(
+        self,
+        frame,
+        output_format: str = "png",
+        quality: int = 95,
+        profile: str = DEFAULT_PROFILE,
+    ):
+        """Encode a decoded frame to image file bytes"""
+        return encode_image(
+            np.asarray(frame, dtype=np.uint8), output_format, quality, profile
+        )
+
+    def benchmark_encoders(
+        self,
+        sample_frames: int = 20,
+        formats: Optional[List[str]] = None,
+        profiles: Optional[List[str]] = None,
+        quality: int = 95,
+        target_size: Optional[Tuple[Optional[int], Optional[int]]] = None,
+        crop: Optional[Tuple[int, int, int, int]] = None,
+        aspect: str = "fit",
+        grayscale: bool = False,
+    ) -> List[Dict]:
+        """Time every encoder profile on frames spread evenly over the video.
+
+        Returns one entry per profile and format with the mean encode time
+        and size per frame, fastest first. Nothing is written to disk.
+        """
+        decode = decode_options(target_size, crop, aspect, grayscale)
+        with self.borrow_reader(decode) as reader:
+            planned = [
+                (idx, reader.duration * idx / sample_frames)
+                for idx in range(sample_frames)
+            ]
+            self.print_status(f"Decoding {sample_frames} sample frames...")
+            frames = [frame for _, _, frame in self.read_frames(reader, planned)]
+
+        self.print_status("Benchmarking encoder profiles...")
+        return benchmark_encoders(frames, formats, profiles, quality)
+
+    def plan_timestamps(
+        self,
+        duration: float,
+        interval: int,
+        segment: Optional[Tuple[float, float]] = None,
+    ) -> List[Tuple[int, float]]:
+        """Return (frame number, timestamp) pairs every interval seconds.
+
+        With a segment, only timestamps in [start, end) are kept, but they
+        keep the numbering they would have in a full run.
+        """
+        planned = list(enumerate(range(0, int(duration), interval), 1))
+        if segment is not None:
+            start, end = segment
+            planned = [(idx, t) for idx, t in planned if start <= t < end]
+        return planned
+
+    def read_frames(
+        self,
+        reader: FrameReader,
+        planned: List[Tuple[int, float]],
+        seek_strategy: str = "auto",
+    ) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """Decode the planned timestamps, yielding (frame number, t, frame).
+
+        With a frame cache, frames found in it are memory-mapped instead of
+        decoded, the seek strategy is planned for the remaining timestamps
+        only, and newly decoded frames are added to the cache.
+        """
+        cache = self.frame_cache
+        cached = set()
+        if cache is not None:
+            video_key = cache.video_key(self.video_path, reader.decode_options)
+            cached = {
+                t for _, t in planned if cache.contains(video_key, reader.frame_pos(t))
+            }
 
-        with VideoFileClip(self.video_path) as video:
-            timestamps = range(0, int(video.duration), interval)
+        timestamps = [t for _, t in planned if t not in cached]
+        strategy = self.plan_seek_strategy(timestamps, reader.fps, seek_strategy)
+        read_frame = (
+            reader.scan_frame if strategy == "sequential" else reader.seek_frame
+        )
 
-            for idx, t in enumerate(timestamps, 1):
+        hits = misses = 0
+        try:
+            for idx, t in planned:
                 self.check_cancelled()  # Check for cancellation before each frame
 
+                started = time.perf_counter()
+                if t in cached:
+                    frame = cache.get(video_key, reader.frame_pos(t))
+                    if frame is not None:
+                        hits += 1
+                        self.events.frame("cache_read", started, idx=idx, t=t)
+                        yield idx, t, frame
+                        continue
+
                 # Extract frame
-                frame = video.get_frame(t)
+                frame = read_frame(t)
+                misses += 1
+                if cache is not None:
+                    cache.put(video_key, reader.frame_pos(t), frame)
+                self.events.frame("decode", started, idx=idx, t=t)
+                yield idx, t, frame
+        finally:
+            if cache is not None:
+                self.events.emit("frame_cache", hits=hits, misses=misses)
+
+    def candidate_times(
+        self, t: float, window: float, candidates: int, duration: float, fps: float
+    ) -> List[float]:
+        """Distinct frame times spread evenly over a window centred on t"""
+        if candidates <= 1 or window <= 0:
+            return [t]
+        start = max(0.0, t - window / 2)
+        end = min(duration - 1 / fps, t + window / 2)
+        if end <= start:
+            return [t]
+
+        times = []
+        positions = set()
+        for step in range(candidates):
+            candidate = start + (end - start) * step / (candidates - 1)
+            # Snap to the frame grid so nearby candidates cannot repeat a frame
+            position = int(candidate * fps + 0.00001)
+            if position not in positions:
+                positions.add(position)
+                times.append(position / fps)
+        return times
+
+    def read_sharpest_frames(
+        self,
+        reader: FrameReader,
+        planned: List[Tuple[int, float]],
+        window: float = 1.0,
+        candidates: int = 5,
+        seek_strategy: str = "auto",
+    ) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """Yield the sharpest of several candidate frames around each timestamp.
 
-                # Convert to PIL Image
-                image = Image.fromarray(np.uint8(frame))
+        Each window is reached once, by a seek or a forward scan as the seek
+        strategy decides, and its candidates are then read in the same
+        forward pass. Only the best candidate so far is held in memory; the
+        others are released to the reader's pool straight away. The frame
+        keeps its planned timestamp and number; the time it was actually
+        taken from is recorded in sharpness_log.
+        """
+        windows = [
+            (
+                idx,
+                t,
+                self.candidate_times(
+                    t, window, candidates, reader.duration, reader.fps
+                ),
+            )
+            for idx, t in planned
+        ]
+        strategy = self.plan_seek_strategy(
+            [times[0] for _, _, times in windows], reader.fps, seek_strategy
+        )
+        reach = reader.scan_frame if strategy == "sequential" else reader.seek_frame
 
-                # Generate safe filename
-                timestamp_str = self.format_timestamp(int(t))
-                frame_filename = f"frame_{timestamp_str}_{idx:04d}.{output_format}"
-                frame_path = os.path.join(frames_dir, frame_filename)
+        self.sharpness_log = []
+        for idx, t, times in windows:
+            self.check_cancelled()  # Check for cancellation before each window
 
-                # Save frame
-                if output_format.lower() == "jpg":
-                    image.save(frame_path, "JPEG", quality=quality)
+            started = time.perf_counter()
+            best = None
+            for i, candidate in enumerate(times):
+                frame = reach(candidate) if i == 0 else reader.scan_frame(candidate)
+                score = sharpness(frame)
+                if best is None or score > best[0]:
+                    if best is not None:
+                        reader.release(best[2])
+                    best = (score, candidate, frame)
                 else:
-                    image.save(frame_path, "PNG")
+                    reader.release(frame)
+
+            score, candidate, frame = best
+            self.events.frame("decode", started, idx=idx, t=t, candidates=len(times))
+            self.sharpness_log.append(
+                {
+                    "timestamp": t,
+                    "frame_timestamp": round(candidate, 3),
+                    "sharpness": round(score, 2),
+                }
+            )
+            yield idx, t, frame
+
+    def iter_frames(
+        self,
+        interval: int = 30,
+        as_image: bool = False,
+        batch_size: Optional[int] = None,
+        seek_strategy: str = "auto",
+        target_size: Optional[Tuple[Optional[int], Optional[int]]] = None,
+        crop: Optional[Tuple[int, int, int, int]] = None,
+        aspect: str = "fit",
+        grayscale: bool = False,
+    ) -> Iterator[Tuple]:
+        """Lazily yield frames every interval seconds without writing files.
+
+        Yields (timestamp, ndarray) pairs, or (timestamp, PIL.Image) pairs with
+        as_image. With batch_size, yields (timestamps, frames) where frames is
+        an (N, height, width, channels) array of up to batch_size frames. Only
+        the frame or batch being yielded is held in memory, and yielded frames
+        are the caller's to keep.
+
+        target_size, crop, aspect and grayscale are applied by ffmpeg while
+        decoding; grayscale frames are (height, width) arrays.
+        """
+        if batch_size is not None and as_image:
+            raise ValueError("batch_size cannot be combined with as_image")
+
+        decode = decode_options(target_size, crop, aspect, grayscale)
+        with self.borrow_reader(decode) as reader:
+            planned = self.plan_timestamps(reader.duration, interval)
+            frames = self.read_frames(reader, planned, seek_strategy)
+
+            if batch_size:
+                yield from self._batch_frames(frames, batch_size, reader.release)
+                return
+
+            for _, t, frame in frames:
+                # The caller keeps the frame, so the pool lets go of it
+                reader.detach(frame)
+                yield t, Image.fromarray(frame) if as_image else frame
+
+    def _batch_frames(
+        self,
+        frames: Iterator[Tuple[int, float, np.ndarray]],
+        batch_size: int,
+        release: Callable[[np.ndarray], None],
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Group decoded frames into stacked arrays of batch_size frames.
+
+        Each frame is released once copied into its batch.
+        """
+        batch = None
+        times = np.empty(batch_size, dtype=np.float64)
+        count = 0
+
+        for _, t, frame in frames:
+            if batch is None:
+                batch = np.empty((batch_size,) + frame.shape, dtype=frame.dtype)
+            batch[count] = frame
+            release(frame)
+            times[count] = t
+            count += 1
+
+            if count == batch_size:
+                yield times.copy(), batch
+                # A fresh array per batch so callers may keep what they received
+                batch = None
+                count = 0
+
+        if count:
+            yield times[:count].copy(), batch[:count]
+
+    def frame_path(
+        self, frames_dir: str, idx: int, t: float, output_format: str
+    ) -> str:
+        # Generate safe filename
+        timestamp_str = self.format_timestamp(int(t))
+        frame_filename = f"frame_{timestamp_str}_{idx:04d}.{output_format}"
+        return os.path.join(frames_dir, frame_filename)
+
+    def frame_encoding(
+        self,
+        output_format: str,
+        quality: int,
+        decode: Optional[Dict] = None,
+        profile: str = DEFAULT_PROFILE,
+        selection: Optional[Dict] = None,
+    ) -> str:
+        """Signature of the settings that determine a frame file's bytes"""
+        params = {
+            "output_format": output_format.lower(),
+            "save_options": save_options(output_format, quality, profile),
+            "decode": decode or decode_options(),
+        }
+        # Frames picked from a window differ from the frame at the timestamp
+        if selection is not None:
+            params["selection"] = selection
+        return encoding_signature(**params)
+
+    def open_manifest(
+        self,
+        params: Dict,
+        segment: Optional[Tuple[float, float]] = None,
+    ) -> ExtractionManifest:
+        """Load the output directory's manifest, one shard per segment worker"""
+        shard = f"segment-{segment[0]}" if segment is not None else None
+        manifest = ExtractionManifest(self.output_dir, shard=shard)
+        manifest.bind(self.video_path, params)
+        return manifest
+
+    def resume_frames(
+        self,
+        manifest: ExtractionManifest,
+        planned: List[Tuple[int, float]],
+        signature: str,
+        frames_dir: str,
+        output_format: str,
+    ) -> Tuple[List[Tuple[int, float, str, Dict]], List[Tuple[int, float]]]:
+        """Split planned frames into ones already extracted and ones still to do.
+
+        Extracted frames come back as (frame number, t, path, manifest entry)
+        and are recorded in the frame log by record_resumed().
+        """
+        done = []
+        todo = []
+        moves = []
+        for idx, t in planned:
+            entry = manifest.lookup(t, signature)
+            if entry is None:
+                todo.append((idx, t))
+                continue
+
+            # A different interval renumbers frames, so rename instead of redoing
+            path = self.frame_path(frames_dir, idx, t, output_format)
+            current = os.path.join(self.output_dir, entry["file"])
+            if os.path.normpath(current) != os.path.normpath(path):
+                moves.append((t, current, path))
+            done.append((idx, t, path, entry))
+
+        # Go through temporary names so renumbered files never overwrite each other
+        for t, current, path in moves:
+            os.replace(current, path + ".resume")
+        for t, current, path in moves:
+            os.replace(path + ".resume", path)
+            manifest.move(t, path)
+
+        return done, todo
+
+    def record_resumed(
+        self,
+        frames: Iterator[Tuple[int, float, np.ndarray]],
+        resumed: Deque[Tuple[int, float, str, Dict]],
+    ) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """Log resumed frames as decoding reaches them, then pass frames on.
+
+        The frame log writes in frame number order, so recording them all
+        up front would hold them in memory until the frames before them
+        are written.
+        """
+        for idx, t, frame in frames:
+            self.log_resumed(resumed, before=idx)
+            yield idx, t, frame
+        self.log_resumed(resumed)
+
+    def log_resumed(
+        self, resumed: Deque[Tuple[int, float, str, Dict]], before: float = math.inf
+    ):
+        """Record resumed frames numbered below before in the frame log"""
+        while resumed and resumed[0][0] < before:
+            idx, t, path, entry = resumed.popleft()
+            self.frame_log.record(idx, t, path, entry["bytes"], entry.get("stats"))
+
+    def read_scene_frames(
+        self,
+        reader: FrameReader,
+        detector: SceneDetector,
+        manifest: Optional[ExtractionManifest] = None,
+        signature: Optional[str] = None,
+        done: Optional[List[Tuple[float, str]]] = None,
+        frames_dir: str = "",
+        output_format: str = "png",
+    ) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """Decode every frame once, yielding (frame number, t, frame) per scene.
+
+        Scene frames already recorded in the manifest are appended to done
+        instead of being yielded again.
+        """
+        self.scene_log = []
+        idx = 0
+        # Decode time covers every frame scanned since the last scene frame
+        started = time.perf_counter()
+        scanned = 0
+        for t, frame in reader.iter_sequential():
+            self.check_cancelled()
+            scanned += 1
+            score = detector.feed(t, frame)
+            if score is None:
+                reader.release(frame)
+                continue
+
+            idx += 1
+            t = round(t, 3)
+            self.scene_log.append({"timestamp": t, "score": round(score, 4)})
+
+            entry = manifest.lookup(t, signature) if manifest is not None else None
+            if entry is not None:
+                path = self.frame_path(frames_dir, idx, t, output_format)
+                done.append((t, path))
+                self.frame_log.record(idx, t, path, entry["bytes"], entry.get("stats"))
+                reader.release(frame)
+                continue
+
+            self.print_status(f"Scene change at {t}s (score {score:.2f})")
+            self.events.frame("decode", started, idx=idx, t=t, frames=scanned)
+            yield idx, t, frame
+            started = time.perf_counter()
+            scanned = 0
+
+    def skip_duplicates(
+        self,
+        frames: Iterator[Tuple[int, float, np.ndarray]],
+        dedup: DuplicateFilter,
+        release: Callable[[np.ndarray], None],
+    ) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """Drop near-duplicate frames before they reach the encoders"""
+        for idx, t, frame in frames:
+            match = dedup.check(t, frame)
+            if match is None:
+                yield idx, t, frame
+                continue
+
+            release(frame)
+            self.frame_log.skip(idx)
+            self.duplicate_log.append(
+                {
+                    "timestamp": t,
+                    "matched_video": match["video"],
+                    "matched_timestamp": match["timestamp"],
+                    "distance": match["distance"],
+                }
+            )
+            self.print_status(f"Skipped near-duplicate frame {idx} at {t}s")
+
+    def resolve_variants(
+        self,
+        variants: Optional[List[Dict]],
+        output_format: str,
+        quality: int,
+        encoder_profile: str = DEFAULT_PROFILE,
+    ) -> List[Dict]:
+        """Validate variant settings, filling in the run's own where missing"""
+        defaults = {
+            "output_format": output_format,
+            "quality": quality,
+            "encoder_profile": encoder_profile,
+        }
+        resolved = [output_variant(**{**defaults, **v}) for v in variants or []]
+        subfolders = [os.path.normpath(v["subfolder"]) for v in resolved]
+        if len(set(subfolders)) != len(subfolders):
+            raise ValueError("Every output variant needs its own subfolder")
+        return resolved
+
+    def clear_variants(self, variants: List[Dict]):
+        """Remove frames an earlier run left in the variant subfolders.
+
+        Variants are always written whole, so nothing in them is reused.
+        """
+        for variant in variants:
+            directory = glob.escape(os.path.join(self.output_dir, variant["subfolder"]))
+            for fmt in OUTPUT_FORMATS:
+                for path in glob.glob(os.path.join(directory, f"frame_*.{fmt}")):
+                    os.remove(path)
+
+    def analyze_variants(self, variants: List[Dict]) -> List[Dict]:
+        """Report entries for each variant written by the last extraction"""
+        entries = []
+        for variant, stats in zip(variants, self.variant_stats):
+            sizes = stats.arrays()["bytes"]
+            entries.append(
+                {
+                    **variant,
+                    "directory": os.path.join(self.output_dir, variant["subfolder"]),
+                    "total_frames": len(sizes),
+                    "total_bytes": int(sizes.sum()),
+                    "average_file_size": (
+                        float(sizes.mean()) / (1024 * 1024) if len(sizes) else 0
+                    ),
+                }
+            )
+        return entries
+
+    def throttle_frames(self, frames, reservation, cost: int):
+        """Reserve cost bytes of the memory budget before decoding each frame"""
+        frames = iter(frames)
+        while True:
+            started = time.perf_counter()
+            if not reservation.acquire(cost, self.is_cancelled):
+                return
+            if time.perf_counter() - started > 0.001:
+                self.events.frame("throttle", started)
+            try:
+                item = next(frames)
+            except StopIteration:
+                reservation.release(cost)
+                return
+            yield item
+
+    def extract_frames(
+        self,
+        interval: int = 30,
+        output_format: str = "png",
+        quality: int = 95,
+        encoder_profile: str = DEFAULT_PROFILE,
+        seek_strategy: str = "auto",
+        workers: Optional[int] = None,
+        writers: int = 1,
+        segment: Optional[Tuple[float, float]] = None,
+        resume: bool = True,
+        mode: str = "interval",
+        scene_threshold: float = 0.35,
+        min_gap: float = 1.0,
+        max_gap: Optional[float] = None,
+        scene_metric: str = "histogram",
+        sharpness_window: float = 1.0,
+        sharpness_candidates: int = 5,
+        dedup_distance: Optional[int] = None,
+        dedup_index: Optional[str] = None,
+        target_size: Optional[Tuple[Optional[int], Optional[int]]] = None,
+        crop: Optional[Tuple[int, int, int, int]] = None,
+        aspect: str = "fit",
+        grayscale: bool = False,
+        output: str = "files",
+        sprite_grid: Tuple[int, int] = (10, 10),
+        sprite_tile_size: Tuple[Optional[int], Optional[int]] = (160, None),
+        shard_frames: int = DEFAULT_SHARD_FRAMES,
+        variants: Optional[List[Dict]] = None,
+    ) -> int:
+        """Extract frames to image files and return how many the output holds.
 
-                frame_info.append((t, frame_path))
-                self.print_status(f"Extracted frame {idx}/{len(timestamps)} at {t}s")
+        In "interval" mode a frame is taken every interval seconds. With a
+        segment, only timestamps in [start, end) are extracted, but frames
+        keep the numbering they would have in a full run.
 
-        return frame_info
+        In "scene" mode the video is decoded once from start to end and a
+        frame is taken whenever the picture changes by at least
+        scene_threshold, no closer than min_gap and no further apart than
+        max_gap seconds. The chosen timestamps and scores are kept in
+        scene_log.
+
+        "sharpest" mode plans timestamps like "interval" mode, but saves the
+        sharpest of sharpness_candidates frames spread over a window of
+        sharpness_window seconds around each one, which avoids motion-blurred
+        frames. More candidates and wider windows cost more decoding.
+
+        With resume, frames recorded in the output directory's manifest with
+        the same encoding are kept instead of being extracted again.
+
+        With dedup_distance, frames whose perceptual hash is within that many
+        bits of a frame already in the hash index (from this or any other
+        video) are skipped before encoding. Skipped frames are listed in
+        duplicate_log.
+
+        target_size, crop, aspect and grayscale are applied by ffmpeg while
+        decoding, so smaller outputs also decode and encode faster.
+
+        output picks where frames go instead of one file per frame:
+        "sprites" decodes at sprite_tile_size and tiles frames into sheets of
+        sprite_grid (columns, rows) with a WebVTT thumbnail track, "zip" and
+        "tar" stream the encoded images into one uncompressed archive, and
+        "npy" writes raw frames into .npy shards of shard_frames frames. The
+        returned locations then point into that output, which is described
+        in output_summary. Only loose files can be resumed.
+
+        Every frame in the output, including resumed ones, is recorded in
+        the frame log (frames.jsonl) as it is written; see FrameLog.
+
+        variants lists extra outputs, each a dict of output_variant()
+        arguments, that are encoded from the same decoded frames and written
+        next to the frames folder; settings a variant leaves out are taken
+        from this run. Their sizes are recorded with each frame. Runs with
+        variants are always written whole.
+        """
+        if mode not in EXTRACTION_MODES:
+            raise ValueError(
+                f"Unknown extraction mode {mode!r}, expected one of {EXTRACTION_MODES}"
+            )
+
+        if output not in OUTPUT_TYPES:
+            raise ValueError(
+                f"Unknown output {output!r}, expected one of {OUTPUT_TYPES}"
+            )
+
+        configure_image_memory()
+        frames_dir = os.path.join(self.output_dir, "frames")
+        variants = self.resolve_variants(
+            variants, output_format, quality, encoder_profile
+        )
+        if variants and output != "files":
+            raise ValueError("Output variants can only be written as files")
+        if output != "files" or variants:
+            # Archives, shards, sheets and variants are always written whole
+            resume = False
+        if output == "sprites":
+            if target_size is not None:
+                raise ValueError(
+                    "Sprite tiles are sized with sprite_tile_size, " "not target_size"
+                )
+            target_size = sprite_tile_size
+
+        decode = decode_options(target_size, crop, aspect, grayscale)
+        selection = None
+        if mode == "sharpest":
+            selection = {
+                "window": sharpness_window,
+                "candidates": sharpness_candidates,
+            }
+        signature = self.frame_encoding(
+            output_format, quality, decode, encoder_profile, selection
+        )
+        params = {
+            "mode": mode,
+            "interval": interval,
+            "output_format": output_format,
+            "quality": quality,
+        }
+
+        # Segment workers log to shards, named like their manifest shards
+        shard = f"segment-{segment[0]}" if segment is not None else None
+        if segment is None:
+            clear_frame_logs(self.output_dir)
+            self.clear_variants(variants)
+        frame_log = self.frame_log = FrameLog(self.output_dir, shard)
+        with frame_log, self.borrow_reader(decode) as reader:
+            done = []
+            # Resumed frames not yet in the frame log
+            resumed = collections.deque()
+            manifest = None
+            if mode == "scene":
+                detector = SceneDetector(
+                    threshold=scene_threshold,
+                    min_gap=min_gap,
+                    max_gap=max_gap,
+                    metric=scene_metric,
+                )
+                params.update(detector.settings())
+                if output == "files":
+                    manifest = self.open_manifest(params)
+
+                    # Numbering depends on every earlier scene, so frames can
+                    # only be reused when the detection settings are unchanged
+                    if not resume or manifest.previous_params != params:
+                        manifest.prune([], signature)
+                frames = self.read_scene_frames(
+                    reader,
+                    detector,
+                    manifest,
+                    signature,
+                    done,
+                    frames_dir,
+                    output_format,
+                )
+                total = planned_total = None
+            else:
+                all_planned = self.plan_timestamps(reader.duration, interval)
+                planned = self.plan_timestamps(reader.duration, interval, segment)
+                total = len(all_planned)
+                planned_total = len(planned)
+                if planned:
+                    frame_log.next_index = planned[0][0]
+
+                if output == "files":
+                    manifest = self.open_manifest(params, segment)
+                    if segment is None:
+                        manifest.prune([t for _, t in all_planned], signature)
+
+                if resume:
+                    done, planned = self.resume_frames(
+                        manifest, planned, signature, frames_dir, output_format
+                    )
+                    if done:
+                        self.print_status(
+                            f"Resuming: {len(done)} frames already extracted, "
+                            f"{len(planned)} remaining"
+                        )
+                if mode == "sharpest":
+                    frames = self.read_sharpest_frames(
+                        reader,
+                        planned,
+                        sharpness_window,
+                        sharpness_candidates,
+                        seek_strategy,
+                    )
+                else:
+                    frames = self.read_frames(reader, planned, seek_strategy)
+                resumed.extend(done)
+                frames = self.record_resumed(frames, resumed)
+            self.events.emit(
+                "plan", total=planned_total, resumed=len(done), segment=shard
+            )
+
+            self.duplicate_log = []
+            index = None
+            if dedup_distance is not None:
+                index = HashIndex(dedup_index)
+                if not 0 <= dedup_distance <= index.max_distance:
+                    index.close()
+                    raise ValueError(
+                        f"dedup_distance must be 0-{index.max_distance} "
+                        f"with the hash index {index.path}"
+                    )
+                dedup = DuplicateFilter(index, self.video_path, dedup_distance)
+                frames = self.skip_duplicates(frames, dedup, reader.release)
+
+            def report_progress(idx, t):
+                self.events.emit("progress", idx=idx, total=total, t=t)
+                if total:
+                    self.print_status(f"Extracted frame {idx}/{total} at {t}s")
+                else:
+                    self.print_status(f"Extracted frame {idx} at {t}s")
+
+            sink = self.open_sink(
+                output,
+                frames_dir,
+                output_format,
+                quality,
+                encoder_profile,
+                manifest=manifest,
+                signature=signature,
+                sprite_grid=sprite_grid,
+                sprite_tile_size=sprite_tile_size,
+                shard_frames=shard_frames,
+            )
+            if sink.ordered:
+                workers = writers = 1
+            elif not sink.concurrent:
+                writers = 1
+
+            height, width = reader.frame_shape[:2]
+            variant_sinks = []
+            variant_shapes = []
+            for variant in variants:
+                _, size = output_geometry((width, height), variant["size"])
+                variant_shapes.append(size)
+                variant_sinks.append(
+                    FileSink(
+                        os.path.join(self.output_dir, variant["subfolder"]),
+                        lambda idx, t, fmt=variant["output_format"]: os.path.basename(
+                            self.frame_path("", idx, t, fmt)
+                        ),
+                    )
+                )
+
+            # Charged when a frame is admitted and shrunk to the encoded size
+            # once encoded, so memory for encoding is never waited for later
+            cost = frame_cost(reader.frame_shape, sink.encoded)
+            for size in variant_shapes:
+                cost += frame_cost(size[::-1] + reader.frame_shape[2:])
+            reservation = (self.memory_budget or MemoryBudget(sys.maxsize)).reserve()
+            frames = self.throttle_frames(frames, reservation, cost)
+
+            def encode(item):
+                idx, t, frame = item
+                # Measured here so the statistics come from the encoder threads
+                started = time.perf_counter()
+                stats = frame_statistics(frame)
+                self.events.frame("measure", started, idx=idx, t=t)
+                if sink.encoded:
+                    # Decoded frames are already uint8 and are encoded in place
+                    if frame.dtype != np.uint8:
+                        started = time.perf_counter()
+                        frame = frame.astype(np.uint8)
+                        self.events.frame("convert", started, idx=idx, t=t)
+                    pixels = frame
+                    started = time.perf_counter()
+                    frame = encode_image(frame, output_format, quality, encoder_profile)
+                    self.events.frame("encode", started, idx=idx, t=t)
+
+                    extras = []
+                    for variant, size in zip(variants, variant_shapes):
+                        started = time.perf_counter()
+                        data = encode_image(
+                            pixels,
+                            variant["output_format"],
+                            variant["quality"],
+                            variant["encoder_profile"],
+                            size,
+                        )
+                        self.events.frame(
+                            "encode",
+                            started,
+                            idx=idx,
+                            t=t,
+                            variant=variant["subfolder"],
+                        )
+                        extras.append(data)
+                    # Nothing reads the decoded pixels any more
+                    reader.release(item[2])
+                    held = min(len(frame) + sum(len(data) for data in extras), cost)
+                    reservation.release(cost - held)
+                else:
+                    extras = []
+                    held = cost
+                return idx, t, frame, stats, extras, held
+
+            def write(item):
+                idx, t, payload, stats, extras, held = item
+                started = time.perf_counter()
+                location, size = sink.write(idx, t, payload, stats)
+                if size is None:
+                    self.events.frame("write", started, idx=idx, t=t)
+                else:
+                    self.events.frame("write", started, idx=idx, t=t, bytes=size)
+                if not sink.encoded:
+                    # Raw frames are copied out by the sink
+                    reader.release(payload)
+                variant_sizes = {}
+                for variant, variant_sink, data in zip(variants, variant_sinks, extras):
+                    started = time.perf_counter()
+                    _, variant_size = variant_sink.write(idx, t, data)
+                    self.events.frame(
+                        "write", started, idx=idx, t=t, bytes=variant_size
+                    )
+                    variant_sizes[variant["subfolder"]] = variant_size
+                reservation.release(held)
+                frame_log.record(idx, t, location, size, stats, variant_sizes)
+
+                report_progress(idx, t)
+
+            pipeline = FramePipeline(
+                encode,
+                write,
+                workers=workers,
+                writers=writers,
+                is_cancelled=self.is_cancelled,
+                on_queue=lambda name, depth: self.events.emit(
+                    "queue", queue=name, depth=depth
+                ),
+            )
+            # Room in the decode buffer pool for every frame the stage queues
+            # and threads can hold at once
+            pool = reader.pool
+            pool.size = max(
+                pool.size,
+                2 * pipeline.queue_size + pipeline.workers + pipeline.writers + 3,
+            )
+            if self.memory_budget is not None:
+                # Idle buffers beyond what the budget admits would sit outside it
+                pool.size = min(pool.size, self.memory_budget.max_bytes // cost + 2)
+            allocations, reuses = pool.allocations, pool.reuses
+            try:
+                pipeline.run(frames)
+            finally:
+                self.log_resumed(resumed)
+                if manifest is not None:
+                    manifest.flush()
+                if index is not None:
+                    index.close()
+                self.output_summary = sink.close(reader.duration)
+                self.events.emit(
+                    "buffers",
+                    allocated=pool.allocations - allocations,
+                    reused=pool.reuses - reuses,
+                )
+                reservation.close()
+                self.events.emit(
+                    "memory",
+                    budget=(
+                        self.memory_budget.max_bytes
+                        if self.memory_budget is not None
+                        else None
+                    ),
+                    peak=reservation.peak,
+                )
+            self.check_cancelled()
+
+        if mode == "scene" and manifest is not None:
+            # Drop frames of a previous run that are no longer scene changes
+            manifest.prune(
+                (record["t"] for record in read_frame_log(frame_log.path)), signature
+            )
+            manifest.flush()
+        return frame_log.count
+
+    def open_sink(
+        self,
+        output: str,
+        frames_dir: str,
+        output_format: str,
+        quality: int,
+        encoder_profile: str = DEFAULT_PROFILE,
+        manifest: Optional[ExtractionManifest] = None,
+        signature: Optional[str] = None,
+        sprite_grid: Tuple[int, int] = (10, 10),
+        sprite_tile_size: Tuple[Optional[int], Optional[int]] = (160, None),
+        shard_frames: int = DEFAULT_SHARD_FRAMES,
+    ) -> OutputSink:
+        """Create the sink extracted frames are written to"""
+
+        def name_frame(idx, t):
+            return os.path.basename(self.frame_path("", idx, t, output_format))
+
+        if output == "sprites":
+            return SpriteSheetWriter(
+                self.output_dir,
+                grid=sprite_grid,
+                tile_size=sprite_tile_size,
+                output_format=output_format,
+                quality=quality,
+                profile=encoder_profile,
+            )
+        if output in ARCHIVE_KINDS:
+            return ArchiveSink(self.output_dir, name_frame, kind=output)
+        if output == "npy":
+            return ShardSink(self.output_dir, shard_frames)
+        return FileSink(frames_dir, name_frame, manifest, signature)
+
+    def plan_segments(
+        self, duration: float, interval: int, processes: int
+    ) -> List[Tuple[float, float]]:
+        """Split [0, duration) into contiguous segments on interval boundaries.
+
+        Videos too short for a single timestamp still get one segment, so
+        they extract nothing, like a sequential run.
+        """
+        timestamps = list(range(0, int(duration), interval))
+        if not timestamps:
+            return [(0, duration)]
+        count = max(1, min(processes, len(timestamps)))
+        bounds = [timestamps[len(timestamps) * i // count] for i in range(count)]
+        return list(zip(bounds, bounds[1:] + [duration]))
+
+    def extract_frames_parallel(
+        self,
+        duration: float,
+        processes: int,
+        interval: int = 30,
+        output_format: str = "png",
+        quality: int = 95,
+        encoder_profile: str = DEFAULT_PROFILE,
+        seek_strategy: str = "auto",
+        workers: Optional[int] = None,
+        writers: int = 1,
+        resume: bool = True,
+        mode: str = "interval",
+        sharpness_window: float = 1.0,
+        sharpness_candidates: int = 5,
+        dedup_distance: Optional[int] = None,
+        dedup_index: Optional[str] = None,
+        target_size: Optional[Tuple[Optional[int], Optional[int]]] = None,
+        crop: Optional[Tuple[int, int, int, int]] = None,
+        aspect: str = "fit",
+        grayscale: bool = False,
+        variants: Optional[List[Dict]] = None,
+    ) -> int:
+        """Extract frames with one decoder process per time segment.
+
+        Returns how many frames the output holds. Each worker writes its
+        own frame log shard, and they are merged into frames.jsonl at the end.
+        """
+        if mode == "scene":
+            raise ValueError(
+                "Scene detection needs one sequential decode pass "
+                "and cannot be split across processes"
+            )
+        segments = self.plan_segments(duration, interval, processes)
+        if workers is None:
+            # Share the default encoder threads between the processes
+            workers = max(1, default_workers() // len(segments))
+
+        # Probe keyframes once here rather than racing in every worker
+        if seek_strategy == "auto":
+            KeyframeIndex.for_video(self.video_path)
+
+        options = {
+            "interval": interval,
+            "output_format": output_format,
+            "quality": quality,
+            "encoder_profile": encoder_profile,
+            "seek_strategy": seek_strategy,
+            "workers": workers,
+            "writers": writers,
+            "resume": resume,
+            "mode": mode,
+            "sharpness_window": sharpness_window,
+            "sharpness_candidates": sharpness_candidates,
+            "dedup_distance": dedup_distance,
+            "dedup_index": dedup_index,
+            "target_size": target_size,
+            "crop": crop,
+            "aspect": aspect,
+            "grayscale": grayscale,
+            "variants": variants,
+        }
+        selection = None
+        if mode == "sharpest":
+            selection = {"window": sharpness_window, "candidates": sharpness_candidates}
+
+        # Workers record into their own manifest shards, folded in at the end
+        manifest = self.open_manifest(
+            {
+                "mode": mode,
+                "interval": interval,
+                "output_format": output_format,
+                "quality": quality,
+            }
+        )
+        manifest.prune(
+            [t for _, t in self.plan_timestamps(duration, interval)],
+            self.frame_encoding(
+                output_format,
+                quality,
+                decode_options(target_size, crop, aspect, grayscale),
+                encoder_profile,
+                selection,
+            ),
+        )
+        manifest.flush()
+
+        self.duplicate_log = []
+        self.sharpness_log = []
+        clear_frame_logs(self.output_dir)
+        self.clear_variants(
+            self.resolve_variants(variants, output_format, quality, encoder_profile)
+        )
+        reservation = None
+        if self.memory_budget is not None:
+            # The segment processes split the whole budget between them
+            reservation = self.memory_budget.reserve()
+            if not reservation.acquire(self.memory_budget.max_bytes, self.is_cancelled):
+                self.check_cancelled()
+        try:
+            count = self._run_segments(segments, options)
+        finally:
+            if reservation is not None:
+                reservation.close()
+            manifest = self.open_manifest(manifest.params)
+            manifest.merge_shards()
+            merge_frame_logs(
+                self.output_dir, [f"segment-{start}" for start, _ in segments]
+            )
 
-    def analyze_frames(self, frame_info: List[Tuple[float, str]]) -> Dict:
         self.check_cancelled()
+        self.duplicate_log.sort(key=lambda entry: entry["timestamp"])
+        self.sharpness_log.sort(key=lambda entry: entry["timestamp"])
+        return count
+
+    def _run_segments(
+        self,
+        segments: List[Tuple[float, float]],
+        options: Dict,
+    ) -> int:
+        """Run one worker process per segment and return the frames written"""
+        segment_budget = None
+        if self.memory_budget is not None:
+            segment_budget = max(1, self.memory_budget.max_bytes // len(segments))
+        with multiprocessing.Manager() as manager:
+            cancel_event = manager.Event()
+            # Workers stream their events back so subscribers see them live
+            event_queue = manager.Queue() if self.events.active else None
+            with ProcessPoolExecutor(max_workers=len(segments)) as executor:
+                pending = {
+                    executor.submit(
+                        _extract_segment,
+                        self.video_path,
+                        self.output_dir,
+                        segment,
+                        options,
+                        cancel_event,
+                        event_queue,
+                        self.frame_cache,
+                        segment_budget,
+                    ): segment
+                    for segment in segments
+                }
+                self.print_status(f"Extracting {len(segments)} segments in parallel...")
+
+                done_count = 0
+                frame_count = 0
+                while pending:
+                    done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    if self.is_cancelled():
+                        cancel_event.set()
+                    self._publish_forwarded(event_queue)
+
+                    for future in done:
+                        start, end = pending.pop(future)
+                        try:
+                            result = future.result()
+                        except ProcessCancelled:
+                            cancel_event.set()
+                            continue
+                        except Exception:
+                            cancel_event.set()
+                            raise
+                        frame_count += result["frames"]
+                        self.duplicate_log.extend(result["duplicates"])
+                        self.sharpness_log.extend(result["sharpness"])
+                        done_count += 1
+                        self.print_status(
+                            f"Finished segment {done_count}/{len(segments)} "
+                            f"({start}s-{end:.0f}s)"
+                        )
+                # Workers flush their last events before returning
+                self._publish_forwarded(event_queue)
+        return frame_count
+
+    def _publish_forwarded(self, event_queue):
+        """Publish the event batches segment workers have sent so far"""
+        if event_queue is None:
+            return
+        while True:
+            try:
+                batch = event_queue.get_nowait()
+            except queue.Empty:
+                return
+            for event in batch:
+                self.events.publish(event)
+
+    def analyze_frames(self, variants: Optional[List[Dict]] = None) -> Dict:
+        """Summarize the frame log written while the frames were stored.
+
+        The per-frame sizes and statistics stay in the log; only compact
+        columns of numbers are loaded to compute the summary.
+        """
+        self.check_cancelled()
+        self.frame_stats, self.variant_stats = load_frame_stats(
+            frame_log_path(self.output_dir), [v["subfolder"] for v in variants or []]
+        )
+        frame_sizes = self.frame_stats.arrays()["bytes"] / (1024 * 1024)  # Size in MB
+        # Sprite tiles have no size of their own
+        frame_sizes = frame_sizes[~np.isnan(frame_sizes)]
         analysis = {
-            "total_frames": len(frame_info),
-            "frame_sizes": [],
+            "total_frames": len(self.frame_stats),
             "average_file_size": 0,
-            "timestamps": [],
+            "frame_log": FRAME_LOG_FILENAME,
+            "statistics": self.frame_stats.summary(),
         }
 
-        total_size = 0
-        for timestamp, frame_path in frame_info:
-            self.check_cancelled()
-            file_size = os.path.getsize(frame_path) / (1024 * 1024)  # Size in MB
-            analysis["frame_sizes"].append(file_size)
-            analysis["timestamps"].append(timestamp)
-            total_size += file_size
-
-        analysis["average_file_size"] = total_size / len(frame_info)
+        # Every frame may have been skipped as a duplicate
+        if len(frame_sizes):
+            analysis["average_file_size"] = float(frame_sizes.mean())
+        elif len(self.frame_stats) and self.output_summary:
+            # Sprite sheets are shared by their tiles
+            sheet_bytes = sum(
+                sheet.get("bytes", 0) for sheet in self.output_summary.get("sheets", [])
+            )
+            analysis["average_file_size"] = (
+                sheet_bytes / (1024 * 1024) / len(self.frame_stats)
+            )
         return analysis
 
-    def save_report(self, metadata: Dict, analysis: Dict):
+    def save_report(
+        self, metadata: Dict, analysis: Dict, timings: Optional[Dict] = None
+    ):
         self.check_cancelled()
         report = {
             "video_metadata": metadata,
             "frame_analysis": analysis,
             "processing_timestamp": datetime.datetime.now().isoformat(),
         }
+        if timings is not None:
+            report["timings"] = timings
 
         report_path = os.path.join(self.output_dir, "processing_report.json")
         with open(report_path, "w") as f:
@@ -114,53 +1399,226 @@ class VideoProcessor:
         self.print_status(f"Processing report saved to {report_path}")
 
     def process_video(
-        self, interval: int = 30, output_format: str = "png", quality: int = 95
+        self,
+        interval: int = 30,
+        output_format: str = "png",
+        quality: int = 95,
+        encoder_profile: str = DEFAULT_PROFILE,
+        seek_strategy: str = "auto",
+        workers: Optional[int] = None,
+        writers: int = 1,
+        processes: int = 1,
+        resume: bool = True,
+        cleanup_on_cancel: bool = False,
+        mode: str = "interval",
+        scene_threshold: float = 0.35,
+        min_gap: float = 1.0,
+        max_gap: Optional[float] = None,
+        scene_metric: str = "histogram",
+        sharpness_window: float = 1.0,
+        sharpness_candidates: int = 5,
+        dedup_distance: Optional[int] = None,
+        dedup_index: Optional[str] = None,
+        target_size: Optional[Tuple[Optional[int], Optional[int]]] = None,
+        crop: Optional[Tuple[int, int, int, int]] = None,
+        aspect: str = "fit",
+        grayscale: bool = False,
+        output: str = "files",
+        sprite_grid: Tuple[int, int] = (10, 10),
+        sprite_tile_size: Tuple[Optional[int], Optional[int]] = (160, None),
+        shard_frames: int = DEFAULT_SHARD_FRAMES,
+        trace_path: Optional[str] = None,
+        variants: Optional[List[Dict]] = None,
     ) -> Dict:
-        try:
-            # Reset cancel flag at start of processing
-            self.should_cancel = False
+        """Extract frames and write the processing report.
+
+        Completed frames are recorded in a manifest, so running again with
+        the same settings after a crash or cancellation picks up where the
+        previous run stopped. Partial output is only deleted on cancellation
+        when cleanup_on_cancel is set. Stage and per-frame timings go into
+        the report, and into a Chrome trace file if trace_path is given.
+
+        variants adds outputs encoded from the same decode pass, e.g. a
+        review JPEG and a thumbnail next to full-size PNGs; see
+        extract_frames(). Each is listed in the report.
 
+        The frames themselves are listed in the frame log, whose path is
+        returned as "frame_log": one record per frame in frame number
+        order, with its file, size and statistics; read it with
+        frame_log.read_frame_log(). It replaces the "frame_paths" list this
+        used to return and the report's "frame_sizes" and "timestamps"
+        lists, which grew with the number of frames.
+        """
+        timings = TimingCollector()
+        unsubscribers = [self.events.subscribe(timings)]
+        trace = None
+        try:
             # Create output directory
             os.makedirs(self.output_dir, exist_ok=True)
+            if trace_path:
+                trace = ChromeTraceWriter(trace_path)
+                unsubscribers.append(self.events.subscribe(trace))
 
-            # Get video metadata
-            self.print_status("Extracting video metadata...")
-            metadata = self.get_video_metadata()
+            with self.reader_session():
+                # Get video metadata
+                self.print_status("Extracting video metadata...")
+                with self.events.stage("metadata"):
+                    metadata = self.get_video_metadata()
 
-            # Extract frames
-            self.print_status("Extracting frames...")
-            frame_info = self.extract_frames(
-                interval=interval, output_format=output_format, quality=quality
-            )
+                # Extract frames
+                self.print_status("Extracting frames...")
+                options = {
+                    "interval": interval,
+                    "output_format": output_format,
+                    "quality": quality,
+                    "encoder_profile": encoder_profile,
+                    "seek_strategy": seek_strategy,
+                    "workers": workers,
+                    "writers": writers,
+                    "resume": resume,
+                    "dedup_distance": dedup_distance,
+                    "dedup_index": dedup_index,
+                    "target_size": target_size,
+                    "crop": crop,
+                    "aspect": aspect,
+                    "grayscale": grayscale,
+                }
+                variants = self.resolve_variants(
+                    variants, output_format, quality, encoder_profile
+                )
+                if variants:
+                    options["variants"] = variants
+                if output != "files":
+                    if processes > 1:
+                        raise ValueError(
+                            f"{output!r} output is written as one stream and "
+                            f"cannot be split across processes"
+                        )
+                    options.update(
+                        output=output,
+                        sprite_grid=sprite_grid,
+                        sprite_tile_size=sprite_tile_size,
+                        shard_frames=shard_frames,
+                    )
+                if mode == "scene":
+                    if processes > 1:
+                        raise ValueError(
+                            "Scene detection needs one sequential decode pass "
+                            "and cannot be split across processes"
+                        )
+                    options.update(
+                        mode=mode,
+                        scene_threshold=scene_threshold,
+                        min_gap=min_gap,
+                        max_gap=max_gap,
+                        scene_metric=scene_metric,
+                    )
+                if mode == "sharpest":
+                    options.update(
+                        mode=mode,
+                        sharpness_window=sharpness_window,
+                        sharpness_candidates=sharpness_candidates,
+                    )
+                with self.events.stage("extract", processes=processes):
+                    if processes > 1:
+                        self.extract_frames_parallel(
+                            metadata["duration"], processes, **options
+                        )
+                    else:
+                        self.extract_frames(**options)
 
-            # Analyze frames
-            self.print_status("Analyzing extracted frames...")
-            analysis = self.analyze_frames(frame_info)
+                # Analyze frames
+                self.print_status("Analyzing extracted frames...")
+                with self.events.stage("analyze"):
+                    analysis = self.analyze_frames(variants)
+                if mode == "scene":
+                    analysis["scene_detection"] = {
+                        "threshold": scene_threshold,
+                        "min_gap": min_gap,
+                        "max_gap": max_gap,
+                        "metric": scene_metric,
+                        "scenes": self.scene_log,
+                    }
+                if mode == "sharpest":
+                    analysis["sharpest_frame"] = {
+                        "window": sharpness_window,
+                        "candidates": sharpness_candidates,
+                        "frames": self.sharpness_log,
+                    }
+                if output != "files":
+                    analysis["output"] = {"type": output, **self.output_summary}
+                if variants:
+                    analysis["variants"] = self.analyze_variants(variants)
+                if dedup_distance is not None:
+                    analysis["duplicates"] = {
+                        "max_distance": dedup_distance,
+                        "skipped": self.duplicate_log,
+                    }
 
             # Save report
             self.print_status("Generating processing report...")
-            self.save_report(metadata, analysis)
+            timing_summary = timings.summary()
+            with self.events.stage("report"):
+                self.save_report(metadata, analysis, timing_summary)
 
             return {
                 "metadata": metadata,
                 "analysis": analysis,
+                "timings": timing_summary,
                 "output_directory": self.output_dir,
-                "frame_paths": [path for _, path in frame_info],
+                "frame_log": frame_log_path(self.output_dir),
             }
         except ProcessCancelled:
-            # Clean up any partially processed files
-            if os.path.exists(self.output_dir):
-                for root, dirs, files in os.walk(self.output_dir):
-                    for file in files:
-                        try:
-                            os.remove(os.path.join(root, file))
-                        except:
-                            pass
-                try:
-                    os.rmdir(self.output_dir)
-                except:
-                    pass
+            # Clean up any partially processed files if asked to, otherwise
+            # keep them so the next run can resume
+            if cleanup_on_cancel and os.path.exists(self.output_dir):
+                shutil.rmtree(self.output_dir, ignore_errors=True)
             raise
+        finally:
+            for unsubscribe in unsubscribers:
+                unsubscribe()
+            if trace is not None:
+                trace.close()
+
+
+def _extract_segment(
+    video_path: str,
+    output_dir: str,
+    segment: Tuple[float, float],
+    options: Dict,
+    cancel_event,
+    event_queue=None,
+    frame_cache: Optional[FrameCache] = None,
+    memory_budget: Optional[int] = None,
+) -> Dict:
+    """Process pool entry point extracting one segment with its own reader.
+
+    Returns the number of frames in the segment, which are recorded in its
+    frame log shard, along with the logs the parent merges into its own.
+    Events are sent to event_queue in batches as they happen, if given.
+    memory_budget is this segment's share of the parent's budget in bytes.
+    """
+    processor = VideoProcessor(video_path)
+    processor.output_dir = output_dir
+    processor.cancel_event = cancel_event
+    processor.print_status = lambda message: None
+    processor.frame_cache = frame_cache
+    if memory_budget is not None:
+        processor.memory_budget = MemoryBudget(memory_budget)
+    forwarder = None
+    if event_queue is not None:
+        forwarder = EventForwarder(event_queue)
+        processor.events.subscribe(forwarder)
+    try:
+        count = processor.extract_frames(segment=segment, **options)
+    finally:
+        if forwarder is not None:
+            forwarder.flush()
+    return {
+        "frames": count,
+        "duplicates": processor.duplicate_log,
+        "sharpness": processor.sharpness_log,
+    }
 
 
 class ProcessCancelled(Exception):
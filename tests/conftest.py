@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# The modules in src/ import each other by plain name, like the entry points do
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+
+@pytest.fixture(scope="session")
+def sample_video(tmp_path_factory):
+    """A 6 second 96x64 test pattern video with a keyframe every second"""
+    from moviepy.config import get_setting
+
+    path = str(tmp_path_factory.mktemp("videos") / "sample.mp4")
+    subprocess.run(
+        [
+            get_setting("FFMPEG_BINARY"),
+            "-y",
+            "-loglevel",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            "testsrc2=size=96x64:rate=10:duration=6",
+            "-c:v",
+            "libx264",
+            "-pix_fmt",
+            "yuv420p",
+            "-g",
+            "10",
+            path,
+        ],
+        check=True,
+        stdin=subprocess.DEVNULL,
+    )
+    return path
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep caches and indexes out of the real home directory"""
+    import config
+
+    home = tmp_path / "home"
+    # Worker processes that import config afresh read the environment
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("USERPROFILE", str(home))
+    monkeypatch.setattr(config, "CACHE_DIR", str(home / ".video_frame_extractor"))
+    return config.CACHE_DIR
@@ -0,0 +1,143 @@
+import os
+
+import pytest
+
+from cli import (
+    build_parser,
+    check_options,
+    collect_videos,
+    extraction_options,
+    output_dir_for,
+)
+
+
+def test_output_dirs_do_not_collide(tmp_path):
+    videos = [
+        str(tmp_path / "x" / "a.mp4"),
+        str(tmp_path / "y" / "a.mp4"),
+        str(tmp_path / "x" / "a.mkv"),
+    ]
+    root = str(tmp_path / "out")
+    under_root = [output_dir_for(video, root) for video in videos]
+    assert len(set(under_root)) == 3
+    assert all(os.path.dirname(path) == root for path in under_root)
+    assert os.path.basename(under_root[0]).startswith("a_mp4_")
+    # The same video always maps to the same folder, so reruns resume
+    assert output_dir_for(videos[0], root) == under_root[0]
+
+    next_to_video = [output_dir_for(video, None) for video in videos]
+    assert next_to_video == [
+        str(tmp_path / "x" / "processed_output" / "a_mp4"),
+        str(tmp_path / "y" / "processed_output" / "a_mp4"),
+        str(tmp_path / "x" / "processed_output" / "a_mkv"),
+    ]
+
+
+def test_collect_videos(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for name in ["b.mp4", "a.MKV", "notes.txt", "sub/c.avi"]:
+        (tmp_path / name).write_bytes(b"")
+
+    assert collect_videos([str(tmp_path)]) == [
+        str(tmp_path / "a.MKV"),
+        str(tmp_path / "b.mp4"),
+    ]
+    assert collect_videos([str(tmp_path)], recursive=True)[-1] == str(
+        tmp_path / "sub" / "c.avi"
+    )
+    # Named files are taken whatever their extension, and only once
+    named = str(tmp_path / "notes.txt")
+    assert collect_videos([named, named]) == [named]
+
+
+def test_check_options_converts_json_values():
+    options = check_options(
+        {
+            "interval": 5,
+            "target_size": [320, None],
+            "sprite_grid": "4x3",
+            "crop": [0, 0, 10, 20],
+            "variants": [
+                {"subfolder": "thumbs", "output_format": "jpg", "size": "64x"}
+            ],
+            "workers": None,
+        }
+    )
+    assert options["target_size"] == (320, None)
+    assert options["sprite_grid"] == (4, 3)
+    assert options["crop"] == (0, 0, 10, 20)
+    assert options["variants"][0]["size"] == (64, None)
+
+    defaults = extraction_options(build_parser().parse_args(["clip.mp4"]))
+    assert check_options(defaults) == defaults
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"interval": "abc"},
+        {"interval": 0},
+        {"interval": True},
+        {"quality": 101},
+        {"mode": "fastest"},
+        {"grayscale": "yes"},
+        {"target_size": [1, 2, 3]},
+        {"crop": [0, 0, 10]},
+        {"variants": {"subfolder": "x"}},
+        {"sharpness_window": -1},
+        {"output": "sprites", "target_size": "320x"},
+        {"dedup_distance": 6},
+        {"dedup_distance": -1},
+        {"scene_threshold": 1.5},
+        {"scene_metric": "edges"},
+        {"min_gap": 2.0, "max_gap": 1.0},
+    ],
+)
+def test_check_options_rejects_bad_values(options):
+    with pytest.raises(ValueError):
+        check_options(options)
+
+
+def test_option_lists_match_the_processor():
+    from frame_reader import ASPECT_MODES
+    from video_processor import EXTRACTION_MODES
+
+    import cli
+
+    assert tuple(cli.EXTRACTION_MODES) == EXTRACTION_MODES
+    assert tuple(cli.ASPECT_MODES) == ASPECT_MODES
+
+
+def test_scene_and_dedup_flags():
+    args = build_parser().parse_args(
+        [
+            "clip.mp4",
+            "--mode",
+            "scene",
+            "--scene-threshold",
+            "0.5",
+            "--max-gap",
+            "30",
+            "--scene-metric",
+            "pixel",
+            "--dedup-distance",
+            "3",
+            "--dedup-index",
+            "hashes.sqlite3",
+        ]
+    )
+    options = check_options(extraction_options(args))
+    assert options["scene_threshold"] == 0.5
+    assert (options["min_gap"], options["max_gap"]) == (1.0, 30)
+    assert options["scene_metric"] == "pixel"
+    assert options["dedup_distance"] == 3
+    assert options["dedup_index"] == "hashes.sqlite3"
+
+
+def test_bad_dedup_distance_stops_before_the_run(tmp_path, capsys):
+    import cli
+
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main([str(tmp_path), "--dedup-distance", "9"])
+    assert exit_info.value.code == 2
+    assert "dedup_distance" in capsys.readouterr().err
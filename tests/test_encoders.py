@@ -0,0 +1,37 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from encoders import ENCODER_PROFILES, benchmark_encoders, encode_image, save_options
+
+
+def frame():
+    x = np.linspace(0, 255, 64, dtype=np.uint8)
+    return np.dstack([np.tile(x, (48, 1))] * 3)
+
+
+def test_profiles_differ_where_they_are_defined():
+    for output_format in ("png", "jpg", "webp"):
+        options = {
+            profile: save_options(output_format, 90, profile)
+            for profile in ENCODER_PROFILES
+        }
+        if output_format in ENCODER_PROFILES["fast"]:
+            assert options["fast"] != options["balanced"]
+        else:
+            assert options["fast"] == options["balanced"]
+        assert options["archive"] != options["balanced"]
+
+
+def test_encoded_frames_decode():
+    for output_format in ("png", "jpg"):
+        data = encode_image(frame(), output_format, 90, "fast", size=(32, 24))
+        assert Image.open(io.BytesIO(data)).size == (32, 24)
+
+
+def test_benchmark_skips_repeated_settings():
+    results = benchmark_encoders([frame()], formats=["png", "jpg"])
+    pairs = {(result["profile"], result["format"]) for result in results}
+    assert ("fast", "jpg") not in pairs
+    assert {("fast", "png"), ("balanced", "jpg"), ("archive", "jpg")} <= pairs
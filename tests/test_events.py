@@ -0,0 +1,88 @@
+import os
+import queue
+
+import numpy as np
+
+from events import DurationHistogram, EventForwarder, ProgressTracker, TimingCollector
+
+
+def test_forwarder_sends_batches():
+    sent = queue.Queue()
+    forwarder = EventForwarder(sent)
+    forwarder.BATCH_SECONDS = 60
+    for i in range(EventForwarder.BATCH_SIZE + 3):
+        forwarder({"event": "frame", "i": i})
+
+    batch = sent.get_nowait()
+    assert [event["i"] for event in batch] == list(range(EventForwarder.BATCH_SIZE))
+    assert sent.empty()
+
+    forwarder.flush()
+    assert len(sent.get_nowait()) == 3
+    forwarder.flush()
+    assert sent.empty()
+
+
+def test_segment_events_reach_the_parent(tmp_path, sample_video):
+    from video_processor import VideoProcessor
+
+    processor = VideoProcessor(sample_video)
+    processor.output_dir = str(tmp_path / "out")
+    processor.print_status = lambda message: None
+    events = []
+    processor.events.subscribe(events.append)
+    processor.process_video(interval=1, resume=False, processes=2, workers=1)
+
+    progress = [event for event in events if event["event"] == "progress"]
+    assert sorted(event["t"] for event in progress) == [0, 1, 2, 3, 4, 5]
+    assert all(event["pid"] != os.getpid() for event in progress)
+
+
+def test_progress_adds_up_segment_plans():
+
+    tracker = ProgressTracker()
+    tracker({"event": "plan", "total": 4, "resumed": 1, "segment": "segment-0"})
+    tracker({"event": "progress", "total": 10})
+    tracker({"event": "plan", "total": 6, "resumed": 2, "segment": "segment-40"})
+    tracker({"event": "progress", "total": 10})
+    completed, total, _, _ = tracker.snapshot()
+    assert (completed, total) == (5, 10)
+
+
+def test_progress_of_a_parallel_run(tmp_path, sample_video):
+    from video_processor import VideoProcessor
+
+    processor = VideoProcessor(sample_video)
+    processor.output_dir = str(tmp_path / "out")
+    processor.print_status = lambda message: None
+    tracker = ProgressTracker()
+    processor.events.subscribe(tracker)
+    processor.process_video(interval=1, resume=False, processes=3, workers=1)
+    assert tracker.snapshot()[:2] == (6, 6)
+
+
+def test_duration_histogram_estimates_percentiles():
+    durations = np.random.default_rng(0).lognormal(-5, 1, 20000)
+    histogram = DurationHistogram()
+    for duration in durations:
+        histogram.add(float(duration))
+
+    assert histogram.count == len(durations)
+    assert histogram.max == durations.max()
+    assert abs(histogram.total - durations.sum()) < 1e-9
+    for q in (50, 95):
+        exact = np.percentile(durations, q)
+        assert abs(histogram.percentile(q) - exact) / exact < 0.07
+    # The bins are bounded by the range of the durations, not their count
+    assert len(histogram._bins) < 200
+
+
+def test_timing_collector_summarizes_frame_ops():
+    collector = TimingCollector()
+    for duration in (0.001, 0.002, 0.003):
+        collector({"event": "frame", "op": "encode", "duration": duration})
+    summary = collector.summary()["frame_ops"]["encode"]
+    assert summary["count"] == 3
+    assert summary["total_seconds"] == 0.006
+    assert summary["max_ms"] == 3.0
+    assert 1.8 < summary["p50_ms"] < 2.2
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+
+from frame_cache import FrameCache
+
+
+def frame(value):
+    return np.full((8, 8, 3), value, dtype=np.uint8)
+
+
+def test_round_trip(tmp_path):
+    cache = FrameCache(str(tmp_path / "frames"), max_bytes=1 << 20)
+    cache.put("video", 3, frame(7))
+
+    assert cache.contains("video", 3)
+    assert not cache.contains("video", 4)
+    assert np.array_equal(cache.get("video", 3), frame(7))
+    assert cache.get("video", 4) is None
+    # Another cache over the same folder sees the frame
+    assert FrameCache(cache.directory, max_bytes=1 << 20).size() == cache.size()
+
+
+def test_least_recently_used_frames_are_evicted(tmp_path):
+    cache = FrameCache(str(tmp_path / "frames"), max_bytes=1 << 20)
+    cache.put("video", 0, frame(0))
+    cache.max_bytes = cache.size() * 2
+    cache.put("video", 1, frame(1))
+    cache.get("video", 0)
+    cache.put("video", 2, frame(2))
+
+    assert cache.contains("video", 0)
+    assert not cache.contains("video", 1)
+    assert cache.contains("video", 2)
+
+
+def test_rerun_reads_frames_from_the_cache(tmp_path, sample_video):
+    from video_processor import VideoProcessor
+
+    cache = FrameCache(str(tmp_path / "frames"))
+    runs = []
+    for output_format in ("png", "jpg"):
+        processor = VideoProcessor(sample_video)
+        processor.output_dir = str(tmp_path / output_format)
+        processor.print_status = lambda message: None
+        processor.frame_cache = cache
+        events = []
+        processor.events.subscribe(events.append)
+        processor.process_video(interval=1, output_format=output_format)
+        runs.append([event for event in events if event["event"] == "frame_cache"])
+        frames = os.listdir(os.path.join(processor.output_dir, "frames"))
+        assert len(frames) == 6
+
+    assert [(event["hits"], event["misses"]) for event in runs[0]] == [(0, 6)]
+    assert [(event["hits"], event["misses"]) for event in runs[1]] == [(6, 0)]
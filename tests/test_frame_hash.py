@@ -0,0 +1,103 @@
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from frame_hash import DuplicateFilter, HashIndex, dhash, hamming
+
+
+def gradient(shift=0):
+    row = np.arange(64, dtype=np.uint8) * 4
+    frame = np.tile(np.roll(row, shift), (48, 1))
+    return np.stack([frame] * 3, axis=-1)
+
+
+def test_dhash_is_stable_and_sensitive():
+    assert dhash(gradient()) == dhash(gradient().copy())
+    assert hamming(dhash(gradient()), dhash(gradient(32))) > 8
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "hashes.sqlite3")
+    index = HashIndex(path, bands=6)
+    index.add(0xFFFF_0000_FFFF_0000, "a.mp4", 1.5)
+    index.close()
+
+    index = HashIndex(path, bands=9)
+    # The band layout of an existing index wins
+    assert index.bands == 6
+    assert len(index) == 1
+    match = index.search(0xFFFF_0000_FFFF_0001, 5)
+    assert match == [{"video": "a.mp4", "timestamp": 1.5, "distance": 1}]
+    assert index.search(0x0000_FFFF_0000_FFFF, 5) == []
+    with pytest.raises(ValueError):
+        index.search(0, 6)
+    index.close()
+
+
+def test_instances_do_not_lock_each_other_out(tmp_path):
+    path = str(tmp_path / "hashes.sqlite3")
+    first = HashIndex(path)
+    second = HashIndex(path)
+    first.add(1, "a.mp4", 0.0)
+
+    started = time.monotonic()
+    second.add(2, "b.mp4", 0.0)
+    assert time.monotonic() - started < 1
+    assert len(first) == len(second) == 2
+    first.close()
+    second.close()
+
+
+def test_rerun_keeps_its_own_frames(tmp_path):
+    path = str(tmp_path / "hashes.sqlite3")
+    dedup = DuplicateFilter(HashIndex(path), "a.mp4", max_distance=4)
+    assert dedup.check(1.0, gradient()) is None
+    assert dedup.check(2.0, gradient())["timestamp"] == 1.0
+    # Extracting the same video again keeps the frame it kept before
+    assert dedup.check(1.0, gradient()) is None
+
+
+def test_concurrent_writers_keep_one_copy(tmp_path):
+    path = str(tmp_path / "hashes.sqlite3")
+    HashIndex(path).close()
+    frame = gradient()
+    barrier = threading.Barrier(4)
+    kept = []
+    errors = []
+
+    def worker(i):
+        # One connection each, like separate worker processes
+        dedup = DuplicateFilter(HashIndex(path), f"video-{i}.mp4", max_distance=4)
+        barrier.wait()
+        try:
+            for t in range(10):
+                if dedup.check(float(t), frame) is None:
+                    kept.append((i, t))
+        except sqlite3.Error as e:
+            errors.append(e)
+        dedup.index.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(kept) == 1
+    assert len(HashIndex(path)) == 1
+
+
+def test_distance_beyond_the_index_is_rejected(tmp_path, sample_video):
+    from video_processor import VideoProcessor
+
+    path = str(tmp_path / "hashes.sqlite3")
+    HashIndex(path, bands=3).close()
+    processor = VideoProcessor(sample_video)
+    processor.output_dir = str(tmp_path / "out")
+    processor.print_status = lambda message: None
+    with pytest.raises(ValueError, match="dedup_distance must be 0-2"):
+        processor.process_video(interval=1, dedup_distance=3, dedup_index=path)
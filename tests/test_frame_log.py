@@ -0,0 +1,130 @@
+import json
+import os
+import random
+import threading
+
+from frame_log import (
+    FrameLog,
+    clear_frame_logs,
+    frame_log_path,
+    load_frame_stats,
+    merge_frame_logs,
+    read_frame_log,
+)
+
+
+def indexes(path):
+    return [record["index"] for record in read_frame_log(path)]
+
+
+def test_round_trip(tmp_path):
+    output_dir = str(tmp_path)
+    with FrameLog(output_dir) as log:
+        log.record(
+            1,
+            0.0,
+            os.path.join(output_dir, "frames", "a.png"),
+            100,
+            {"brightness": 10.0},
+            {"thumbs": 20},
+        )
+        log.record(2, 5.0, os.path.join(output_dir, "frames", "b.png"), 300)
+
+    records = list(read_frame_log(frame_log_path(output_dir)))
+    assert records[0] == {
+        "index": 1,
+        "t": 0.0,
+        "file": os.path.join("frames", "a.png"),
+        "bytes": 100,
+        "brightness": 10.0,
+        "variants": {"thumbs": 20},
+    }
+    assert log.count == 2
+
+    stats, (thumbs,) = load_frame_stats(frame_log_path(output_dir), ["thumbs"])
+    assert list(stats.arrays()["bytes"]) == [100, 300]
+    assert list(thumbs.arrays()["bytes"]) == [20]
+
+
+def test_cut_off_lines_are_skipped(tmp_path):
+    with FrameLog(str(tmp_path)) as log:
+        log.record(1, 0.0, str(tmp_path / "a.png"), 1)
+    with open(log.path, "a") as f:
+        f.write('{"index": 2, "t"')
+    assert indexes(log.path) == [1]
+
+
+def test_records_are_written_in_frame_order(tmp_path):
+    log = FrameLog(str(tmp_path))
+    log.next_index = 5
+    log.record(6, 1.0, str(tmp_path / "b.png"), 1)
+    # Held back until frame 5 is in
+    assert indexes(log.path) == []
+    log.record(5, 0.0, str(tmp_path / "a.png"), 1)
+    log.skip(7)
+    log.record(8, 3.0, str(tmp_path / "d.png"), 1)
+    assert indexes(log.path) == [5, 6, 8]
+    log.close()
+    assert log.count == 3
+
+
+def test_close_writes_frames_after_a_gap(tmp_path):
+    log = FrameLog(str(tmp_path))
+    log.record(3, 2.0, str(tmp_path / "c.png"), 1)
+    log.record(1, 0.0, str(tmp_path / "a.png"), 1)
+    log.close()
+    # Frame 2 never arrived, as in a cancelled run
+    assert indexes(log.path) == [1, 3]
+
+
+def test_concurrent_writers_keep_frame_order(tmp_path):
+    log = FrameLog(str(tmp_path))
+    order = list(range(1, 201))
+    random.Random(0).shuffle(order)
+    chunks = [order[i::4] for i in range(4)]
+
+    def write(chunk):
+        for idx in chunk:
+            log.record(idx, float(idx), str(tmp_path / f"{idx}.png"), idx)
+
+    threads = [threading.Thread(target=write, args=(chunk,)) for chunk in chunks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    log.close()
+    assert indexes(log.path) == list(range(1, 201))
+
+
+def test_shards_are_merged_in_segment_order(tmp_path):
+    output_dir = str(tmp_path)
+    shards = ["segment-0", "segment-2", "segment-10"]
+    for i, shard in enumerate(shards):
+        with FrameLog(output_dir, shard) as log:
+            log.next_index = i + 1
+            log.record(i + 1, float(i), os.path.join(output_dir, f"{i}.png"), 1)
+
+    merge_frame_logs(output_dir, shards)
+    assert indexes(frame_log_path(output_dir)) == [1, 2, 3]
+    assert sorted(os.listdir(output_dir)) == ["frames.jsonl"]
+
+    clear_frame_logs(output_dir)
+    assert os.listdir(output_dir) == []
+
+
+def test_extraction_log_order_is_deterministic(tmp_path, sample_video):
+    from video_processor import VideoProcessor
+
+    orders = []
+    for run, options in enumerate(
+        [{"workers": 4, "writers": 3}, {"processes": 2, "workers": 2, "writers": 2}]
+    ):
+        processor = VideoProcessor(sample_video)
+        processor.output_dir = str(tmp_path / f"run-{run}")
+        processor.print_status = lambda message: None
+        result = processor.process_video(interval=1, resume=False, **options)
+        orders.append(indexes(result["frame_log"]))
+        with open(os.path.join(processor.output_dir, "processing_report.json")) as f:
+            assert json.load(f)["frame_analysis"]["total_frames"] == 6
+
+    assert orders == [list(range(1, 7))] * 2
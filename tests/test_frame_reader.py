@@ -0,0 +1,115 @@
+import numpy as np
+
+from frame_reader import FramePool, FrameReader
+
+
+def test_pool_reuses_released_buffers():
+    pool = FramePool((2, 2), size=2)
+    first = pool.acquire()
+    second = pool.acquire()
+    pool.retain(first)
+    pool.release(first)
+    # Still leased once, so a new buffer is allocated
+    third = pool.acquire()
+    assert third is not first and third is not second
+    assert pool.allocations == 3
+
+    pool.release(first)
+    assert pool.acquire() is first
+    assert pool.reuses == 1
+
+    # The pool was full, so the third buffer is not kept; releasing it and
+    # buffers the pool never handed out does nothing
+    pool.release(third)
+    pool.release(np.empty((2, 2), dtype=np.uint8))
+    assert pool.acquire() is not third
+
+
+def test_detached_buffers_leave_the_pool():
+    pool = FramePool((2, 2), size=2)
+    kept = pool.acquire()
+    pool.retain(kept)
+    pool.detach(kept)
+    pool.release(kept)
+    assert pool.acquire() is not kept
+    assert len(pool._leased) == 1
+
+
+def test_iter_frames_does_not_pin_yielded_frames(sample_video):
+    from video_processor import VideoProcessor
+
+    processor = VideoProcessor(sample_video)
+    with processor.reader_session():
+        frames = [frame for _, frame in processor.iter_frames(interval=1)]
+        # Only the reader's lease on lastread is left
+        assert len(processor._reader.pool._leased) <= 1
+    assert len({id(frame) for frame in frames}) == 6
+
+
+def test_unreleased_frames_are_never_overwritten(sample_video):
+    reader = FrameReader(sample_video)
+    try:
+        kept = [reader.seek_frame(t) for t in (0, 2, 4)]
+        copies = [frame.copy() for frame in kept]
+        for t in range(6):
+            reader.release(reader.scan_frame(t + 0.5))
+        for frame, copy in zip(kept, copies):
+            assert np.array_equal(frame, copy)
+        assert reader.pool.reuses > 0
+    finally:
+        reader.close()
+
+
+def test_repeated_frame_is_leased_twice(sample_video):
+    reader = FrameReader(sample_video)
+    try:
+        frame = reader.seek_frame(1)
+        again = reader.seek_frame(1)
+        assert again is frame
+        reader.release(frame)
+        expected = again.copy()
+        reader.release(reader.scan_frame(3))
+        assert np.array_equal(again, expected)
+    finally:
+        reader.close()
+
+
+def test_seeks_give_back_the_lastread_lease(sample_video):
+    reader = FrameReader(sample_video)
+    try:
+        for i in range(10):
+            reader.release(reader.seek_frame(i % 5 + 0.5))
+        assert reader.pool.reuses > reader.pool.allocations
+        # Only the reader's own lease on lastread is left
+        assert len(reader.pool._leased) == 1
+    finally:
+        reader.close()
+    assert not reader.pool._leased
+
+
+def test_extraction_reuses_buffers(tmp_path, sample_video):
+    from video_processor import VideoProcessor
+
+    processor = VideoProcessor(sample_video)
+    processor.output_dir = str(tmp_path / "out")
+    processor.print_status = lambda message: None
+    buffers = []
+    processor.events.subscribe(
+        lambda event: event["event"] == "buffers" and buffers.append(event)
+    )
+    processor.process_video(interval=1, resume=False, mode="sharpest", workers=2)
+    assert buffers[0]["reused"] > 0
+
+
+def test_seek_extraction_reuses_buffers(tmp_path, sample_video):
+    from video_processor import VideoProcessor
+
+    processor = VideoProcessor(sample_video)
+    processor.output_dir = str(tmp_path / "out")
+    processor.print_status = lambda message: None
+    buffers = []
+    processor.events.subscribe(
+        lambda event: event["event"] == "buffers" and buffers.append(event)
+    )
+    processor.process_video(interval=1, resume=False, seek_strategy="seek")
+    assert buffers[0]["reused"] > buffers[0]["allocated"]
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from cli import build_parser, extraction_options
+from job_server import ApiHandler, JobServer, JobStore
+from metadata_cache import MetadataCache
+
+
+def make_server(tmp_path, workers=1):
+    options = extraction_options(build_parser().parse_args(["unused"]))
+    options.pop("memory_budget_mb")
+    store = JobStore(str(tmp_path / "jobs.json"))
+    return JobServer(
+        store,
+        workers=workers,
+        output_root=str(tmp_path / "out"),
+        options=options,
+        quiet=True,
+    )
+
+
+@pytest.fixture
+def api(tmp_path):
+    server = make_server(tmp_path)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ApiHandler)
+    httpd.job_server = server
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    def post(path, body):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{httpd.server_port}{path}",
+            data=json.dumps(body).encode("utf-8"),
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as e:
+            return e.code, json.load(e)
+
+    yield post
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"video": "VIDEO", "priority": [1]},
+        {"video": "VIDEO", "priority": {"a": 1}},
+        {"video": "VIDEO", "options": {"interval": "abc"}},
+        {"video": "VIDEO", "options": {"quality": 0}},
+        {"video": "VIDEO", "options": {"nonsense": 1}},
+        {"video": "VIDEO", "options": [1]},
+        {"video": ["VIDEO"]},
+    ],
+)
+def test_bad_submissions_are_rejected(api, sample_video, body):
+    body = json.loads(json.dumps(body).replace("VIDEO", sample_video))
+    status, response = api("/jobs", body)
+    assert status == 400
+    assert "error" in response
+
+
+def test_submission_converts_options(api, sample_video):
+    status, job = api(
+        "/jobs",
+        {"video": sample_video, "priority": 2, "options": {"target_size": "48x"}},
+    )
+    assert status == 201
+    assert job["options"]["target_size"] == [48, None]
+
+
+def test_cancel_before_the_job_is_registered(tmp_path, sample_video):
+    server = make_server(tmp_path)
+    job = server.submit(sample_video, options={"interval": 1})
+    taken = server.store.take(0)
+    # The cancel lands while the job is taken but not yet running
+    server.cancel(job["id"])
+    server._run(taken)
+    assert server.store.get(job["id"])["status"] == "cancelled"
+
+
+def test_parallel_job_reports_progress(tmp_path, sample_video):
+    server = make_server(tmp_path)
+    job = server.submit(sample_video, options={"interval": 1, "processes": 2})
+    seen = []
+    stop = threading.Event()
+
+    def poll():
+        while not stop.is_set():
+            progress = server.job(job["id"]).get("progress")
+            if progress and progress["frames"]:
+                seen.append(progress)
+            stop.wait(0.01)
+
+    poller = threading.Thread(target=poll)
+    poller.start()
+    try:
+        server._run(server.store.take(0))
+    finally:
+        stop.set()
+        poller.join()
+    assert server.store.get(job["id"])["status"] == "done"
+    assert seen and seen[-1]["total"] == 6
+    assert all(progress["frames"] <= progress["total"] for progress in seen)
+
+
+def test_bad_server_options_stop_at_startup(tmp_path, capsys):
+    import job_server
+
+    state = str(tmp_path / "jobs.json")
+    with pytest.raises(SystemExit) as exit_info:
+        job_server.main(["--state", state, "--quality", "0"])
+    assert exit_info.value.code == 2
+    assert "quality" in capsys.readouterr().err
+
+
+def test_finished_jobs_beyond_the_limit_are_forgotten(tmp_path):
+    videos = []
+    for i in range(4):
+        video = tmp_path / f"clip{i}.mp4"
+        video.write_bytes(b"video")
+        videos.append(str(video))
+    keys = [MetadataCache.key_for(video) for video in videos]
+    os.remove(videos[0])
+
+    state = str(tmp_path / "jobs.json")
+    store = JobStore(state, keep_finished=2)
+    for video, key in zip(videos, keys):
+        job = store.submit(video, "out", {}, source="watch", source_key=key)
+        store.take(0)
+        store.update(job["id"], status="done")
+
+    assert sorted(store.jobs) == [3, 4]
+    # A forgotten job's file is still known unless it has gone since
+    assert [store.knows(key) for key in keys] == [False, True, True, True]
+
+    reloaded = JobStore(state, keep_finished=2)
+    assert sorted(reloaded.jobs) == [3, 4]
+    assert [reloaded.knows(key) for key in keys] == [False, True, True, True]
+    assert reloaded.cancel(1) is False
@@ -0,0 +1,207 @@
+import json
+import os
+import threading
+
+import pytest
+
+from manifest import ExtractionManifest, encoding_signature
+
+SIGNATURE = encoding_signature(output_format="png", quality=95, interval=1)
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"not really a video")
+    return str(path)
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    return str(tmp_path / "out")
+
+
+def open_manifest(output_dir, video, params=None, shard=None):
+    manifest = ExtractionManifest(output_dir, shard=shard)
+    manifest.bind(video, params or {"interval": 1})
+    return manifest
+
+
+def write_frame(output_dir, manifest, t, data=b"frame", signature=SIGNATURE):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"frame_{t}.png")
+    with open(path, "wb") as f:
+        f.write(data)
+    manifest.record(t, path, data, signature, {"brightness": 1.5})
+    return path
+
+
+def test_round_trip_through_snapshot(output_dir, video):
+    manifest = open_manifest(output_dir, video)
+    for t in range(5):
+        write_frame(output_dir, manifest, t)
+    manifest.flush()
+
+    assert not os.path.exists(manifest.journal_path)
+    with open(manifest.path) as f:
+        data = json.load(f)
+    # The signature is stored once, not per frame
+    assert data["encodings"] == [SIGNATURE]
+    assert {entry["encoding"] for entry in data["frames"].values()} == {0}
+
+    reloaded = open_manifest(output_dir, video)
+    assert reloaded.previous_params == {"interval": 1}
+    entry = reloaded.lookup(3, SIGNATURE)
+    assert entry["file"] == "frame_3.png"
+    assert entry["bytes"] == 5
+    assert entry["stats"] == {"brightness": 1.5}
+    assert reloaded.lookup(3, encoding_signature(output_format="jpg")) is None
+
+
+def test_journal_is_replayed_after_a_crash(output_dir, video):
+    manifest = open_manifest(output_dir, video)
+    for t in range(3):
+        write_frame(output_dir, manifest, t)
+    # A crash in the middle of a line leaves it cut off
+    manifest._journal.write('{"t": "9.0')
+    manifest._journal.flush()
+
+    reloaded = open_manifest(output_dir, video)
+    assert sorted(reloaded.frames) == ["0.000", "1.000", "2.000"]
+    assert reloaded.lookup(2, SIGNATURE) is not None
+
+
+def test_lookup_rejects_missing_or_changed_files(output_dir, video):
+    manifest = open_manifest(output_dir, video)
+    path = write_frame(output_dir, manifest, 0)
+    write_frame(output_dir, manifest, 1)
+    os.remove(path)
+    with open(os.path.join(output_dir, "frame_1.png"), "ab") as f:
+        f.write(b"more")
+
+    assert manifest.lookup(0, SIGNATURE) is None
+    assert manifest.lookup(1, SIGNATURE) is None
+
+
+def test_changed_video_discards_records(output_dir, video):
+    manifest = open_manifest(output_dir, video)
+    write_frame(output_dir, manifest, 0)
+    manifest.flush()
+    with open(video, "ab") as f:
+        f.write(b"edited")
+
+    assert open_manifest(output_dir, video).frames == {}
+
+
+def test_prune_deletes_frames_outside_the_plan(output_dir, video):
+    manifest = open_manifest(output_dir, video)
+    for t in range(4):
+        write_frame(output_dir, manifest, t)
+    write_frame(output_dir, manifest, 4, signature=encoding_signature(quality=1))
+    manifest.prune([0, 1, 4], SIGNATURE)
+
+    assert sorted(manifest.frames) == ["0.000", "1.000"]
+    assert sorted(os.listdir(output_dir)) == [
+        "frame_0.png",
+        "frame_1.png",
+        "manifest.jsonl",
+    ]
+    # The removals are journaled too
+    assert sorted(open_manifest(output_dir, video).frames) == ["0.000", "1.000"]
+
+
+def test_move_is_recorded(output_dir, video):
+    manifest = open_manifest(output_dir, video)
+    path = write_frame(output_dir, manifest, 0)
+    moved = os.path.join(output_dir, "renamed.png")
+    os.replace(path, moved)
+    manifest.move(0, moved)
+
+    assert open_manifest(output_dir, video).lookup(0, SIGNATURE)["file"] == (
+        "renamed.png"
+    )
+
+
+def test_rerecorded_frame_replaces_its_old_file(output_dir, video):
+    manifest = open_manifest(output_dir, video)
+    write_frame(output_dir, manifest, 2)
+    path = os.path.join(output_dir, "renumbered.png")
+    with open(path, "wb") as f:
+        f.write(b"frame")
+    manifest.record(2, path, b"frame", SIGNATURE)
+
+    assert sorted(os.listdir(output_dir)) == ["manifest.jsonl", "renumbered.png"]
+    assert manifest.lookup(2, SIGNATURE)["file"] == "renumbered.png"
+
+
+def test_process_video_rerun_leaves_no_stale_frames(tmp_path, sample_video):
+    from video_processor import VideoProcessor
+
+    output_dir = str(tmp_path / "run")
+    for interval in (1, 2):
+        processor = VideoProcessor(sample_video)
+        processor.output_dir = output_dir
+        processor.print_status = lambda message: None
+        processor.process_video(interval=interval, resume=False)
+    assert len(os.listdir(os.path.join(output_dir, "frames"))) == 3
+
+
+def test_shards_are_merged(output_dir, video):
+    main = open_manifest(output_dir, video)
+    write_frame(output_dir, main, 0)
+    main.flush()
+    for segment in range(2):
+        shard = open_manifest(output_dir, video, shard=f"segment-{segment}")
+        write_frame(output_dir, shard, 10 + segment)
+        if segment:
+            shard.flush()
+
+    merged = open_manifest(output_dir, video)
+    merged.merge_shards()
+    assert sorted(os.listdir(output_dir)) == [
+        "frame_0.png",
+        "frame_10.png",
+        "frame_11.png",
+        "manifest.json",
+    ]
+    assert sorted(open_manifest(output_dir, video).frames) == [
+        "0.000",
+        "10.000",
+        "11.000",
+    ]
+
+
+def test_version_1_manifest_is_read(output_dir, video):
+    manifest = open_manifest(output_dir, video)
+    write_frame(output_dir, manifest, 0)
+    manifest.flush()
+    with open(manifest.path) as f:
+        data = json.load(f)
+    data["version"] = 1
+    for entry in data["frames"].values():
+        entry["encoding"] = SIGNATURE
+    del data["encodings"]
+    with open(manifest.path, "w") as f:
+        json.dump(data, f)
+
+    assert open_manifest(output_dir, video).lookup(0, SIGNATURE) is not None
+
+
+def test_concurrent_writers(output_dir, video):
+    manifest = open_manifest(output_dir, video)
+    signatures = [SIGNATURE, encoding_signature(quality=1)]
+
+    def write(start):
+        for t in range(start, 200, 4):
+            write_frame(output_dir, manifest, t, signature=signatures[t % 2])
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reloaded = open_manifest(output_dir, video)
+    assert len(reloaded.frames) == 200
+    for t in range(200):
+        assert reloaded.lookup(t, signatures[t % 2]) is not None
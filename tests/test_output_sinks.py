@@ -0,0 +1,71 @@
+import io
+import json
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from output_sinks import ArchiveFrames, ShardedFrames
+from video_processor import VideoProcessor
+
+
+def extract(tmp_path, sample_video, **options):
+    processor = VideoProcessor(sample_video)
+    processor.output_dir = str(tmp_path / "out")
+    processor.print_status = lambda message: None
+    processor.process_video(interval=1, resume=False, **options)
+    with open(os.path.join(processor.output_dir, "processing_report.json")) as f:
+        return json.load(f)["frame_analysis"]
+
+
+def reference_frames(sample_video):
+    return dict(VideoProcessor(sample_video).iter_frames(interval=1))
+
+
+@pytest.mark.parametrize("kind", ["zip", "tar"])
+def test_archive_round_trip(tmp_path, sample_video, kind):
+    analysis = extract(tmp_path, sample_video, output=kind, output_format="png")
+    frames = ArchiveFrames(analysis["output"]["file"])
+    try:
+        expected = reference_frames(sample_video)
+        assert frames.timestamps == sorted(expected)
+        for i, t in enumerate(frames.timestamps):
+            view = frames[i]
+            image = np.asarray(Image.open(io.BytesIO(view)))
+            view.release()
+            assert np.array_equal(image, expected[t])
+    finally:
+        frames.close()
+
+
+def test_npy_round_trip(tmp_path, sample_video):
+    analysis = extract(tmp_path, sample_video, output="npy", shard_frames=4)
+    frames = ShardedFrames(analysis["output"]["directory"])
+    expected = reference_frames(sample_video)
+    assert list(frames.timestamps) == sorted(expected)
+    for i, t in enumerate(frames.timestamps):
+        assert np.array_equal(frames[i], expected[t])
+
+    frame_bytes = expected[0].nbytes
+    assert analysis["average_file_size"] == pytest.approx(frame_bytes / 1024**2)
+
+
+def test_sprite_sizes_come_from_the_sheets(tmp_path, sample_video):
+    analysis = extract(
+        tmp_path,
+        sample_video,
+        output="sprites",
+        sprite_grid=(2, 2),
+        sprite_tile_size=(32, None),
+    )
+    sheets = analysis["output"]["sheets"]
+    assert [sheet["tiles"] for sheet in sheets] == [4, 2]
+    total = sum(sheet["bytes"] for sheet in sheets)
+    assert analysis["average_file_size"] == pytest.approx(total / 6 / 1024**2)
+    assert analysis["statistics"]["bytes"]["mean"] is None
+
+
+def test_sprites_reject_target_size(tmp_path, sample_video):
+    with pytest.raises(ValueError, match="sprite_tile_size"):
+        extract(tmp_path, sample_video, output="sprites", target_size=(32, None))
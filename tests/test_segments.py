@@ -0,0 +1,34 @@
+import pytest
+
+from video_processor import VideoProcessor
+
+
+@pytest.mark.parametrize(
+    "duration, interval, processes, expected",
+    [
+        (0.6, 1, 2, [(0, 0.6)]),
+        (0, 1, 4, [(0, 0)]),
+        (10.5, 1, 1, [(0, 10.5)]),
+        (10.5, 1, 2, [(0, 5), (5, 10.5)]),
+        (10.5, 3, 8, [(0, 3), (3, 6), (6, 9), (9, 10.5)]),
+        (10, 30, 4, [(0, 10)]),
+    ],
+)
+def test_plan_segments(sample_video, duration, interval, processes, expected):
+    processor = VideoProcessor(sample_video)
+    segments = processor.plan_segments(duration, interval, processes)
+    assert segments == expected
+
+
+def test_segments_cover_every_timestamp_once(sample_video):
+    processor = VideoProcessor(sample_video)
+    planned = processor.plan_timestamps(100.5, 7)
+    for processes in range(1, 20):
+        segments = processor.plan_segments(100.5, 7, processes)
+        split = [
+            pair
+            for segment in segments
+            for pair in processor.plan_timestamps(100.5, 7, segment)
+        ]
+        assert split == planned
+        assert all(start < end for start, end in segments)
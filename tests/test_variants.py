@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from video_processor import VideoProcessor, output_variant
+
+
+def run(output_dir, sample_video, interval, **options):
+    processor = VideoProcessor(sample_video)
+    processor.output_dir = output_dir
+    processor.print_status = lambda message: None
+    variants = [{"subfolder": "thumbs", "output_format": "jpg", "size": (32, None)}]
+    processor.process_video(interval=interval, variants=variants, **options)
+    return sorted(os.listdir(os.path.join(output_dir, "thumbs")))
+
+
+@pytest.mark.parametrize("options", [{}, {"processes": 2}])
+def test_rerun_clears_stale_variant_frames(tmp_path, sample_video, options):
+    output_dir = str(tmp_path / "out")
+    assert len(run(output_dir, sample_video, 1, **options)) == 6
+    thumbs = run(output_dir, sample_video, 2, **options)
+    assert len(thumbs) == 3
+
+
+@pytest.mark.parametrize("subfolder", ["", ".", "frames", "../thumbs", "/tmp/thumbs"])
+def test_variant_subfolder_stays_inside_the_output(subfolder):
+    with pytest.raises(ValueError):
+        output_variant(subfolder)